@@ -1,24 +1,52 @@
+import time
+from threading import Thread
+
 import numpy as np
 import sounddevice as sd
+import soundfile as sf
 
 fs = 16000  # sample rate (Hz)
 duration = 0.96  # seconds, multiple of 0.96 (length of the sliding window)
 samples = int(duration * fs)
 
 
+def audio_item(window, timestamp, ring=None):
+    """
+    Builds the capture queue item of an audio window, holding the window itself or its shared memory ring ticket.
+
+    :param window: The audio samples.
+    :type window: numpy.ndarray
+    :param timestamp: Monotonic capture time of the window.
+    :type timestamp: float
+    :param ring: Optional shared memory ring the window is written to.
+    :type ring: SharedFrameRing
+    :return: The capture queue item.
+    :rtype: dict
+    """
+    item = {"type": "audio", 'timestamp': timestamp}
+    if ring is None:
+        item['data'] = window
+    else:
+        item['slot'], item['seq'] = ring.write(window, timestamp)
+    return item
+
+
 class MicrophoneAudioStream:
-    def __init__(self, src, in_q):
+    def __init__(self, src, in_q, ring=None):
         """
             Initializes a MicrophoneAudioStream object.
 
             :param src: input source (e.g. microphone device index)
             :type src: int or str
             :param in_q: input queue to put the recorded audio data into
-            :type in_q: multiprocessing.Queue object
+            :type in_q: BoundedQueue or queue.Queue object
+            :param ring: optional shared memory ring of (samples,) windows, the queue then gets the ring tickets
+            :type ring: SharedFrameRing
         """
         # initialize the audio input stream
         self.stream = sd.InputStream(samplerate=fs, channels=1, callback=self.update)
         self.in_q = in_q
+        self.ring = ring
         self.recording = np.zeros((0, 1))
 
     def start(self):
@@ -30,7 +58,7 @@ class MicrophoneAudioStream:
         self.stream.start()
         return self
 
-    def update(self, indata, frames, time, status):
+    def update(self, indata, frames, time_info, status):
         """
             Updates the recording array with the new audio data and adds it to the input queue when the recording array
             reaches the specified length.
@@ -39,8 +67,8 @@ class MicrophoneAudioStream:
             :type indata: numpy.ndarray
             :param frames: number of frames
             :type frames: int
-            :param time: timestamp
-            :type time: sd.TimeStruct
+            :param time_info: timestamp
+            :type time_info: sd.TimeStruct
             :param status: status flags
             :type status: sd.CallbackFlags
             :returns: None
@@ -48,8 +76,7 @@ class MicrophoneAudioStream:
         self.recording = np.concatenate((self.recording, indata), axis=0)
 
         if self.recording.size >= samples:
-            item = {"type": "audio", 'data': self.recording[:samples]}
-            self.in_q.put(item)
+            self.in_q.put(audio_item(self.recording[:samples, 0], time.monotonic(), self.ring))
             self.recording = self.recording[samples:]
 
     def stop(self):
@@ -58,3 +85,64 @@ class MicrophoneAudioStream:
             :returns: None
         """
         self.stream.stop()
+
+
+class AudioFileStream:
+    def __init__(self, path, in_q, loop=True, ring=None):
+        """
+            Initializes an AudioFileStream object, which replays an audio file as if it was being recorded.
+
+            :param path: path of the audio file
+            :type path: str
+            :param in_q: input queue to put the audio windows into
+            :type in_q: BoundedQueue or queue.Queue object
+            :param loop: whether the file is replayed from the start when it ends
+            :type loop: bool
+            :param ring: optional shared memory ring of (samples,) windows, the queue then gets the ring tickets
+            :type ring: SharedFrameRing
+        """
+        waveform, _ = sf.read(path, dtype='float32')
+        if waveform.ndim > 1:
+            waveform = waveform.mean(axis=1)
+        self.waveform = waveform
+        self.in_q = in_q
+        self.loop = loop
+        self.ring = ring
+        self.running = False
+
+    def start(self):
+        """
+        Starts replaying the audio file.
+
+        :return: self object
+        """
+        self.running = True
+        self.thread = Thread(target=self.update, args=())
+        self.thread.start()
+        return self
+
+    def update(self):
+        """
+            Puts one window of the audio file in the input queue every window duration, as a microphone would.
+            :returns: None
+        """
+        position = 0
+        while self.running:
+            if position >= len(self.waveform):
+                if not self.loop:
+                    break
+                position = 0
+
+            window = self.waveform[position:position + samples]
+            position += samples
+
+            self.in_q.put(audio_item(window, time.monotonic(), self.ring))
+            time.sleep(duration)
+
+    def stop(self):
+        """
+            Stops replaying the audio file.
+            :returns: None
+        """
+        self.running = False
+        self.thread.join()
@@ -0,0 +1,132 @@
+import queue
+from enum import Enum
+
+from EdgeDevice.utils.metrics import metrics
+
+
+class DropPolicy(Enum):
+    DROP_OLDEST = "DROP_OLDEST"  # a full queue discards its oldest item to make room for the new one
+    DROP_NEWEST = "DROP_NEWEST"  # a full queue discards the new item
+    KEEP_LATEST = "KEEP_LATEST"  # a new item replaces the queued item with the same key (or the whole queue)
+
+
+class BoundedQueue(queue.Queue):
+    """
+        Bounded capture queue that never blocks the producer.
+
+        Capture threads must keep up with the camera or microphone, so when the consumer falls behind ``put`` drops
+        items according to the policy instead of blocking or growing without bound, and memory stays flat under
+        overload. With KEEP_LATEST, ``key`` groups the items (e.g. per capture source) so a new item takes the place of
+        the queued item of the same group, and the consumer always gets the freshest data of every source.
+
+        :arg maxsize (int): Maximum number of queued items.
+        :arg policy (DropPolicy): What to drop when the queue is full.
+        :arg key (callable): Function returning the group of an item for KEEP_LATEST, or None for a single group.
+        :arg name (str): Name of the queue in the node metrics.
+        :arg dropped (int): Number of items dropped since the queue was created.
+    """
+
+    def __init__(self, maxsize=8, policy=DropPolicy.DROP_OLDEST, key=None, name='CAPTURE'):
+        """
+            Initializes an instance of the BoundedQueue class.
+
+            :param maxsize: Maximum number of queued items, must be positive.
+            :type maxsize: int
+            :param policy: What to drop when the queue is full.
+            :type policy: DropPolicy
+            :param key: Function returning the group of an item for KEEP_LATEST, or None for a single group.
+            :type key: callable
+            :param name: Name of the queue in the node metrics.
+            :type name: str
+        """
+        if maxsize <= 0:
+            raise ValueError("A bounded queue needs a positive maxsize")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.key = key
+        self.name = name
+        self.dropped = 0
+
+    def put(self, item, block=False, timeout=None):
+        """
+        Puts an item in the queue, dropping an item instead of blocking when the queue is full.
+
+        :param item: The item to queue.
+        :param block: Ignored, the producer is never blocked.
+        :param timeout: Ignored, the producer is never blocked.
+        :return: False if the new item itself was dropped, True otherwise.
+        :rtype: bool
+        """
+        with self.not_full:
+            if self.policy is DropPolicy.KEEP_LATEST and self._replace(item):
+                return True
+
+            if self._qsize() >= self.maxsize:
+                if self.policy is DropPolicy.DROP_NEWEST:
+                    self._drop(1)
+                    return False
+                self.queue.popleft()
+                self.unfinished_tasks -= 1
+                self._drop(1)
+
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return True
+
+    def _replace(self, item):
+        """
+        Replaces the queued items of the same group as the new item. Must be called with the queue mutex held.
+
+        :param item: The new item.
+        :return: True if the new item took the place of a queued item.
+        :rtype: bool
+        """
+        if self.key is None:
+            stale = self._qsize()
+            self.queue.clear()
+            self.unfinished_tasks -= stale
+            self._drop(stale)
+            return False
+
+        group = self.key(item)
+        for index, queued in enumerate(self.queue):
+            if self.key(queued) == group:
+                self.queue[index] = item
+                self._drop(1)
+                return True
+        return False
+
+    def _drop(self, count):
+        """
+        Counts dropped items, in the queue and in the node metrics.
+
+        :param count: Number of items dropped.
+        :type count: int
+        :return: None
+        """
+        if count:
+            self.dropped += count
+            metrics.increment(f'{self.name}_QUEUE_DROPPED', count)
+
+    def put_nowait(self, item):
+        """
+        Same as ``put``, the producer is never blocked anyway.
+
+        :param item: The item to queue.
+        :return: False if the new item itself was dropped, True otherwise.
+        :rtype: bool
+        """
+        return self.put(item)
+
+
+def capture_source(item):
+    """
+    Groups capture items by type and source, so KEEP_LATEST keeps the latest window or frame of every stream.
+
+    :param item: An item put by a capture stream.
+    :type item: dict
+    :return: The type and source of the item.
+    :rtype: tuple
+    """
+    return item['type'], item.get('source')
@@ -0,0 +1,192 @@
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from EdgeDevice.utils.metrics import metrics
+
+
+class SharedFrameRing:
+    """
+        Ring buffer of fixed-size frame slots in shared memory, to hand audio windows and video frames between
+        processes without pickling them.
+
+        The capture process writes each frame once in the next slot, and passes a small ``(slot, sequence)`` ticket
+        through a queue instead of the frame. Readers in other processes map the same memory and read the slot in
+        place. Each slot is protected by a sequence lock: its sequence number is odd while the writer fills it and
+        even once it is complete, so a reader can tell whether the slot still holds the frame of its ticket or was
+        overwritten because the ring wrapped around, and drops the frame in that case instead of blocking the writer.
+        There must be a single writer per ring.
+
+        The ring is picklable: a copy sent to another process attaches to the same shared memory block.
+
+        :arg shape (tuple): Shape of a frame, e.g. (480, 640, 3) for a video frame or (15360,) for an audio window.
+        :arg dtype (numpy.dtype): Data type of a frame.
+        :arg slots (int): Number of frame slots in the ring.
+        :arg name (str): Name of the shared memory block.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, slots=8, name=None):
+        """
+            Creates a ring in a new shared memory block, or attaches to an existing one when ``name`` is given.
+
+            :param shape: Shape of a frame.
+            :type shape: tuple
+            :param dtype: Data type of a frame.
+            :type dtype: numpy.dtype
+            :param slots: Number of frame slots in the ring.
+            :type slots: int
+            :param name: Name of an existing ring to attach to, or None to create a new ring.
+            :type name: str
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.owner = name is None
+
+        # Layout: [write count][sequence per slot][timestamp per slot][length per slot][frames]
+        header_size = 8 * (1 + 3 * slots)
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        size = header_size + frame_size * slots
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+
+        buffer = self.shm.buf
+        self._head = np.ndarray((1,), dtype=np.uint64, buffer=buffer, offset=0)
+        self._sequences = np.ndarray((slots,), dtype=np.uint64, buffer=buffer, offset=8)
+        self._timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buffer, offset=8 * (1 + slots))
+        self._lengths = np.ndarray((slots,), dtype=np.int64, buffer=buffer, offset=8 * (1 + 2 * slots))
+        self._frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=buffer, offset=header_size)
+        if self.owner:
+            self._head[0] = 0
+            self._sequences[:] = 0
+
+    def __getstate__(self):
+        return {'shape': self.shape, 'dtype': self.dtype.str, 'slots': self.slots, 'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state['shape'], state['dtype'], state['slots'], state['name'])
+
+    def write(self, frame, timestamp=None):
+        """
+        Copies a frame in the next slot of the ring, overwriting the oldest frame.
+
+        Frames shorter than the slot along the first axis (e.g. the last window of an audio file) are stored with
+        their length and zero padded.
+
+        :param frame: The frame, with the shape of the ring or shorter along the first axis.
+        :type frame: numpy.ndarray
+        :param timestamp: Monotonic capture time of the frame, defaults to now.
+        :type timestamp: float
+        :return: The ticket of the frame, to be passed to the readers.
+        :rtype: tuple[int, int]
+        """
+        slot = int(self._head[0] % self.slots)
+        length = len(frame)
+
+        self._sequences[slot] += 1  # odd, the slot is being written
+        self._frames[slot, :length] = frame
+        if length < self.shape[0]:
+            self._frames[slot, length:] = 0
+        self._timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+        self._lengths[slot] = length
+        self._sequences[slot] += 1  # even, the slot is complete
+
+        self._head[0] += 1
+        return slot, int(self._sequences[slot])
+
+    def valid(self, slot, sequence):
+        """
+        Checks whether a slot still holds the frame of a ticket.
+
+        :param slot: Slot of the ticket.
+        :type slot: int
+        :param sequence: Sequence number of the ticket.
+        :type sequence: int
+        :return: True if the frame was not overwritten since the ticket was issued.
+        :rtype: bool
+        """
+        return int(self._sequences[slot]) == sequence
+
+    def view(self, slot, sequence):
+        """
+        Returns a read-only view of the frame of a ticket, without copying it.
+
+        The view reads the shared memory directly, so the writer may overwrite it once the ring wraps around. Readers
+        must check ``valid`` once they are done with the view and discard their result if it returns False.
+
+        :param slot: Slot of the ticket.
+        :type slot: int
+        :param sequence: Sequence number of the ticket.
+        :type sequence: int
+        :return: The frame and its capture timestamp, or (None, None) if the frame was already overwritten.
+        :rtype: tuple[numpy.ndarray, float]
+        """
+        timestamp, length = float(self._timestamps[slot]), int(self._lengths[slot])
+        if not self.valid(slot, sequence):
+            metrics.increment('RING_OVERRUNS')
+            return None, None
+
+        frame = self._frames[slot, :length]
+        frame.flags.writeable = False
+        return frame, timestamp
+
+    def read(self, slot, sequence, out=None):
+        """
+        Copies the frame of a ticket out of the ring, e.g. to keep it after the ring wraps around.
+
+        :param slot: Slot of the ticket.
+        :type slot: int
+        :param sequence: Sequence number of the ticket.
+        :type sequence: int
+        :param out: Optional preallocated array receiving the frame.
+        :type out: numpy.ndarray
+        :return: The frame and its capture timestamp, or (None, None) if the frame was overwritten.
+        :rtype: tuple[numpy.ndarray, float]
+        """
+        frame, timestamp = self.view(slot, sequence)
+        if frame is None:
+            return None, None
+
+        if out is None:
+            out = np.empty_like(frame)
+        else:
+            out = out[:len(frame)]
+        np.copyto(out, frame)
+
+        if not self.valid(slot, sequence):
+            metrics.increment('RING_OVERRUNS')
+            return None, None
+        return out, timestamp
+
+    def close(self):
+        """
+        Detaches from the shared memory block, and frees it if this ring created it.
+
+        :return: None
+        """
+        del self._head, self._sequences, self._timestamps, self._lengths, self._frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach(name):
+    """
+    Attaches to an existing shared memory block without registering it again in the resource tracker, which is shared
+    with the ring owner when the processes are started by multiprocessing, and frees the block when the owner unlinks
+    it.
+
+    :param name: Name of the shared memory block.
+    :type name: str
+    :return: The shared memory block.
+    :rtype: multiprocessing.shared_memory.SharedMemory
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block, which is harmless with a shared resource tracker.
+        return shared_memory.SharedMemory(name=name)
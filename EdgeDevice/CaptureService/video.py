@@ -1,58 +1,195 @@
-import cv2
+import logging
+import os
 import time
 from threading import Thread
 
+import cv2
+
+WEBCAM = 'webcam'
+STREAM = 'stream'
+FILE = 'file'
+
+# a looped file that still delivers no frame after this many rewinds is given up
+MAX_REWINDS = 5
+REWIND_BACKOFF = 0.05  # seconds before the first retry, doubled at each consecutive failed rewind
+
+
+def source_kind(src):
+    """
+    Tells whether a video source is a webcam, a network stream (e.g. an RTSP camera) or a video file.
+
+    :param src: Webcam index, stream URL or file path.
+    :type src: int or str
+    :return: WEBCAM, STREAM or FILE.
+    :rtype: str
+    """
+    if isinstance(src, int) or str(src).isdigit():
+        return WEBCAM
+    if '://' in str(src):
+        return STREAM
+    return FILE
+
 
 class WebcamVideoStream:
-    def __init__(self, src, width, height, in_q):
-        # initialize the video camera stream and read the first frame from the stream
-        self.stream = cv2.VideoCapture(src, cv2.CAP_FFMPEG)
+    def __init__(self, src, width, height, in_q, name=None, loop=False, ring=None, speed=1.0):
+        """
+            Initializes a WebcamVideoStream object, reading a webcam, a network stream (e.g. an RTSP camera) or a video
+            file on a dedicated thread.
+
+            Live sources are read as fast as they deliver frames, with a single frame buffer so the latest frame is
+            never stuck behind older ones. Video files are replayed at their native frame rate multiplied by
+            ``speed``, or as fast as they can be decoded when ``speed`` is 0, e.g. to benchmark the inference. Files
+            and streams are decoded by FFmpeg, with hardware decoding when OpenCV supports it on the device.
+
+            :param src: webcam index, stream URL or file path
+            :type src: int or str
+            :param width: requested frame width
+            :type width: int
+            :param height: requested frame height
+            :type height: int
+            :param in_q: input queue to put the frames into
+            :type in_q: BoundedQueue or queue.Queue object
+            :param name: name of the stream in the queue items, defaults to the source
+            :type name: str
+            :param loop: whether a video file is replayed from the start when it ends
+            :type loop: bool
+            :param ring: optional shared memory ring of frames, the queue then gets the ring tickets
+            :type ring: SharedFrameRing
+            :param speed: replay speed of video files relative to their frame rate, 0 for no pacing
+            :type speed: float
+        """
+        self.name = str(src) if name is None else name
+        self.kind = source_kind(src)
+        self.loop = loop and self.kind == FILE
+        self.ring = ring
+        self.speed = speed
+        self.in_q = in_q
         self.found = True
+        self.running = False
+        self.frames = 0
 
+        self.stream = self.open(src)
         if self.stream is None or not self.stream.isOpened():
-            print("[VIDEO] Webcam not available!")
+            logging.error(f"[VIDEO] Source {src} not available!")
             self.found = False
             return
 
         self.stream.set(cv2.CAP_PROP_FRAME_WIDTH, width)
         self.stream.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-        _, _ = self.stream.read()
-
-        self.in_q = in_q
-
-        # initialize the variable used to indicate if the thread should be stopped
-        self.running = False
+        if self.kind != FILE:
+            # keep a single buffered frame so a slow reader always gets the latest one
+            self.stream.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        fps = self.stream.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0
+
+        # the shape of the frames actually delivered, which sizes the shared memory ring of the stream
+        _, frame = self.stream.read()
+        self.shape = None if frame is None else frame.shape
+        if self.kind == FILE:
+            if frame is None:
+                logging.error(f"[VIDEO] File {src} has no readable frame!")
+                self.stream.release()
+                self.found = False
+                return
+            if not self.stream.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                # the backend can't seek, reopen the file to replay its first frame
+                self.stream.release()
+                self.stream = self.open(src)
+
+    def open(self, src):
+        """
+        Opens the video source with the backend suited to its kind.
+
+        :param src: webcam index, stream URL or file path
+        :type src: int or str
+        :return: the video capture
+        :rtype: cv2.VideoCapture
+        """
+        if self.kind == WEBCAM:
+            # FFmpeg can't open webcams, let OpenCV pick the camera backend of the platform (e.g. V4L2)
+            return cv2.VideoCapture(int(src))
+
+        if self.kind == STREAM and str(src).startswith('rtsp'):
+            # RTSP over TCP doesn't lose packets (and so frames) on busy Wi-Fi networks
+            os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'rtsp_transport;tcp')
+
+        if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+            params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+            stream = cv2.VideoCapture(src, cv2.CAP_FFMPEG, params)
+            if stream.isOpened():
+                return stream
+        return cv2.VideoCapture(src, cv2.CAP_FFMPEG)
 
     def start(self):
-        self.running = True
+        """
+        Starts reading frames on a dedicated thread.
 
-        # start the thread to read frames from the video stream, and the thread to process the frames
-        self.thread = Thread(target=self.update, args=())
+        :return: self object
+        """
+        self.running = True
+        self.thread = Thread(target=self.update, args=(), daemon=True)
         self.thread.start()
-
         return self
 
     def update(self):
-        # keep looping infinitely until the thread is stopped
+        """
+            Reads the frames of the source and puts them in the input queue, timestamped with the monotonic clock when
+            they are read. Video files are paced to their frame rate and replay speed, and their frames carry their
+            position in the file, which restarts at 0 on every replay. A looped file is given up when
+            it can't be rewound, or still delivers no frame after ``MAX_REWINDS`` consecutive rewinds, retried with an
+            exponential back-off, so a corrupt file doesn't keep the thread spinning.
+            :returns: None
+        """
+        start_time = time.monotonic()
+        replayed = 0
+        rewinds = 0
+        position = 0
         while self.running:
-
-            # otherwise, read the next frame from the stream
-            _, frame = self.stream.read()
-
-            item = {"type": "video", 'data': frame}
+            grabbed, frame = self.stream.read()
+            if not grabbed:
+                # replay video files from the start when they end, otherwise the stream is over
+                if not self.loop:
+                    break
+                if rewinds >= MAX_REWINDS or not self.stream.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                    logging.error(f"[VIDEO] Can't replay {self.name} after {rewinds} rewinds, stopping the stream")
+                    break
+                if rewinds:
+                    time.sleep(REWIND_BACKOFF * 2 ** (rewinds - 1))
+                rewinds += 1
+                position = 0
+                continue
+            rewinds = 0
+
+            if self.kind == FILE and self.speed:
+                # sleep until the frame is due, without drifting over long replays
+                due = start_time + replayed / (self.fps * self.speed)
+                replayed += 1
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            item = {"type": "video", 'source': self.name, 'timestamp': time.monotonic()}
+            if self.kind == FILE:
+                item['position'] = position
+                position += 1
+            if self.ring is None:
+                item['data'] = frame
+            else:
+                # the ring slots have a fixed size, in case the camera ignored the requested resolution
+                if frame.shape != self.ring.shape:
+                    frame = cv2.resize(frame, (self.ring.shape[1], self.ring.shape[0]))
+                item['slot'], item['seq'] = self.ring.write(frame, item['timestamp'])
             self.in_q.put(item)
+            self.frames += 1
 
-            t = time.time()
-
-            # cv2.imshow('Video', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
-
-            # print('[INFO] elapsed time: {:.2f}'.format(time.time() - t))
-
-            if cv2.waitKey(500) & 0xFF == ord('q'):
-                break
+        self.running = False
 
     def stop(self):
-        # indicate that the thread should be stopped
+        """
+            Stops reading frames and releases the source.
+            :returns: None
+        """
         self.running = False
         self.thread.join()
-        cv2.destroyAllWindows()
+        self.stream.release()
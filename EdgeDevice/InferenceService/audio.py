@@ -1,6 +1,11 @@
 import numpy as np
-from tflite_runtime.interpreter import Interpreter
 import csv
+import os
+
+from EdgeDevice.InferenceService.cache import audio_key
+from EdgeDevice.InferenceService.registry import registry
+from EdgeDevice.utils.constants import Inference
+from EdgeDevice.utils.metrics import metrics
 
 
 class AudioInference:
@@ -10,17 +15,26 @@ class AudioInference:
         :arg samples (int): Number of audio samples in each input signal.
         :arg model_name (str): Name of the loaded model.
         :arg threshold (float): Confidence threshold for classification.
-        :arg interpreter (tflite_runtime.interpreter.Interpreter): TensorFlow Lite interpreter.
+        :arg interpreter (tflite_runtime.interpreter.Interpreter): TensorFlow Lite interpreter of the calling thread.
         :arg waveform_input_index (int): Index of waveform input tensor.
         :arg  scores_output_index (int): Index of scores output tensor.
+        :arg waveform_input_type (numpy.dtype): Type of the waveform input tensor, int8 or uint8 for quantized inputs.
+        :arg waveform_input_quantization (tuple): Scale and zero point of a quantized waveform input.
+        :arg scores_output_quantization (tuple): Scale and zero point of quantized scores, scale 0 for float scores.
         :arg class_names (list): List of class names for the loaded model.
+        :arg gate (EnergyGate): Optional voice activity gate, silent windows skip the interpreter.
+        :arg cache (InferenceCache): Optional cache of the class probabilities of already classified windows.
     """
 
-    def __init__(self, audio_model):
+    def __init__(self, audio_model, gate=None, cache=None):
         """
             Initializes an instance of the AudioInference class.
             :param audio_model: A dictionary containing the parameters for the loaded model.
             :type audio_model: dict
+            :param gate: Optional voice activity gate deciding which windows are worth classifying.
+            :type gate: EnergyGate
+            :param cache: Optional cache of the class probabilities, keyed by the 16-bit PCM content of the windows.
+            :type cache: InferenceCache
         """
         self.fs = audio_model['frequency']  # sample rate (Hz)
         duration = audio_model['duration']  # seconds, ex. multiple of 0.96 for yamnet (length of the sliding window)
@@ -28,19 +42,39 @@ class AudioInference:
         self.model_name = audio_model['name']
         self.threshold = audio_model['threshold']  # threshold from 0 to 1, ex. 0.85
         self.last_class = ""
-        # Load Model
-        self.interpreter = Interpreter(f'models/{self.model_name}.tflite')
-        inputs = self.interpreter.get_input_details()
-        outputs = self.interpreter.get_output_details()
+        self.gate = gate
+        self.cache = cache
+        # Load Model, once per process, from the shared model registry
+        self.model_path = registry.load(self.model_name, input_shapes=[[self.samples]]).path
+        interpreter = registry.interpreter(self.model_path)
+        inputs = interpreter.get_input_details()
+        outputs = interpreter.get_output_details()
         self.waveform_input_index = inputs[0]['index']
         self.scores_output_index = outputs[0]['index']
+        # Quantized models (e.g. yamnet_retrained_int8) take and return integers, scaled in ``invoke``.
+        self.waveform_input_type = inputs[0]['dtype']
+        self.waveform_input_quantization = inputs[0]['quantization']
+        self.scores_output_quantization = outputs[0]['quantization']
 
         # Read the csv file containing the model classes
-        class_map_path = f'models/{self.model_name}_class_map.csv'
+        class_map_path = os.path.join(registry.models_dir, f'{self.model_name}_class_map.csv')
         with open(class_map_path) as class_map_csv:
             self.class_names = [display_name for (class_index, mid, display_name) in csv.reader(class_map_csv)]
         self.class_names = self.class_names[1:]  # Skip CSV header
 
+    @property
+    def interpreter(self):
+        """
+        The interpreter of the model dedicated to the calling thread, resized to the model input length.
+
+        :return: The TensorFlow Lite interpreter.
+        """
+        interpreter = registry.interpreter(self.model_path)
+        if interpreter.get_input_details()[0]['shape'].tolist() != [self.samples]:
+            interpreter.resize_tensor_input(self.waveform_input_index, [self.samples], strict=True)
+            interpreter.allocate_tensors()
+        return interpreter
+
     def inference(self, waveform):
         """
         This method InferenceService is responsible for performing audio InferenceService on a given waveform using a pre-trained
@@ -54,30 +88,82 @@ class AudioInference:
         'Unknown'. Finally, the method prints the inferred class label and its corresponding score and returns the
         inferred class label.
 
+        Windows rejected by the voice activity gate are reported as silence without invoking the interpreter.
+
         :param waveform: A numpy array representing the audio waveform.
         :return: A string representing the inferred class label.
         """
+        if self.is_silent(waveform):
+            return Inference.AUDIO_SILENCE_LABEL.value, 1.0
+
+        class_probabilities = self.predict(waveform)
+
+        top_class = np.argmax(class_probabilities)
+        top_score = class_probabilities[top_class]
+        inferred_class = self.class_names[top_class]
+
+        return inferred_class, top_score
+
+    def is_silent(self, waveform):
+        """
+        Checks the waveform against the voice activity gate, counting the silent windows in the node metrics.
+
+        :param waveform: A numpy array representing the audio waveform.
+        :return: True if the window is silent and should not be classified.
+        """
+        if self.gate is None:
+            return False
+
+        metrics.increment('AUDIO_WINDOWS')
+        if self.gate.check(waveform[:self.samples]):
+            return False
+
+        metrics.increment('AUDIO_WINDOWS_SKIPPED')
+        return True
+
+    def predict(self, waveform):
+        """
+        Computes the probability of every class of the model for the given waveform, as used by ``inference``.
+
+        Windows already classified are answered from the cache, when there is one, without invoking the interpreter.
+
+        :param waveform: A numpy array representing the audio waveform.
+        :return: A numpy array with the probability of each class, in the ``class_names`` order.
+        """
+        if self.cache is not None:
+            return self.cache.cached(audio_key(waveform[:self.samples]), lambda: self.invoke(waveform))
+        return self.invoke(waveform)
+
+    def invoke(self, waveform):
+        """
+        Runs the model on the given waveform, padded or truncated to the model input length.
+
+        :param waveform: A numpy array representing the audio waveform.
+        :return: A numpy array with the probability of each class, in the ``class_names`` order.
+        """
         if len(waveform) > self.samples:
             waveform = waveform[:self.samples]
         elif len(waveform) < self.samples:
             padding = self.samples - len(waveform)
             waveform = np.pad(waveform, (0, padding), mode='constant')
 
-        waveform = waveform.astype('float32')
+        if np.issubdtype(self.waveform_input_type, np.integer):
+            scale, zero_point = self.waveform_input_quantization
+            info = np.iinfo(self.waveform_input_type)
+            waveform = np.clip(np.rint(waveform / scale + zero_point), info.min, info.max)
+        waveform = waveform.astype(self.waveform_input_type)
 
-        self.interpreter.resize_tensor_input(self.waveform_input_index, [self.samples], strict=True)
-        self.interpreter.allocate_tensors()
-        self.interpreter.set_tensor(self.waveform_input_index, waveform)
-        self.interpreter.invoke()
-        scores = self.interpreter.get_tensor(self.scores_output_index)
+        interpreter = self.interpreter
+        interpreter.set_tensor(self.waveform_input_index, waveform)
+        interpreter.invoke()
+        scores = interpreter.get_tensor(self.scores_output_index)
+        scale, zero_point = self.scores_output_quantization
+        if scale:
+            scores = (scores.astype(np.float32) - zero_point) * scale
 
         if self.model_name == 'yamnet':
             class_probabilities = np.mean(scores, axis=0)
         else:
             class_probabilities = np.exp(scores) / np.sum(np.exp(scores), axis=-1)
 
-        top_class = np.argmax(class_probabilities)
-        top_score = class_probabilities[top_class]
-        inferred_class = self.class_names[top_class]
-
-        return inferred_class, top_score
+        return class_probabilities
@@ -0,0 +1,184 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from EdgeDevice.utils.metrics import metrics
+
+try:
+    # xxHash is an order of magnitude faster than the cryptographic hashes, use it when it's installed.
+    import xxhash
+
+    def digest(data):
+        return xxhash.xxh3_64_digest(data)
+except ImportError:
+    def digest(data):
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def audio_key(waveform, bits=16):
+    """
+    Computes the cache key of an audio window from its samples quantized to 16-bit PCM, so windows that only differ
+    by float rounding share the same key. Fewer ``bits`` make near-identical windows share it too.
+
+    :param waveform: Audio samples in the range [-1.0, 1.0].
+    :type waveform: numpy.ndarray
+    :param bits: Number of most significant bits of the 16-bit samples that are kept.
+    :type bits: int
+    :return: The cache key.
+    :rtype: bytes
+    """
+    pcm = np.clip(np.asarray(waveform, dtype=np.float32) * 32767, -32768, 32767).astype(np.int16)
+    if bits < 16:
+        pcm &= np.int16(-1 << (16 - bits))
+    return digest(pcm.tobytes())
+
+
+def file_key(path, chunk_size=1 << 20):
+    """
+    Computes the cache key of a media file from its content.
+
+    :param path: Path of the file.
+    :type path: str
+    :param chunk_size: Number of bytes hashed at a time.
+    :type chunk_size: int
+    :return: The cache key.
+    :rtype: bytes
+    """
+    keys = []
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            keys.append(digest(chunk))
+    return digest(b''.join(keys))
+
+
+def replay_key(file, position):
+    """
+    Computes the cache key of a frame of a replayed video file from the key of the file and the position of the frame
+    in it, a looped recording feeding the model the same frames on every replay.
+
+    :param file: Cache key of the video file, see ``file_key``.
+    :type file: bytes
+    :param position: Index of the frame in the file.
+    :type position: int
+    :return: The cache key.
+    :rtype: bytes
+    """
+    return file + position.to_bytes(4, 'little')
+
+
+class InferenceCache:
+    """
+        LRU cache of inference results keyed by a content hash of the model input.
+
+        Replayed recordings feed the models the same inputs over and over, so their results are
+        memoized: a hit skips the interpreter entirely. Hits and misses are counted in the node metrics, together with
+        the hit rate, under the name of the cache. Cached results are shared and must not be modified by the callers.
+
+        :arg maxsize (int): Maximum number of cached results, the least recently used result is evicted first.
+        :arg name (str): Name of the cache in the node metrics.
+        :arg hits (int): Number of results found in the cache.
+        :arg misses (int): Number of results computed.
+    """
+
+    def __init__(self, maxsize=128, name='INFERENCE'):
+        """
+            Initializes an instance of the InferenceCache class.
+
+            :param maxsize: Maximum number of cached results.
+            :type maxsize: int
+            :param name: Name of the cache in the node metrics.
+            :type name: str
+        """
+        self.maxsize = maxsize
+        self.name = name
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Looks a result up, marking it as recently used.
+
+        :param key: The cache key of the input.
+        :type key: bytes
+        :return: The cached result, or None.
+        """
+        with self.lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        """
+        Stores a result, evicting the least recently used one when the cache is full.
+
+        :param key: The cache key of the input.
+        :type key: bytes
+        :param result: The inference result.
+        :return: None
+        """
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+
+    def cached(self, key, compute):
+        """
+        Returns the cached result of an input, computing and storing it on a miss.
+
+        :param key: The cache key of the input.
+        :type key: bytes
+        :param compute: Function computing the result, called without arguments on a miss.
+        :type compute: callable
+        :return: The inference result.
+        """
+        result = self.get(key)
+        hit = result is not None
+        if not hit:
+            result = compute()
+            self.put(key, result)
+        self.record(hit)
+        return result
+
+    def record(self, hit):
+        """
+        Counts a hit or a miss, in the cache and in the node metrics.
+
+        :param hit: Whether the result was found in the cache.
+        :type hit: bool
+        :return: None
+        """
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hit_rate = self.hits / (self.hits + self.misses)
+        metrics.increment(f'{self.name}_CACHE_{"HITS" if hit else "MISSES"}')
+        metrics.set(f'{self.name}_CACHE_HIT_RATE', round(hit_rate, 4))
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of the lookups answered from the cache.
+
+        :return: The hit rate, 0 before the first lookup.
+        :rtype: float
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Drops every cached result, e.g. after the model changed.
+
+        :return: None
+        """
+        with self.lock:
+            self.results.clear()
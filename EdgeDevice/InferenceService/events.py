@@ -0,0 +1,137 @@
+from typing import NamedTuple
+
+
+class ClassSettings(NamedTuple):
+    """Hysteresis and timing settings of an activity class."""
+    enter_threshold: float
+    exit_threshold: float
+    min_dwell: float
+    cooldown: float
+
+
+class EventStateMachine:
+    """
+        Debounces the fused detections of a room into activity changes.
+
+        The room is either idle or in one activity. A new activity is entered when its fused score stays above the
+        enter threshold for ``min_dwell`` seconds, and the current activity is left when its score stays below the
+        lower exit threshold for ``min_dwell`` seconds. The gap between both thresholds (hysteresis) and the dwell
+        time keep flickering predictions (A, B, A, B) from producing events. Entering an activity produces an event,
+        unless the same activity was already reported less than ``cooldown`` seconds before, so only genuine activity
+        changes generate transactions, broadcasts and Home Assistant messages. Every setting can be overridden per
+        class, e.g. short sounds like a knock need no dwell time.
+
+        :arg room (str): Room whose activity is tracked.
+        :arg active (str): Current activity of the room, or None when idle.
+        :arg last_events (dict): Time of the last event of each activity.
+    """
+
+    def __init__(self, room, enter_threshold=0.75, exit_threshold=0.5, min_dwell=1.0, cooldown=30.0,
+                 class_settings=None):
+        """
+            Initializes an instance of the EventStateMachine class.
+
+            :param room: Room whose activity is tracked.
+            :type room: str
+            :param enter_threshold: Fused score an activity must keep to be entered.
+            :type enter_threshold: float
+            :param exit_threshold: Fused score under which the current activity is left.
+            :type exit_threshold: float
+            :param min_dwell: Seconds a score must stay over (or under) a threshold to change the state.
+            :type min_dwell: float
+            :param cooldown: Minimum seconds between two events of the same activity.
+            :type cooldown: float
+            :param class_settings: Settings overridden per class, e.g. {'knock': {'min_dwell': 0.0}}.
+            :type class_settings: dict[str, dict]
+        """
+        self.room = room
+        self.defaults = ClassSettings(enter_threshold, exit_threshold, min_dwell, cooldown)
+        self.class_settings = {label: self.defaults._replace(**overrides)
+                               for label, overrides in (class_settings or {}).items()}
+
+        self.active = None
+        self.active_since = None
+        self.below_since = None
+        self.candidate = None
+        self.candidate_since = None
+        self.last_events = {}
+
+    def settings(self, label):
+        """
+        Returns the settings of an activity class.
+
+        :param label: The activity.
+        :type label: str
+        :return: The settings of the class, or the defaults.
+        :rtype: ClassSettings
+        """
+        return self.class_settings.get(label, self.defaults)
+
+    def update(self, top, scores, now):
+        """
+        Updates the state of the room with the fused results of the current time window.
+
+        :param top: The best fused class of the window, or None if there are no results.
+        :type top: FusedEvent
+        :param scores: Fused score of every class of the window.
+        :type scores: dict[str, float]
+        :param now: The current monotonic time.
+        :type now: float
+        :return: The event to report if a new activity was entered, or None.
+        :rtype: FusedEvent
+        """
+        self.check_exit(scores, now)
+
+        if top is None or top.label == self.active or top.score < self.settings(top.label).enter_threshold:
+            self.candidate = None
+            return None
+
+        if top.label != self.candidate:
+            self.candidate, self.candidate_since = top.label, now
+        if now - self.candidate_since < self.settings(top.label).min_dwell:
+            return None
+
+        return self.accept(top, now)
+
+    def check_exit(self, scores, now):
+        """
+        Leaves the current activity once its score stayed under the exit threshold for the dwell time.
+
+        :param scores: Fused score of every class of the window.
+        :type scores: dict[str, float]
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        if self.active is None:
+            return
+
+        settings = self.settings(self.active)
+        if scores.get(self.active, 0.0) >= settings.exit_threshold:
+            self.below_since = None
+            return
+
+        if self.below_since is None:
+            self.below_since = now
+        if now - self.below_since >= settings.min_dwell:
+            self.active, self.active_since, self.below_since = None, None, None
+
+    def accept(self, event, now):
+        """
+        Enters the activity of an event, e.g. a debounced detection or a collaborative conclusion of the network.
+
+        :param event: The event of the new activity.
+        :type event: FusedEvent
+        :param now: The current monotonic time.
+        :type now: float
+        :return: The event, or None if the activity is still cooling down since its last event.
+        :rtype: FusedEvent
+        """
+        self.active, self.active_since, self.below_since = event.label, now, None
+        self.candidate = None
+
+        last_event = self.last_events.get(event.label)
+        if last_event is not None and now - last_event < self.settings(event.label).cooldown:
+            return None
+        self.last_events[event.label] = now
+        return event
@@ -0,0 +1,223 @@
+import time
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+AUDIO = 'audio'
+VIDEO = 'video'
+
+
+class FusedEvent(NamedTuple):
+    """A detection combining the audio and video results of a time window."""
+    label: str
+    score: float
+    audio_score: float
+    video_score: float
+    modality: str
+    timestamp: float
+
+
+class FusionEngine:
+    """
+        Late fusion of the audio and video classification results.
+
+        Every audio window and video frame result is stored with its timestamp. Results of the same modality that fall
+        in the sliding time window are averaged, and both modalities are combined per class with configurable weights.
+        All the scores are kept as arrays over a fused label vocabulary (the union of the audio and video labels), so
+        the fusion is vectorized over classes. A class only known by one modality is scored by that modality alone.
+
+        :arg labels (list): Fused label vocabulary.
+        :arg window (float): Length, in seconds, of the sliding time window.
+        :arg threshold (float): Minimum fused score of an event.
+    """
+
+    def __init__(self, audio_labels, video_labels, class_weights=None, audio_weight=0.5, video_weight=0.5,
+                 window=4.0, threshold=0.75, label_map=None):
+        """
+            Initializes an instance of the FusionEngine class.
+
+            :param audio_labels: Labels of the audio model, in score order.
+            :type audio_labels: list[str]
+            :param video_labels: Labels of the video model, in score order.
+            :type video_labels: list[str]
+            :param class_weights: Optional (audio weight, video weight) pair per fused label.
+            :type class_weights: dict[str, tuple[float, float]]
+            :param audio_weight: Default weight of the audio scores.
+            :type audio_weight: float
+            :param video_weight: Default weight of the video scores.
+            :type video_weight: float
+            :param window: Length, in seconds, of the sliding time window.
+            :type window: float
+            :param threshold: Minimum fused score of an event.
+            :type threshold: float
+            :param label_map: Optional renaming of model labels to fused labels, so that an audio label and a video
+                              label describing the same activity are fused together.
+            :type label_map: dict[str, str]
+        """
+        label_map = label_map or {}
+        audio_labels = [label_map.get(label, label) for label in audio_labels]
+        video_labels = [label_map.get(label, label) for label in video_labels]
+
+        self.labels = list(dict.fromkeys(audio_labels + video_labels))
+        index = {label: i for i, label in enumerate(self.labels)}
+        self.indices = {
+            AUDIO: np.array([index[label] for label in audio_labels], dtype=np.intp),
+            VIDEO: np.array([index[label] for label in video_labels], dtype=np.intp),
+        }
+        self.model_labels = {AUDIO: audio_labels, VIDEO: video_labels}
+
+        # Weight of each modality per fused class, zero for the classes the modality can't detect.
+        self.weights = {AUDIO: np.zeros(len(self.labels)), VIDEO: np.zeros(len(self.labels))}
+        self.weights[AUDIO][self.indices[AUDIO]] = audio_weight
+        self.weights[VIDEO][self.indices[VIDEO]] = video_weight
+        for label, (class_audio_weight, class_video_weight) in (class_weights or {}).items():
+            if label in index:
+                self.weights[AUDIO][index[label]] = class_audio_weight if label in audio_labels else 0
+                self.weights[VIDEO][index[label]] = class_video_weight if label in video_labels else 0
+
+        self.window = window
+        self.threshold = threshold
+        self.results = {AUDIO: deque(), VIDEO: deque()}
+        self.last_event = None
+
+    def add(self, modality, scores, timestamp=None):
+        """
+        Stores the class scores of an audio window or video frame.
+
+        :param modality: AUDIO or VIDEO.
+        :type modality: str
+        :param scores: Scores of every label of the model, in the model label order.
+        :type scores: numpy.ndarray
+        :param timestamp: Monotonic time of the capture of the window or frame, defaults to now.
+        :type timestamp: float
+        :return: None
+        """
+        fused_scores = np.zeros(len(self.labels), dtype=np.float32)
+        fused_scores[self.indices[modality]] = scores
+        self.results[modality].append((time.monotonic() if timestamp is None else timestamp, fused_scores))
+
+    def add_audio(self, scores, timestamp=None):
+        """
+        Stores the class scores of an audio window.
+
+        :param scores: Scores of every audio label.
+        :type scores: numpy.ndarray
+        :param timestamp: Time of the capture of the window, defaults to now.
+        :type timestamp: float
+        :return: None
+        """
+        self.add(AUDIO, scores, timestamp)
+
+    def add_video(self, scores, timestamp=None):
+        """
+        Stores the class scores of a video frame.
+
+        :param scores: Scores of every video label.
+        :type scores: numpy.ndarray
+        :param timestamp: Time of the capture of the frame, defaults to now.
+        :type timestamp: float
+        :return: None
+        """
+        self.add(VIDEO, scores, timestamp)
+
+    def add_top(self, modality, label, score, timestamp=None):
+        """
+        Stores a result for which only the top label and score are known.
+
+        :param modality: AUDIO or VIDEO.
+        :type modality: str
+        :param label: The top label, as named by the model.
+        :type label: str
+        :param score: The score of the top label.
+        :type score: float
+        :param timestamp: Time of the capture, defaults to now.
+        :type timestamp: float
+        :return: None
+        """
+        scores = np.zeros(len(self.model_labels[modality]), dtype=np.float32)
+        scores[self.model_labels[modality].index(label)] = score
+        self.add(modality, scores, timestamp)
+
+    def expire(self, now):
+        """
+        Drops the results that fell out of the sliding time window.
+
+        :param now: The current time.
+        :type now: float
+        :return: None
+        """
+        for results in self.results.values():
+            while results and results[0][0] < now - self.window:
+                results.popleft()
+
+    def scores(self, now=None):
+        """
+        Computes the fused score of every class over the sliding time window.
+
+        :param now: The current time, defaults to now.
+        :type now: float
+        :return: The fused scores and the per modality mean scores, as arrays over ``labels``.
+        :rtype: tuple[numpy.ndarray, dict[str, numpy.ndarray]]
+        """
+        self.expire(time.monotonic() if now is None else now)
+
+        means = {}
+        weighted = np.zeros(len(self.labels))
+        total_weight = np.zeros(len(self.labels))
+        for modality, results in self.results.items():
+            if not results:
+                means[modality] = np.zeros(len(self.labels))
+                continue
+            means[modality] = np.mean([scores for _, scores in results], axis=0)
+            weighted += self.weights[modality] * means[modality]
+            total_weight += self.weights[modality]
+
+        fused = np.divide(weighted, total_weight, out=np.zeros(len(self.labels)), where=total_weight > 0)
+        return fused, means
+
+    def fuse(self, now=None):
+        """
+        Produces the fused event of the sliding time window.
+
+        An event is only produced when the top fused score reaches the threshold and its label differs from the
+        previous event, so repeated detections of the same activity don't generate new events.
+
+        :param now: The current time, defaults to now.
+        :type now: float
+        :return: The new fused event, or None.
+        :rtype: FusedEvent
+        """
+        now = time.monotonic() if now is None else now
+        event = self.top(now)
+        if event is None or event.score < self.threshold:
+            return None
+        if self.last_event is not None and self.last_event.label == event.label:
+            return None
+
+        self.last_event = event
+        return event
+
+    def top(self, now=None, scores=None):
+        """
+        Returns the best fused class of the sliding time window, regardless of the threshold.
+
+        :param now: The current time, defaults to now.
+        :type now: float
+        :param scores: The fused and mean scores returned by ``scores`` for ``now``, computed when None.
+        :type scores: tuple[numpy.ndarray, dict[str, numpy.ndarray]]
+        :return: The best fused class, or None if there are no results in the window.
+        :rtype: FusedEvent
+        """
+        now = time.monotonic() if now is None else now
+        fused, means = self.scores(now) if scores is None else scores
+        if not any(self.results.values()):
+            return None
+
+        top_class = int(np.argmax(fused))
+        audio_score = float(means[AUDIO][top_class])
+        video_score = float(means[VIDEO][top_class])
+        modality = AUDIO if self.weights[AUDIO][top_class] * audio_score >= \
+            self.weights[VIDEO][top_class] * video_score else VIDEO
+
+        return FusedEvent(self.labels[top_class], float(fused[top_class]), audio_score, video_score, modality, now)
@@ -0,0 +1,201 @@
+import time
+
+import cv2
+import numpy as np
+
+
+def rms_dbfs(waveform):
+    """
+    Computes the RMS energy of a waveform in dBFS (0 dBFS being a full scale square wave).
+
+    :param waveform: Audio samples in the range [-1.0, 1.0].
+    :type waveform: numpy.ndarray
+    :return: The energy of the waveform in dBFS, -inf for digital silence.
+    :rtype: float
+    """
+    waveform = np.asarray(waveform, dtype=np.float32).reshape(-1)
+    mean_square = float(np.dot(waveform, waveform)) / max(len(waveform), 1)
+    if mean_square <= 0:
+        return float('-inf')
+    return 10 * np.log10(mean_square)
+
+
+class EnergyGate:
+    """
+        Cheap voice activity gate deciding whether an audio window is worth classifying.
+
+        The window is split into short frames (20 ms at 16 kHz by default) as a single reshaped array, so both features
+        are computed for all frames at once. A window is active when its loudest frame reaches the energy threshold,
+        which catches short sounds that the RMS energy of the whole window would average away, or when its spectral
+        flux (the rise of the magnitude spectrum from one frame to the next, in dB) reaches the flux threshold, which
+        catches quiet onsets. Stationary background noise has a low flux, and a flux threshold 15 dB above the energy
+        threshold keeps noise at the energy threshold from passing through the flux alone.
+
+        :arg threshold (float): Energy, in dBFS, under which a frame is considered silent.
+        :arg flux_threshold (float): Spectral flux, in dB, under which a window is considered stationary.
+        :arg frame_length (int): Number of samples per analysis frame.
+    """
+
+    def __init__(self, threshold=-50.0, flux_threshold=None, frame_length=320):
+        """
+            Initializes an instance of the EnergyGate class.
+
+            :param threshold: Energy, in dBFS, under which a frame is considered silent.
+            :type threshold: float
+            :param flux_threshold: Spectral flux, in dB, under which a window is considered stationary, defaults to
+                                   15 dB above ``threshold``.
+            :type flux_threshold: float
+            :param frame_length: Number of samples per analysis frame.
+            :type frame_length: int
+        """
+        self.threshold = threshold
+        self.flux_threshold = threshold + 15 if flux_threshold is None else flux_threshold
+        self.frame_length = frame_length
+        self._window = np.hanning(frame_length).astype(np.float32)
+        # Scales the spectrum so that the flux is comparable to the RMS energy of the frames.
+        self._scale = 1 / np.sqrt(np.sum(self._window ** 2) * frame_length / 2)
+
+    def frames(self, waveform):
+        """
+        Splits a waveform into non-overlapping analysis frames, dropping the incomplete last frame.
+
+        :param waveform: Audio samples in the range [-1.0, 1.0].
+        :type waveform: numpy.ndarray
+        :return: A [frames, frame_length] view of the waveform.
+        :rtype: numpy.ndarray
+        """
+        waveform = np.asarray(waveform, dtype=np.float32).reshape(-1)
+        count = len(waveform) // self.frame_length
+        return waveform[:count * self.frame_length].reshape(count, self.frame_length)
+
+    def features(self, waveform):
+        """
+        Computes the energy of the loudest frame and the peak spectral flux of an audio window.
+
+        :param waveform: Audio samples in the range [-1.0, 1.0].
+        :type waveform: numpy.ndarray
+        :return: The peak frame energy in dBFS and the peak spectral flux in dB, -inf for digital silence.
+        :rtype: tuple[float, float]
+        """
+        frames = self.frames(waveform)
+        if len(frames) == 0:
+            return rms_dbfs(waveform), float('-inf')
+
+        peak_energy = float(np.max(np.einsum('ij,ij->i', frames, frames))) / self.frame_length
+        if len(frames) < 2:
+            peak_flux = 0.0
+        else:
+            spectrum = np.abs(np.fft.rfft(frames * self._window, axis=1)) * self._scale
+            peak_flux = float(np.max(np.sum(np.maximum(np.diff(spectrum, axis=0), 0), axis=1)))
+
+        with np.errstate(divide='ignore'):
+            return float(10 * np.log10(peak_energy)), float(20 * np.log10(peak_flux))
+
+    def check(self, waveform):
+        """
+        Checks whether the audio window should be classified.
+
+        :param waveform: Audio samples in the range [-1.0, 1.0].
+        :type waveform: numpy.ndarray
+        :return: True if the window is above the energy or the spectral flux threshold.
+        :rtype: bool
+        """
+        energy, flux = self.features(waveform)
+        return energy >= self.threshold or flux >= self.flux_threshold
+
+
+class MotionDetector:
+    """
+        Cheap motion detection stage deciding whether a video frame is worth classifying.
+
+        Frames are downscaled and converted to grayscale into preallocated buffers, and the motion score is the mean
+        absolute difference of pixel intensities (0 to 255) between a frame and the previous one. Static frames are
+        skipped, except every ``keep_warm`` seconds so the model keeps following the scene. After ``idle_reset``
+        seconds without motion ``on_idle`` is called once, e.g. to clear the streaming states of the classifier.
+
+        :arg threshold (float): Motion score under which a frame is considered static.
+        :arg size (tuple): Width and height of the images compared.
+        :arg keep_warm (float): Maximum interval, in seconds, between two classified frames.
+        :arg idle_reset (float): Seconds without motion after which ``on_idle`` is called.
+        :arg on_idle (callable): Callback called once per idle period.
+    """
+
+    def __init__(self, threshold=1.0, size=(64, 48), keep_warm=5.0, idle_reset=60.0, on_idle=None):
+        """
+            Initializes an instance of the MotionDetector class.
+
+            :param threshold: Motion score under which a frame is considered static.
+            :type threshold: float
+            :param size: Width and height of the images compared.
+            :type size: tuple[int, int]
+            :param keep_warm: Maximum interval, in seconds, between two classified frames.
+            :type keep_warm: float
+            :param idle_reset: Seconds without motion after which ``on_idle`` is called.
+            :type idle_reset: float
+            :param on_idle: Callback called once per idle period.
+            :type on_idle: callable
+        """
+        self.threshold = threshold
+        self.size = size
+        self.keep_warm = keep_warm
+        self.idle_reset = idle_reset
+        self.on_idle = on_idle
+
+        width, height = size
+        self._small = np.zeros((height, width, 3), dtype=np.uint8)
+        self._gray = [np.zeros((height, width), dtype=np.uint8), np.zeros((height, width), dtype=np.uint8)]
+        self._diff = np.zeros((height, width), dtype=np.uint8)
+        self._current = 0
+        self._has_previous = False
+
+        self.last_motion_time = None
+        self.last_pass_time = None
+        self.idle = False
+
+    def score(self, frame):
+        """
+        Computes the motion score of a BGR frame against the previous frame given to the detector.
+
+        :param frame: A [height, width, 3] BGR frame.
+        :type frame: numpy.ndarray
+        :return: The motion score, infinite for the first frame.
+        :rtype: float
+        """
+        current, previous = self._gray[self._current], self._gray[1 - self._current]
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=current)
+        self._current = 1 - self._current
+
+        if not self._has_previous:
+            self._has_previous = True
+            return float('inf')
+
+        cv2.absdiff(current, previous, dst=self._diff)
+        return cv2.mean(self._diff)[0]
+
+    def check(self, frame, timestamp=None):
+        """
+        Checks whether the video frame should be classified.
+
+        :param frame: A [height, width, 3] BGR frame.
+        :type frame: numpy.ndarray
+        :param timestamp: Monotonic capture time of the frame, defaults to now.
+        :type timestamp: float
+        :return: True if the frame moved more than the threshold or the keep-warm interval elapsed.
+        :rtype: bool
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        moved = self.score(frame) >= self.threshold
+        if moved:
+            self.last_motion_time = now
+            self.idle = False
+        elif not self.idle and self.last_motion_time is not None and now - self.last_motion_time >= self.idle_reset:
+            self.idle = True
+            if self.on_idle is not None:
+                self.on_idle()
+
+        warm = self.last_pass_time is not None and now - self.last_pass_time < self.keep_warm
+        if moved or not warm:
+            self.last_pass_time = now
+            return True
+        return False
@@ -0,0 +1,246 @@
+import logging
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+from EdgeDevice.CaptureService.audio import AudioFileStream, MicrophoneAudioStream, samples
+from EdgeDevice.CaptureService.queues import BoundedQueue, DropPolicy, capture_source
+from EdgeDevice.CaptureService.ring import SharedFrameRing
+from EdgeDevice.CaptureService.video import WebcamVideoStream
+from EdgeDevice.utils.helper import InferenceUtils, increment, models
+
+CAPTURE = 'CAPTURE'
+DISPATCH = 'DISPATCH'
+NETWORK = 'NETWORK'
+
+
+def capture_worker(sources, rings, out_q, stop_event, counter=None, queue_size=8):
+    """
+    Captures the audio and video sources of the pipeline, writing the data to the shared frame rings and their
+    tickets to the output queue until the stop event is set.
+
+    The capture threads feed a local KEEP_LATEST queue, so they never wait for the rest of the pipeline: when the
+    inference processes fall behind, the output queue fills up and only the latest window and frame are kept. Items
+    are put in the output queue with a timeout, so a full queue doesn't keep the capture from seeing the stop event.
+
+    :param sources: The source of each data type, a device index or a file path.
+    :type sources: dict[str, int or str]
+    :param rings: The shared frame ring of each data type.
+    :type rings: dict[str, SharedFrameRing]
+    :param out_q: The queue of the dispatch stage.
+    :type out_q: multiprocessing.Queue
+    :param stop_event: Event stopping the capture.
+    :type stop_event: multiprocessing.Event
+    :param counter: Optional shared counter of the captured items.
+    :type counter: multiprocessing.Value
+    :param queue_size: Size of the local capture queue.
+    :type queue_size: int
+    :return: None
+    """
+    in_q = BoundedQueue(queue_size, DropPolicy.KEEP_LATEST, key=capture_source)
+    streams = []
+    if 'audio' in sources:
+        source = sources['audio']
+        if isinstance(source, str):
+            streams.append(AudioFileStream(source, in_q, ring=rings['audio']))
+        else:
+            streams.append(MicrophoneAudioStream(source, in_q, ring=rings['audio']))
+    if 'video' in sources:
+        source = sources['video']
+        height, width = rings['video'].shape[:2]
+        stream = WebcamVideoStream(source, width, height, in_q, loop=isinstance(source, str), ring=rings['video'])
+        if stream.found:
+            streams.append(stream)
+
+    for stream in streams:
+        stream.start()
+
+    while not stop_event.is_set():
+        try:
+            item = in_q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        while not stop_event.is_set():
+            try:
+                out_q.put(item, timeout=0.5)
+            except queue.Full:
+                continue
+            increment(counter)
+            break
+
+    for stream in streams:
+        stream.stop()
+    out_q.put(None)
+
+
+class InferencePipeline:
+    """
+        Multiprocess pipeline running the capture, each inference model and the network publishing in separate
+        processes, so the audio and video models use separate cores instead of sharing one under the GIL.
+
+        The stages are the ``InferenceUtils`` workers connected by bounded queues: the capture process writes the
+        audio windows and video frames once to shared frame rings, the dispatch process fans their tickets out to the
+        queue of every model, a configurable number of inference processes per model classify them in place, and the
+        network process publishes the predictions. The video models classify the frames of the stream in order, at
+        their frame rate, so a video model runs a single process whatever its configured worker count. Processes are
+        started with ``spawn``, as the TFLite and OpenCV thread pools don't survive a fork, so the pipeline must be
+        started from a ``__main__`` guarded script.
+
+        :arg sources (dict): The source of each data type, a device index or a file path.
+        :arg model_configs (dict): The models of each data type, see ``helper.models``.
+        :arg workers (dict): Number of inference processes of each model.
+        :arg ring_slots (int): Number of slots of each shared frame ring.
+    """
+
+    def __init__(self, audio_source=0, video_source=None, workers=None, width=640, height=480, queue_size=8,
+                 ring_slots=None, publish=None, model_configs=None):
+        """
+            Initializes an instance of the InferencePipeline class.
+
+            :param audio_source: Microphone device index or audio file path, None to disable the audio models.
+            :type audio_source: int or str
+            :param video_source: Webcam index, video file path or URL, None to disable the video models.
+            :type video_source: int or str
+            :param workers: Number of inference processes of each audio model, by model name, defaults to one. The video
+                            models always run in one process.
+            :type workers: dict[str, int]
+            :param width: Width of the video frames.
+            :type width: int
+            :param height: Height of the video frames.
+            :type height: int
+            :param queue_size: Maximum number of items waiting in each queue between two stages.
+            :type queue_size: int
+            :param ring_slots: Number of slots of each shared frame ring, defaults to enough slots for all the items
+                               that can wait in the queues.
+            :type ring_slots: int
+            :param publish: Optional picklable callable publishing each prediction, they are logged otherwise.
+            :type publish: callable
+            :param model_configs: The models of each data type, defaults to ``helper.models``. The model classes must
+                                  be importable by the spawned processes.
+            :type model_configs: dict[str, list[dict]]
+        """
+        self.sources = {data_type: source for data_type, source in (('audio', audio_source), ('video', video_source))
+                        if source is not None}
+        self.model_configs = model_configs or models
+        # the frames of a video stream depend on each other through the streaming states, one process sees them all
+        self.workers = {model['name']: 1 if data_type == 'video' else (workers or {}).get(model['name'], 1)
+                        for data_type in self.sources for model in self.model_configs[data_type]}
+        self.shapes = {'audio': ((samples,), np.float32), 'video': ((height, width, 3), np.uint8)}
+        self.queue_size = queue_size
+        self.ring_slots = ring_slots or queue_size * (len(self.workers) + 2)
+        self.publish = publish
+        self.context = multiprocessing.get_context('spawn')
+        self.processes = {}
+        self.rings = {}
+        self.counters = {}
+        self.last_stats = None
+
+    def start(self):
+        """
+        Creates the shared frame rings and queues, and starts the processes of every stage.
+
+        :return: self object
+        """
+        context = self.context
+        self.rings = {data_type: SharedFrameRing(*self.shapes[data_type], slots=self.ring_slots)
+                      for data_type in self.sources}
+        self.stop_event = context.Event()
+        self.capture_q = context.Queue(self.queue_size)
+        self.model_qs = {name: context.Queue(self.queue_size) for name in self.workers}
+        self.network_q = context.Queue()
+        self.counters = {stage: context.Value('Q', 0) for stage in [CAPTURE, DISPATCH, *self.workers, NETWORK]}
+
+        utils = InferenceUtils()
+        self.processes = {
+            CAPTURE: [context.Process(target=capture_worker, name=CAPTURE, daemon=True,
+                                      args=(self.sources, self.rings, self.capture_q, self.stop_event,
+                                            self.counters[CAPTURE], self.queue_size))],
+            DISPATCH: [context.Process(target=utils.data_processing_worker, name=DISPATCH, daemon=True,
+                                       args=(self.capture_q, self.model_qs, self.counters[DISPATCH],
+                                             self.model_configs))],
+            NETWORK: [context.Process(target=utils.network_worker, name=NETWORK, daemon=True,
+                                      args=(self.network_q, self.publish, self.counters[NETWORK]))],
+        }
+        for name, count in self.workers.items():
+            self.processes[name] = [
+                context.Process(target=utils.inference_worker, name=f'{name}-{i}', daemon=True,
+                                args=(self.model_qs[name], self.network_q, self.rings, [name], self.counters[name],
+                                      self.model_configs))
+                for i in range(count)]
+
+        # Start the consumers first, so the capture doesn't fill the queues while the models are loading.
+        for stage in [NETWORK, *self.workers, DISPATCH, CAPTURE]:
+            for process in self.processes[stage]:
+                process.start()
+
+        self.last_stats = (time.monotonic(), {stage: 0 for stage in self.counters})
+        logging.info(f"[PIPELINE] Started {sum(len(p) for p in self.processes.values())} processes")
+        return self
+
+    def stats(self):
+        """
+        Reports the number of items processed by each stage, and its throughput since the previous call.
+
+        :return: A dictionary with the statistics of each stage, keyed by stage or model name.
+        :rtype: dict
+        """
+        now = time.monotonic()
+        counts = {stage: counter.value for stage, counter in self.counters.items()}
+        last_time, last_counts = self.last_stats or (now, counts)
+        elapsed = now - last_time
+        self.last_stats = (now, counts)
+        return {
+            stage: {
+                'ITEMS': count,
+                'RATE': round((count - last_counts[stage]) / elapsed, 2) if elapsed > 0 else 0.0,
+                'WORKERS': len(self.processes.get(stage, [])),
+            }
+            for stage, count in counts.items()
+        }
+
+    def _join(self, stage, timeout):
+        """
+        Waits for the processes of a stage to finish, terminating those still running after the timeout.
+
+        :param stage: Name of the stage.
+        :type stage: str
+        :param timeout: Seconds to wait for each process.
+        :type timeout: float
+        :return: None
+        """
+        for process in self.processes.get(stage, []):
+            process.join(timeout)
+            if process.is_alive():
+                logging.warning(f"[PIPELINE] Terminating {process.name}, still running after {timeout}s")
+                process.terminate()
+                process.join()
+
+    def stop(self, timeout=5.0):
+        """
+        Stops the pipeline gracefully: the capture stops first, and every stage finishes the items already queued
+        before the next one is told to stop, so no prediction in flight is lost.
+
+        :param timeout: Seconds to wait for each process before terminating it.
+        :type timeout: float
+        :return: None
+        """
+        self.stop_event.set()
+        self._join(CAPTURE, timeout)
+        if self.processes[CAPTURE][0].exitcode != 0:
+            self.capture_q.put(None)
+        self._join(DISPATCH, timeout)
+
+        for name, count in self.workers.items():
+            for _ in range(count):
+                self.model_qs[name].put(None)
+        for name in self.workers:
+            self._join(name, timeout)
+
+        self.network_q.put(None)
+        self._join(NETWORK, timeout)
+
+        for ring in self.rings.values():
+            ring.close()
+        logging.info(f"[PIPELINE] Stopped: {self.stats()}")
@@ -0,0 +1,260 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+from EdgeDevice.InferenceService.tuning import AutoTuner, make_interpreter
+from EdgeDevice.utils.constants import MODELS_DIRECTORY
+
+
+class ModelEntry:
+    """
+        A TFLite model loaded by the ModelRegistry.
+        :arg path (str): Absolute path of the .tflite file.
+        :arg content (bytes): Model flatbuffer shared by all interpreters, or None when the file is memory-mapped.
+        :arg size (int): Size of the model in bytes.
+        :arg load_time (float): Seconds spent loading the model and creating its first interpreter.
+        :arg memory (int): Resident memory, in bytes, added by loading the model and its first interpreter.
+        :arg interpreters (int): Number of interpreter instances created for this model.
+        :arg input_shapes (list): Input shapes the model is benchmarked with, for models with dynamic input shapes.
+    """
+
+    def __init__(self, path, content=None, input_shapes=None):
+        self.path = path
+        self.content = content
+        self.input_shapes = input_shapes
+        self.size = os.path.getsize(path)
+        self.load_time = 0.0
+        self.memory = 0
+        self.interpreters = 0
+        self.idle = {}
+
+
+class ModelRegistry:
+    """
+        Central registry of the TFLite models used by the inference consumers.
+
+        Each model is loaded once and shared by every interpreter created for it. With ``use_mmap`` the interpreters
+        are built from the file path, which TFLite memory-maps, so the weights live in the page cache and are shared
+        between interpreters and processes. Otherwise the file is read once and the same buffer is handed to every
+        interpreter. Interpreters are stateful, so they are handed out per thread (``interpreter``) or from a pool
+        (``acquire``), never shared between concurrent callers. With a ``tuner``, interpreters created without an
+        explicit thread count use the fastest thread count and XNNPACK setting measured for the model on this machine.
+    """
+
+    def __init__(self, models_dir=MODELS_DIRECTORY, use_mmap=True, tuner=None):
+        """
+            Initializes an instance of the ModelRegistry class.
+
+            :param models_dir: Directory where models referenced by name are looked up.
+            :type models_dir: str
+            :param use_mmap: Whether models are memory-mapped from disk instead of read into memory.
+            :type use_mmap: bool
+            :param tuner: Optional auto-tuner picking the interpreter configuration of each model.
+            :type tuner: AutoTuner
+        """
+        self.models_dir = models_dir
+        self.use_mmap = use_mmap
+        self.tuner = tuner
+        self.models = {}
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def resolve(self, model):
+        """
+        Resolves a model name (e.g. 'yamnet') or path (e.g. 'models/yamnet.tflite') to an absolute path.
+
+        :param model: The model name or path.
+        :type model: str
+        :return: The absolute path of the .tflite file.
+        :rtype: str
+        """
+        if os.path.exists(model):
+            return os.path.abspath(model)
+
+        filename = os.path.basename(model)
+        if not filename.endswith('.tflite'):
+            filename = f'{filename}.tflite'
+        return os.path.join(self.models_dir, filename)
+
+    def load(self, model, input_shapes=None):
+        """
+        Loads a model once, returning the already loaded entry on later calls.
+
+        :param model: The model name or path.
+        :type model: str
+        :param input_shapes: Shapes of the inputs used to tune models with dynamic input shapes.
+        :type input_shapes: list[list[int]]
+        :return: The loaded model.
+        :rtype: ModelEntry
+        """
+        path = self.resolve(model)
+        with self.lock:
+            entry = self.models.get(path)
+            if entry is not None:
+                return entry
+            loading = self.loading.setdefault(path, threading.Lock())
+
+        # The model is tuned and loaded under its own lock only, so the models already loaded stay available to the
+        # other threads meanwhile, and concurrent callers of the same model wait for a single load.
+        with loading:
+            with self.lock:
+                entry = self.models.get(path)
+                if entry is not None:
+                    return entry
+
+            # Tune the model first, on the first boot of the machine, so the benchmarks don't count in the load time.
+            if self.tuner is not None:
+                self.tuner.config(path, input_shapes)
+
+            process = psutil.Process()
+            memory_before = process.memory_info().rss
+            start = time.perf_counter()
+
+            content = None
+            if not self.use_mmap:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            entry = ModelEntry(path, content, input_shapes)
+
+            # Create and allocate the first interpreter to account for its cost and keep it for reuse.
+            interpreter = self._new_interpreter(entry, None)
+            interpreter.allocate_tensors()
+            entry.idle.setdefault(None, []).append(interpreter)
+
+            entry.load_time = time.perf_counter() - start
+            entry.memory = process.memory_info().rss - memory_before
+            with self.lock:
+                self.models[path] = entry
+                del self.loading[path]
+
+        logging.info(f"[REGISTRY] Loaded {os.path.basename(path)} in {entry.load_time:.3f}s "
+                     f"({entry.size / 1e6:.1f} MB, {'mmap' if self.use_mmap else 'in memory'})")
+        return entry
+
+    def _new_interpreter(self, entry, num_threads):
+        """
+        Creates a new interpreter instance sharing the model of the given entry. Must be called without the lock
+        held, as the tuned configuration may have to be benchmarked.
+
+        :param entry: The loaded model.
+        :type entry: ModelEntry
+        :param num_threads: Number of CPU threads of the interpreter, or None for the tuned or default configuration.
+        :type num_threads: int
+        :return: The new interpreter.
+        :rtype: Interpreter
+        """
+        xnnpack = True
+        if num_threads is None and self.tuner is not None:
+            num_threads, xnnpack = self.tuner.config(entry.path, entry.input_shapes)
+        interpreter = make_interpreter(entry.path if entry.content is None else None, entry.content, num_threads,
+                                       xnnpack)
+        with self.lock:
+            entry.interpreters += 1
+        return interpreter
+
+    def create_interpreter(self, model, num_threads=None):
+        """
+        Hands out an interpreter owned by the caller, reusing an idle one when available.
+
+        :param model: The model name or path.
+        :type model: str
+        :param num_threads: Number of CPU threads of the interpreter, or None for the default.
+        :type num_threads: int
+        :return: An interpreter that is not used by anyone else.
+        :rtype: Interpreter
+        """
+        entry = self.load(model)
+        with self.lock:
+            idle = entry.idle.get(num_threads)
+            if idle:
+                return idle.pop()
+        return self._new_interpreter(entry, num_threads)
+
+    def release(self, model, interpreter, num_threads=None):
+        """
+        Returns an interpreter obtained from ``create_interpreter`` so it can be handed out again.
+
+        :param model: The model name or path.
+        :type model: str
+        :param interpreter: The interpreter no longer used by the caller.
+        :type interpreter: Interpreter
+        :param num_threads: Number of CPU threads the interpreter was created with.
+        :type num_threads: int
+        :return: None
+        """
+        entry = self.load(model)
+        with self.lock:
+            entry.idle.setdefault(num_threads, []).append(interpreter)
+
+    @contextmanager
+    def acquire(self, model, num_threads=None):
+        """
+        Borrows an interpreter from the pool of the model for the duration of a ``with`` block.
+
+        :param model: The model name or path.
+        :type model: str
+        :param num_threads: Number of CPU threads of the interpreter, or None for the default.
+        :type num_threads: int
+        :return: The borrowed interpreter.
+        :rtype: Interpreter
+        """
+        interpreter = self.create_interpreter(model, num_threads)
+        try:
+            yield interpreter
+        finally:
+            self.release(model, interpreter, num_threads)
+
+    def interpreter(self, model, num_threads=None):
+        """
+        Returns the interpreter of the model dedicated to the calling thread.
+
+        :param model: The model name or path.
+        :type model: str
+        :param num_threads: Number of CPU threads of the interpreter, or None for the default.
+        :type num_threads: int
+        :return: The interpreter of the calling thread.
+        :rtype: Interpreter
+        """
+        interpreters = getattr(self.local, 'interpreters', None)
+        if interpreters is None:
+            interpreters = self.local.interpreters = {}
+
+        key = (self.resolve(model), num_threads)
+        interpreter = interpreters.get(key)
+        if interpreter is None:
+            interpreter = interpreters[key] = self.create_interpreter(model, num_threads)
+        return interpreter
+
+    def stats(self):
+        """
+        Reports the load time, size, memory and number of interpreters of every loaded model.
+
+        :return: A dictionary with the statistics of each model, keyed by model file name.
+        :rtype: dict
+        """
+        with self.lock:
+            entries = list(self.models.items())
+            stats = {
+                os.path.basename(path): {
+                    'LOAD_TIME': round(entry.load_time, 4),
+                    'SIZE': entry.size,
+                    'MEMORY': entry.memory,
+                    'INTERPRETERS': entry.interpreters,
+                    'MMAP': entry.content is None,
+                }
+                for path, entry in entries
+            }
+
+        if self.tuner is not None:
+            for path, entry in entries:
+                num_threads, xnnpack = self.tuner.config(path, entry.input_shapes)
+                stats[os.path.basename(path)].update({'NUM_THREADS': num_threads, 'XNNPACK': xnnpack})
+        return stats
+
+
+registry = ModelRegistry(tuner=AutoTuner())
@@ -0,0 +1,321 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from EdgeDevice.CaptureService.queues import BoundedQueue, DropPolicy, capture_source
+from EdgeDevice.CaptureService.video import WebcamVideoStream
+from EdgeDevice.InferenceService.video import VideoClassifier, VideoClassifierOptions
+
+
+class VideoStreamState:
+    """
+        Per stream bookkeeping of the VideoInferenceServer.
+        :arg name (str): Name of the video stream.
+        :arg states (dict): MoViNet streaming states of this stream.
+        :arg frame (numpy.ndarray): Latest frame waiting to be classified, or None.
+        :arg timestamp (float): Monotonic capture time of the waiting frame.
+        :arg busy (bool): Whether a frame of this stream is being classified.
+        :arg generation (int): Number of times the states were cleared, so the states computed from a frame classified
+                               before a clear are dropped instead of undoing it.
+        :arg categories (list): Latest classification result of this stream.
+    """
+
+    def __init__(self, name, states, fps_window=30):
+        self.name = name
+        self.states = states
+        self.frame = None
+        self.timestamp = None
+        self.busy = False
+        self.generation = 0
+        self.categories = []
+        self.last_inference_time = 0
+        self.frames_received = 0
+        self.frames_classified = 0
+        self.frames_replaced = 0
+        self.inference_times = deque(maxlen=fps_window)
+
+    def fps(self):
+        """
+        Computes the classification rate of the stream over the latest inferences.
+
+        :return: The number of frames classified per second.
+        :rtype: float
+        """
+        if len(self.inference_times) < 2:
+            return 0.0
+        elapsed = self.inference_times[-1] - self.inference_times[0]
+        return (len(self.inference_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+
+class VideoInferenceServer:
+    """
+        Classifies the frames of several video streams on a shared pool of video classifiers.
+
+        Every stream keeps its own MoViNet streaming states, while the classifiers (one TFLite interpreter each) are
+        shared: each worker thread owns one classifier and serves the streams in round-robin order, so that N cameras
+        don't need N interpreters. Only the latest frame of each stream is kept, and frames are fed to the model at
+        ``model_fps`` frames per second per stream, as required by the model specs.
+
+        :arg pool_size (int): Number of classifiers (and worker threads) in the pool.
+        :arg num_threads (int): Number of CPU threads used by each classifier.
+        :arg in_q (BoundedQueue): Queue where the video streams put their frames, keeping the latest of each stream.
+    """
+
+    def __init__(self, model, labels, options=VideoClassifierOptions(), pool_size=None, model_fps=5,
+                 model_fps_error_range=0.1, on_result=None):
+        """
+            Initializes an instance of the VideoInferenceServer class.
+
+            :param model: Path of the TFLite video classification model.
+            :type model: str
+            :param labels: Path of the video classification label list.
+            :type labels: str
+            :param options: The config of the video classifiers. ``num_threads`` is tuned to the core count.
+            :type options: VideoClassifierOptions
+            :param pool_size: Number of classifiers in the pool, defaults to half the CPU cores.
+            :type pool_size: int
+            :param model_fps: Frames per second fed to the model for each stream.
+            :type model_fps: int
+            :param model_fps_error_range: Tolerated error on the model frame rate.
+            :type model_fps_error_range: float
+            :param on_result: Optional callback called after each inference with the stream name, the categories, the
+                              probabilities of every label and the capture timestamp of the frame.
+            :type on_result: callable
+        """
+        cores = os.cpu_count() or 1
+        self.pool_size = pool_size or max(1, cores // 2)
+        self.num_threads = max(1, cores // self.pool_size)
+        options = options._replace(num_threads=self.num_threads)
+
+        self.classifiers = [VideoClassifier(model, labels, options) for _ in range(self.pool_size)]
+        self.model_fps = model_fps
+        self.model_fps_error_range = model_fps_error_range
+        self.on_result = on_result
+        self.in_q = BoundedQueue(64, DropPolicy.KEEP_LATEST, key=capture_source, name='VIDEO_SERVER')
+        self.running = False
+        self.sources = {}
+        self.streams = {}
+        self.order = []
+        self.next_stream = 0
+        self.condition = threading.Condition()
+        self.threads = []
+
+    def add_stream(self, name, src, width=640, height=480, loop=False):
+        """
+        Opens a video source and registers it in the server.
+
+        :param name: Name identifying the stream, e.g. the camera room.
+        :type name: str
+        :param src: Video source (device index, file path or URL).
+        :type src: int or str
+        :param width: Capture width.
+        :type width: int
+        :param height: Capture height.
+        :type height: int
+        :param loop: Whether a video file is replayed from the start when it ends.
+        :type loop: bool
+        :return: The video stream, or None if the source is not available.
+        :rtype: WebcamVideoStream
+        """
+        source = WebcamVideoStream(src, width, height, self.in_q, name, loop=loop)
+        if not source.found:
+            logging.error(f"[VIDEO SERVER] Source {src} of stream {name} is not available")
+            return None
+
+        self.register_stream(name)
+        self.sources[name] = source
+        if self.running:
+            source.start()
+        return source
+
+    def register_stream(self, name):
+        """
+        Registers a stream fed through ``submit`` or ``in_q``, creating its initial MoViNet states.
+
+        :param name: Name identifying the stream.
+        :type name: str
+        :return: None
+        """
+        with self.condition:
+            if name not in self.streams:
+                self.streams[name] = VideoStreamState(name, self.classifiers[0].init_states())
+                self.order.append(name)
+
+    def submit(self, name, frame, timestamp=None):
+        """
+        Sets the latest BGR frame of a stream, replacing any frame still waiting to be classified.
+
+        :param name: Name of the stream.
+        :type name: str
+        :param frame: A [height, width, 3] BGR frame.
+        :type frame: numpy.ndarray
+        :param timestamp: Monotonic capture time of the frame, defaults to now.
+        :type timestamp: float
+        :return: None
+        """
+        if frame is None:
+            return
+        if name not in self.streams:
+            self.register_stream(name)
+
+        with self.condition:
+            stream = self.streams[name]
+            if stream.frame is not None:
+                stream.frames_replaced += 1
+            stream.frame = frame
+            stream.timestamp = time.monotonic() if timestamp is None else timestamp
+            stream.frames_received += 1
+            self.condition.notify()
+
+    def start(self):
+        """
+        Starts the video sources, the frame collector and one worker thread per classifier.
+
+        :return: self object
+        """
+        self.running = True
+        self.threads = [threading.Thread(target=self.collect, daemon=True)]
+        self.threads += [threading.Thread(target=self.serve, args=(classifier,), daemon=True)
+                         for classifier in self.classifiers]
+        for thread in self.threads:
+            thread.start()
+        for source in self.sources.values():
+            source.start()
+        return self
+
+    def collect(self):
+        """
+        Moves the frames put by the video sources in ``in_q`` to their streams.
+
+        :return: None
+        """
+        while self.running:
+            try:
+                item = self.in_q.get(timeout=1)
+            except queue.Empty:
+                continue
+            self.submit(item.get('source', 'default'), item['data'], item.get('timestamp'))
+
+    def next_ready_stream(self):
+        """
+        Picks, in round-robin order, the next stream with a frame due for classification. Must be called with the
+        condition held.
+
+        :return: The stream to classify and the time to wait for the next due frame if there is none.
+        :rtype: tuple[VideoStreamState, float]
+        """
+        now = time.monotonic()
+        wait = 1.0
+        for offset in range(len(self.order)):
+            index = (self.next_stream + offset) % len(self.order)
+            stream = self.streams[self.order[index]]
+            if stream.frame is None or stream.busy:
+                continue
+
+            due = stream.last_inference_time + (1 - self.model_fps_error_range) / self.model_fps
+            if now >= due:
+                self.next_stream = index + 1
+                return stream, 0
+            wait = min(wait, due - now)
+        return None, wait
+
+    def serve(self, classifier):
+        """
+        Worker loop classifying the frames of every stream on the given classifier.
+
+        :param classifier: The classifier owned by this worker.
+        :type classifier: VideoClassifier
+        :return: None
+        """
+        while self.running:
+            with self.condition:
+                stream, wait = self.next_ready_stream()
+                if stream is None:
+                    self.condition.wait(timeout=wait)
+                    continue
+                frame, stream.frame = stream.frame, None
+                timestamp, states, generation = stream.timestamp, stream.states, stream.generation
+                stream.busy = True
+                stream.last_inference_time = time.monotonic()
+
+            try:
+                categories, states = classifier.classify_stream(frame, states, bgr=True)
+                probabilities = classifier.probabilities
+            except Exception as e:
+                logging.error(f"[VIDEO SERVER] Error classifying stream {stream.name}: {e.args}")
+                categories, states, probabilities = stream.categories, stream.states, None
+
+            with self.condition:
+                # a clear() during the inference wins over the states computed from the previous scene
+                if stream.generation == generation:
+                    stream.states = states
+                stream.categories = categories
+                stream.frames_classified += 1
+                stream.inference_times.append(time.monotonic())
+                stream.busy = False
+                self.condition.notify()
+
+            if self.on_result is not None and probabilities is not None:
+                self.on_result(stream.name, categories, probabilities, timestamp)
+
+    def results(self, name):
+        """
+        Returns the latest classification result of a stream.
+
+        :param name: Name of the stream.
+        :type name: str
+        :return: The latest categories, sorted by probability descending.
+        :rtype: list[Category]
+        """
+        with self.condition:
+            return list(self.streams[name].categories)
+
+    def clear(self, name):
+        """
+        Resets the MoViNet states of a stream, to start classifying a new scene. A frame of the stream being classified
+        meanwhile doesn't bring the previous states back.
+
+        :param name: Name of the stream.
+        :type name: str
+        :return: None
+        """
+        with self.condition:
+            stream = self.streams[name]
+            stream.states = self.classifiers[0].init_states()
+            stream.generation += 1
+
+    def stats(self):
+        """
+        Reports the classification rate and frame counters of every stream.
+
+        :return: A dictionary with the statistics of each stream, keyed by stream name.
+        :rtype: dict
+        """
+        with self.condition:
+            return {
+                name: {
+                    'FPS': round(stream.fps(), 2),
+                    'RECEIVED': stream.frames_received,
+                    'CLASSIFIED': stream.frames_classified,
+                    'REPLACED': stream.frames_replaced,
+                }
+                for name, stream in self.streams.items()
+            }
+
+    def stop(self):
+        """
+        Stops the video sources and the worker threads.
+
+        :return: None
+        """
+        self.running = False
+        for source in self.sources.values():
+            if source.running:
+                source.stop()
+        with self.condition:
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
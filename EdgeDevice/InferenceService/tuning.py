@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+
+from EdgeDevice.utils.constants import MODELS_DIRECTORY
+
+try:
+    # Import TFLite interpreter from tflite_runtime package if it's available.
+    from tflite_runtime.interpreter import Interpreter, OpResolverType
+except ImportError:
+    # If not, fallback to use the TFLite interpreter from the full TF package.
+    import tensorflow as tf
+
+    Interpreter = tf.lite.Interpreter
+    OpResolverType = tf.lite.experimental.OpResolverType
+
+TUNING_FILE = os.path.join(MODELS_DIRECTORY, 'tuning.json')
+
+
+def make_interpreter(model_path=None, model_content=None, num_threads=None, xnnpack=True):
+    """
+    Creates a TFLite interpreter, with or without the XNNPACK delegate TFLite applies by default on CPU.
+
+    :param model_path: Path of the .tflite file, memory-mapped by TFLite.
+    :type model_path: str
+    :param model_content: Model flatbuffer, used instead of the path when given.
+    :type model_content: bytes
+    :param num_threads: Number of CPU threads of the interpreter, or None for the default.
+    :type num_threads: int
+    :param xnnpack: Whether the XNNPACK delegate is applied.
+    :type xnnpack: bool
+    :return: The interpreter, tensors not allocated yet.
+    :rtype: Interpreter
+    """
+    resolver = OpResolverType.AUTO if xnnpack else OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    if model_content is not None:
+        return Interpreter(model_content=model_content, num_threads=num_threads,
+                           experimental_op_resolver_type=resolver)
+    return Interpreter(model_path=model_path, num_threads=num_threads, experimental_op_resolver_type=resolver)
+
+
+def machine_id():
+    """
+    Identifies the machine the tuning results were measured on.
+
+    :return: The host name, architecture and core count of the machine.
+    :rtype: str
+    """
+    return f'{platform.node()}-{platform.machine()}-{os.cpu_count()}'
+
+
+def benchmark(model_path, num_threads, xnnpack, input_shapes=None, runs=20, warmup=3):
+    """
+    Measures the median invoke latency of a model with a given configuration, on zero inputs.
+
+    :param model_path: Path of the .tflite file.
+    :type model_path: str
+    :param num_threads: Number of CPU threads of the interpreter.
+    :type num_threads: int
+    :param xnnpack: Whether the XNNPACK delegate is applied.
+    :type xnnpack: bool
+    :param input_shapes: Shapes of the inputs, in input order, for models with dynamic input shapes.
+    :type input_shapes: list[list[int]]
+    :param runs: Number of timed invocations.
+    :type runs: int
+    :param warmup: Number of untimed invocations before the timed ones.
+    :type warmup: int
+    :return: The median latency in seconds.
+    :rtype: float
+    """
+    interpreter = make_interpreter(model_path, num_threads=num_threads, xnnpack=xnnpack)
+    inputs = interpreter.get_input_details()
+    for i, details in enumerate(inputs):
+        if input_shapes is not None and i < len(input_shapes):
+            interpreter.resize_tensor_input(details['index'], input_shapes[i], strict=True)
+    interpreter.allocate_tensors()
+    for details in interpreter.get_input_details():
+        interpreter.set_tensor(details['index'], np.zeros(details['shape'], dtype=details['dtype']))
+
+    for _ in range(warmup):
+        interpreter.invoke()
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        interpreter.invoke()
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies))
+
+
+class AutoTuner:
+    """
+        Picks the fastest interpreter configuration of each model on this machine.
+
+        The first time a model is used on a machine, it is benchmarked with every thread count up to the number of
+        cores (powers of two, and the core count itself), with and without XNNPACK, and the fastest configuration is
+        persisted in a JSON file, keyed by machine and model file name, so later boots reuse it without benchmarking.
+
+        :arg path (str): Path of the JSON file holding the tuning results.
+        :arg results (dict): Best configuration of each model, by machine.
+    """
+
+    def __init__(self, path=TUNING_FILE, runs=20):
+        """
+            Initializes an instance of the AutoTuner class.
+
+            :param path: Path of the JSON file holding the tuning results.
+            :type path: str
+            :param runs: Number of timed invocations of each configuration.
+            :type runs: int
+        """
+        self.path = path
+        self.runs = runs
+        self.lock = threading.Lock()
+        self.tuning = {}
+        self.results = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.results = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"[TUNING] Ignoring unreadable tuning results {path}: {e}")
+
+    @staticmethod
+    def candidates(cores=None):
+        """
+        Lists the configurations benchmarked on a machine.
+
+        :param cores: Number of CPU cores, defaults to the cores of this machine.
+        :type cores: int
+        :return: The (num_threads, xnnpack) configurations.
+        :rtype: list[tuple[int, bool]]
+        """
+        cores = cores or os.cpu_count() or 1
+        threads = sorted({2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores} | {cores})
+        return [(num_threads, xnnpack) for xnnpack in (True, False) for num_threads in threads]
+
+    def config(self, model_path, input_shapes=None):
+        """
+        Returns the fastest configuration of a model on this machine, benchmarking it the first time.
+
+        :param model_path: Path of the .tflite file.
+        :type model_path: str
+        :param input_shapes: Shapes of the inputs, for models with dynamic input shapes.
+        :type input_shapes: list[list[int]]
+        :return: The number of threads and whether XNNPACK is applied.
+        :rtype: tuple[int, bool]
+        """
+        machine, model = machine_id(), os.path.basename(model_path)
+        with self.lock:
+            result = self.results.get(machine, {}).get(model)
+            if result is not None:
+                return result['NUM_THREADS'], result['XNNPACK']
+            tuning = self.tuning.setdefault(model, threading.Lock())
+
+        # The model is benchmarked under its own lock only, so the configurations of the other models stay available
+        # meanwhile, and concurrent callers of the same model wait for a single benchmark.
+        with tuning:
+            with self.lock:
+                result = self.results.get(machine, {}).get(model)
+            if result is None:
+                result = self.tune(model_path, input_shapes)
+                with self.lock:
+                    self.results.setdefault(machine, {})[model] = result
+                    self.tuning.pop(model, None)
+                    self.save()
+        return result['NUM_THREADS'], result['XNNPACK']
+
+    def tune(self, model_path, input_shapes=None):
+        """
+        Benchmarks every candidate configuration of a model.
+
+        :param model_path: Path of the .tflite file.
+        :type model_path: str
+        :param input_shapes: Shapes of the inputs, for models with dynamic input shapes.
+        :type input_shapes: list[list[int]]
+        :return: The fastest configuration and its latency.
+        :rtype: dict
+        """
+        latencies = {}
+        for num_threads, xnnpack in self.candidates():
+            try:
+                latencies[(num_threads, xnnpack)] = benchmark(model_path, num_threads, xnnpack, input_shapes,
+                                                              self.runs)
+            except (RuntimeError, ValueError) as e:
+                logging.warning(f"[TUNING] {os.path.basename(model_path)} failed with {num_threads} threads "
+                                f"(XNNPACK {xnnpack}): {e}")
+
+        if not latencies:
+            return {'NUM_THREADS': None, 'XNNPACK': True, 'LATENCY': None}
+
+        (num_threads, xnnpack), latency = min(latencies.items(), key=lambda item: item[1])
+        logging.info(f"[TUNING] {os.path.basename(model_path)}: {num_threads} threads, XNNPACK {xnnpack}, "
+                     f"{latency * 1000:.2f}ms")
+        return {'NUM_THREADS': num_threads, 'XNNPACK': xnnpack, 'LATENCY': round(latency, 6)}
+
+    def save(self):
+        """
+        Persists the tuning results. Must be called with the lock held.
+
+        :return: None
+        """
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self.results, f, indent=2)
+        except OSError as e:
+            logging.warning(f"[TUNING] Could not save the tuning results to {self.path}: {e}")
@@ -1,17 +1,12 @@
+import os
 import time
 import cv2
 import numpy as np
 
-from typing import List, NamedTuple
+from typing import Dict, List, NamedTuple, Tuple
 
-try:
-    # Import TFLite interpreter from tflite_runtime package if it's available.
-    from tflite_runtime.interpreter import Interpreter
-except ImportError:
-    # If not, fallback to use the TFLite interpreter from the full TF package.
-    import tensorflow as tf
-
-    Interpreter = tf.lite.Interpreter
+from EdgeDevice.InferenceService.cache import file_key
+from EdgeDevice.InferenceService.registry import registry
 
 
 class VideoClassifierOptions(NamedTuple):
@@ -26,8 +21,8 @@ class VideoClassifierOptions(NamedTuple):
     max_results: int = 5
     """The maximum number of top-scored classification results to return."""
 
-    num_threads: int = 1
-    """The number of CPU threads to be used."""
+    num_threads: int = None
+    """The number of CPU threads to be used, None for the configuration tuned for the model on this machine."""
 
     score_threshold: float = 0.0
     """The score threshold of classification results to return."""
@@ -64,8 +59,9 @@ class VideoClassifier(object):
             ValueError: If the TFLite model is invalid.
         """
 
-        interpreter = Interpreter(
-            model_path=model_path, num_threads=options.num_threads)
+        # Each classifier owns its interpreter (it holds the streaming states), but the model itself is loaded once
+        # and shared through the registry.
+        interpreter = registry.create_interpreter(model_path, num_threads=options.num_threads)
         signature = interpreter.get_signature_runner()
 
         # Load the label list.
@@ -74,13 +70,27 @@ class VideoClassifier(object):
             label_list = [line.replace('\n', '') for line in lines]
             self._label_list = label_list
 
+        # Probabilities of every label for the last classified frame.
+        self.probabilities = np.zeros(len(label_list), dtype=np.float32)
+
+        # Precompile the allow and deny lists into a mask of the labels that may be returned.
+        self._label_mask = np.ones(len(label_list), dtype=bool)
+        if options.label_deny_list is not None:
+            deny_list = set(options.label_deny_list)
+            self._label_mask &= np.array([label not in deny_list for label in label_list], dtype=bool)
+        if options.label_allow_list is not None:
+            allow_list = set(options.label_allow_list)
+            self._label_mask &= np.array([label in allow_list for label in label_list], dtype=bool)
+
         # Remove the batch dimension to get the real input shape.
-        input_shape = signature.get_input_details()[
-            self._MODEL_INPUT_SIGNATURE_NAME]['shape']
+        input_details = signature.get_input_details()[self._MODEL_INPUT_SIGNATURE_NAME]
+        input_shape = input_details['shape']
         input_shape = np.delete(input_shape, np.where(input_shape == 1))
         self._input_height = input_shape[0]
         self._input_width = input_shape[1]
 
+        self._allocate_input(input_details['shape'], input_details['dtype'], input_details['quantization'])
+
         # Store the signature runner and model options for later use.
         self._signature = signature
         self._options = options
@@ -91,7 +101,15 @@ class VideoClassifier(object):
 
     def clear(self):
         """Clear the internal state of the model to start classifying a new scene."""
-        # Create the initial (zero) states
+        # Store the model's internal state.
+        self._internal_states = self.init_states()
+
+    def init_states(self) -> Dict[str, np.ndarray]:
+        """Create the initial (zero) streaming states of the model.
+
+        Returns:
+            A dict with one zero array per model state input.
+        """
         init_states = {
             name: np.zeros(signature['shape'], dtype=signature['dtype'])
             for name, signature in self._signature.get_input_details().items()
@@ -100,41 +118,176 @@ class VideoClassifier(object):
         # Remove the holder for the input image as it'll be fed by the caller.
         init_states.pop(self._MODEL_INPUT_SIGNATURE_NAME)
 
-        # Store the model's internal state.
-        self._internal_states = init_states
+        return init_states
+
+    def _allocate_input(self, shape, dtype, quantization) -> None:
+        """Preallocate the buffers used by the fused preprocessing path.
+
+        Resizing, color conversion and normalization then write into the same memory on every frame instead of
+        creating temporaries.
+
+        Args:
+            shape: The shape of the model image input, with its batch dimensions.
+            dtype: The dtype of the model image input.
+            quantization: The (scale, zero_point) pair of the model image input.
+        """
+        self._input_tensor = np.zeros(shape, dtype=dtype)
+        self._input_frame = self._input_tensor.reshape(self._input_height, self._input_width, 3)
+        self._resized_frame = np.zeros((self._input_height, self._input_width, 3), dtype=np.uint8)
+        self._input_quantization = quantization
+        self._input_mode = self._select_input_mode(dtype, quantization)
+        self._scratch_frame = None
+        if self._input_mode == 'quantized':
+            self._scratch_frame = np.zeros((self._input_height, self._input_width, 3), dtype=np.float32)
+
+    def _select_input_mode(self, dtype, quantization) -> str:
+        """Pick the cheapest way of filling the model input from a uint8 frame.
+
+        Args:
+            dtype: The dtype of the model image input.
+            quantization: The (scale, zero_point) pair of the model image input.
+
+        Returns:
+            'uint8' or 'int8' when the quantized input already matches the model normalization, so the resized frame
+            can be written as is, 'quantized' for any other quantized input and 'float' otherwise.
+        """
+        if dtype not in (np.uint8, np.int8):
+            return 'float'
 
-    def _preprocess(self, image: np.ndarray) -> np.ndarray:
-        """Preprocess the image as required by the TFLite model."""
-        input_tensor = cv2.resize(image, (self._input_width, self._input_height))
-        input_tensor = input_tensor[np.newaxis, np.newaxis]
-        input_tensor = np.float32(input_tensor -
-                                  self._MODEL_INPUT_MEAN) / self._MODEL_INPUT_STD
+        scale, zero_point = quantization
+        matches_normalization = np.isclose(scale, 1 / self._MODEL_INPUT_STD)
+        if dtype == np.uint8 and matches_normalization and zero_point == self._MODEL_INPUT_MEAN:
+            return 'uint8'
+        if dtype == np.int8 and matches_normalization and zero_point == self._MODEL_INPUT_MEAN - 128:
+            return 'int8'
+        return 'quantized'
+
+    def _preprocess(self, image: np.ndarray, bgr: bool = False, flip: bool = False) -> np.ndarray:
+        """Preprocess the image as required by the TFLite model.
+
+        Resizing, BGR to RGB conversion and normalization are fused into the preallocated input tensor, which is
+        reused (and overwritten) on every call.
+
+        Args:
+            image: A [height, width, 3] image, uint8 for the fused path.
+            bgr: Whether the image channels are in BGR order, as returned by OpenCV.
+            flip: Whether the image is mirrored horizontally, which is done on the resized image so the input image
+                is never modified.
+
+        Returns:
+            The model input tensor.
+        """
+        if image.dtype != np.uint8:
+            return self._preprocess_copy(image, bgr, flip)
+
+        resized = self._resized_frame
+        if self._input_mode == 'uint8':
+            resized = self._input_frame
+
+        cv2.resize(image, (self._input_width, self._input_height), dst=resized)
+        if bgr:
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=resized)
+        if flip:
+            cv2.flip(resized, 1, dst=resized)
+
+        if self._input_mode == 'int8':
+            # Flipping the sign bit maps [0, 255] to [-128, 127], which is exactly the zero point shift.
+            np.bitwise_xor(resized, 0x80, out=self._input_frame.view(np.uint8))
+        elif self._input_mode == 'quantized':
+            scale, zero_point = self._input_quantization
+            np.multiply(resized, 1 / (self._MODEL_INPUT_STD * scale), out=self._scratch_frame)
+            np.add(self._scratch_frame, zero_point - self._MODEL_INPUT_MEAN / (self._MODEL_INPUT_STD * scale),
+                   out=self._scratch_frame)
+            np.rint(self._scratch_frame, out=self._scratch_frame)
+            info = np.iinfo(self._input_frame.dtype)
+            np.clip(self._scratch_frame, info.min, info.max, out=self._scratch_frame)
+            np.copyto(self._input_frame, self._scratch_frame, casting='unsafe')
+        elif self._input_mode == 'float':
+            np.multiply(resized, 1 / self._MODEL_INPUT_STD, out=self._input_frame, casting='unsafe')
+            if self._MODEL_INPUT_MEAN:
+                np.subtract(self._input_frame, self._MODEL_INPUT_MEAN / self._MODEL_INPUT_STD,
+                            out=self._input_frame)
+
+        return self._input_tensor
+
+    def _preprocess_copy(self, image: np.ndarray, bgr: bool = False, flip: bool = False) -> np.ndarray:
+        """Preprocess an image of any dtype through temporary arrays.
+
+        OpenCV only resizes into the preallocated uint8 buffer when the image is uint8 too, and silently allocates a
+        new array otherwise, so other images take this slower path.
 
-        return input_tensor
+        Args:
+            image: A [height, width, 3] image.
+            bgr: Whether the image channels are in BGR order.
+            flip: Whether the image is mirrored horizontally.
 
-    def classify(self, frame: np.ndarray) -> List[Category]:
+        Returns:
+            The model input tensor.
+        """
+        resized = cv2.resize(image, (self._input_width, self._input_height))
+        if bgr:
+            resized = resized[..., ::-1]
+        if flip:
+            resized = resized[:, ::-1]
+
+        normalized = (np.float32(resized) - self._MODEL_INPUT_MEAN) / self._MODEL_INPUT_STD
+        if self._input_mode != 'float':
+            scale, zero_point = self._input_quantization
+            info = np.iinfo(self._input_frame.dtype)
+            normalized = np.clip(np.rint(normalized / scale + zero_point), info.min, info.max)
+        np.copyto(self._input_frame, normalized, casting='unsafe')
+
+        return self._input_tensor
+
+    def classify(self, frame: np.ndarray, bgr: bool = False, flip: bool = False) -> List[Category]:
         """Classify an input frame.
 
         Frames from the target video should be fed to the model in sequence.
 
         Args:
             frame: A [height, width, 3] RGB image representing a frame in a video.
+            bgr: Whether the frame is in BGR order, as read by OpenCV. The color conversion is then fused into the
+                preprocessing, so callers don't need to run ``cv2.cvtColor`` themselves.
+            flip: Whether the frame is mirrored horizontally while preprocessing.
 
         Returns:
             A list of prediction result. Sorted by probability descending.
         """
+        categories, self._internal_states = self.classify_stream(frame, self._internal_states, bgr, flip)
+
+        return categories
+
+    def classify_stream(self, frame: np.ndarray, states: Dict[str, np.ndarray],
+                        bgr: bool = False, flip: bool = False) -> Tuple[List[Category], Dict[str, np.ndarray]]:
+        """Classify an input frame using externally held streaming states.
+
+        This allows a single classifier to serve several video streams, each one keeping its own states.
+
+        Args:
+            frame: A [height, width, 3] RGB image representing a frame in a video.
+            states: The streaming states returned for the previous frame of the same video, or ``init_states()``.
+            bgr: Whether the frame is in BGR order, as read by OpenCV.
+            flip: Whether the frame is mirrored horizontally while preprocessing.
+
+        Returns:
+            A list of prediction result sorted by probability descending, and the states for the next frame.
+        """
         # Preprocess the input frame.
-        frame = self._preprocess(frame)
+        frame = self._preprocess(frame, bgr, flip)
 
         # Feed the input frame and the model internal states to the TFLite model.
-        outputs = self._signature(**self._internal_states, image=frame)
+        outputs = self._signature(**states, image=frame)
 
-        # Take the model output and store the internal states for subsequence
+        # Take the model output and keep the internal states for subsequence
         # frames.
         logits = outputs.pop(self._MODEL_OUTPUT_SIGNATURE_NAME)
-        self._internal_states = outputs
 
-        return self._postprocess(logits)
+        return self._postprocess(logits), outputs
+
+    @property
+    def labels(self) -> List[str]:
+        """The labels of the model, in the order of ``probabilities``."""
+        return self._label_list
 
     def _postprocess(self, logits: np.ndarray) -> List[Category]:
         """Post-process the logits into a list of Category objects.
@@ -146,82 +299,167 @@ class VideoClassifier(object):
             A list of classification results.
         """
         # Convert from logits to probabilities using softmax function.
-        exp_logits = np.exp(np.squeeze(logits, axis=0))
+        logits = np.squeeze(logits, axis=0)
+        exp_logits = np.exp(logits - np.max(logits))
         probabilities = exp_logits / np.sum(exp_logits)
+        self.probabilities = probabilities
 
-        # Sort the labels so that the more likely categories come first.
-        prob_descending = sorted(
-            range(len(probabilities)), key=lambda k: probabilities[k], reverse=True)
-        categories = [
-            Category(label=self._label_list[idx], score=probabilities[idx])
-            for idx in prob_descending
-        ]
-
-        # Filter out categories in the deny list.
-        filtered_results = categories
-        if self._options.label_deny_list is not None:
-            filtered_results = list(
-                filter(
-                    lambda category: category.label not in self._options.
-                        label_deny_list, filtered_results))
-
-        # Keep only categories in the allow list.
-        if self._options.label_allow_list is not None:
-            filtered_results = list(
-                filter(
-                    lambda category: category.label in self._options.label_allow_list,
-                    filtered_results))
-
-        # Filter out categories with score lower than the score threshold.
+        # Filter out categories outside the allow list, in the deny list or below the score threshold.
+        mask = self._label_mask
         if self._options.score_threshold is not None:
-            filtered_results = list(
-                filter(
-                    lambda category: category.score >= self._options.score_threshold,
-                    filtered_results))
+            mask = mask & (probabilities >= self._options.score_threshold)
+        candidates = np.flatnonzero(mask)
+
+        # Only keep the top max_results categories, without sorting the whole label list.
+        max_results = self._options.max_results
+        if 0 < max_results < len(candidates):
+            top = np.argpartition(probabilities[candidates], -max_results)[-max_results:]
+            candidates = candidates[top]
 
-        # Only return maximum of max_results categories.
-        if self._options.max_results > 0:
-            result_count = min(len(filtered_results), self._options.max_results)
-            filtered_results = filtered_results[:result_count]
+        # Sort the remaining labels so that the more likely categories come first.
+        candidates = candidates[np.argsort(probabilities[candidates])[::-1]]
 
-        return filtered_results
+        return [Category(label=self._label_list[idx], score=probabilities[idx]) for idx in candidates]
 
 
 class VideoInference:
-    def __init__(self, model, labels, options, threshold):
+    def __init__(self, model, labels, options, threshold, motion_detector=None, cache=None):
         self.video_model = VideoClassifier(model, labels, options)
         self.threshold = threshold
+        # Optional motion detection stage run before the classifier, which clears the streaming states when the
+        # scene stays idle for long.
+        self.motion_detector = motion_detector
+        if motion_detector is not None and motion_detector.on_idle is None:
+            motion_detector.on_idle = self.video_model.clear
+        # Optional cache of the results of already classified videos, keyed by their content, and of the frames of
+        # replayed recordings, keyed by their position in the file. Frames of live streams aren't cached, as the
+        # result of a frame depends on the streaming states left by the previous ones.
+        self.cache = cache
         self.model_name = 'movinet_retrained'
         self.model_fps = 5
         self.model_fps_error_range = 0.1
+        self.last_inference_time = 0
+        self.categories = []
 
-    def inference(self, frames):
+    def classify_frame(self, image, timestamp=None, key=None):
+        """
+        Classifies a BGR frame of a stream, if it is due according to the model frame rate and the motion detector
+        lets it through.
+
+        The frame is mirrored while preprocessing and never modified, so it can be a read-only view of a frame in
+        shared memory.
+
+        :param image: A [height, width, 3] BGR frame.
+        :type image: numpy.ndarray
+        :param timestamp: Monotonic capture time of the frame, defaults to now.
+        :type timestamp: float
+        :param key: Optional cache key of a frame of a replayed recording, see ``replay_key``. The frames of a looped
+                    file are the same on every replay, so their results are answered from the cache after the first.
+        :type key: bytes
+        :return: The probabilities of every label, or None if the frame was skipped.
+        :rtype: numpy.ndarray
+        """
+        # Ensure that frames are feed to the model at {_MODEL_FPS} frames per second as required in the model specs.
+        current_frame_start_time = time.monotonic() if timestamp is None else timestamp
+        diff = current_frame_start_time - self.last_inference_time
+        if diff * self.model_fps < (1 - self.model_fps_error_range):
+            return None
+
+        # Store the time when inference starts.
+        self.last_inference_time = current_frame_start_time
+
+        # Skip static frames, the previous result still describes the scene.
+        if self.motion_detector is not None and not self.motion_detector.check(image, current_frame_start_time):
+            return None
+
+        if key is not None and self.cache is not None:
+            result = self.cache.get(key)
+            hit = result is not None
+            if not hit:
+                result = self.video_model.classify(image, bgr=True, flip=True), self.video_model.probabilities
+                self.cache.put(key, result)
+            self.cache.record(hit)
+            self.categories, probabilities = result
+            return probabilities
+
+        # Feed the frame to the video classification model, which mirrors it and converts it to RGB while preprocessing.
+        self.categories = self.video_model.classify(image, bgr=True, flip=True)
+        return self.video_model.probabilities
+
+    def inference_frame(self, image, timestamp=None):
+        """
+        Classifies a BGR frame of a stream like ``classify_frame``, e.g. a frame of a shared memory ring.
+
+        :param image: A [height, width, 3] BGR frame.
+        :type image: numpy.ndarray
+        :param timestamp: Monotonic capture time of the frame, defaults to now.
+        :type timestamp: float
+        :return: The top label and score of the frame, or None if the frame was skipped or no label passed the
+                 filters of the classifier.
+        :rtype: tuple[str, float]
+        """
+        if self.classify_frame(image, timestamp) is None or not self.categories:
+            return None
+        return self.categories[0].label, self.categories[0].score
 
-        counter, fps, last_inference_start_time, time_per_infer = 0, 0, 0, 0
-        categories = []
+    def inference(self, frames, on_frame=None):
+        """
+        Classifies the frames of a video, fed to the model at ``model_fps`` frames per second.
+
+        :param frames: Path or URL of the video.
+        :type frames: str
+        :param on_frame: Optional callback called with the probabilities of every label and the capture timestamp of
+                         each classified frame.
+        :type on_frame: callable
+        :return: The top label and score of the last classified frame, or (None, 0.0) if no frame was classified.
+        :rtype: tuple[str, float]
+        """
+        # Videos already classified are answered from the cache, unless the caller wants the per frame results.
+        if self.cache is None or on_frame is not None or not os.path.isfile(frames):
+            return self.classify_video(frames, on_frame)
+
+        key = file_key(frames)
+        result = self.cache.get(key)
+        hit = result is not None
+        if not hit:
+            result = self.classify_video(frames)
+            # A video the gates skipped entirely has no result worth keeping.
+            if result[0] is not None:
+                self.cache.put(key, result)
+        self.cache.record(hit)
+        return result
+
+    def classify_video(self, frames, on_frame=None):
+        """
+        Runs the model on every frame of a video, fed at ``model_fps`` frames per second.
+
+        :param frames: Path or URL of the video.
+        :type frames: str
+        :param on_frame: Optional callback called with the probabilities of every label and the capture timestamp of
+                         each classified frame.
+        :type on_frame: callable
+        :return: The top label and score of the last classified frame of this video, or (None, 0.0) if none was
+                 classified, e.g. a static scene skipped by the motion detector.
+        :rtype: tuple[str, float]
+        """
         cap = cv2.VideoCapture(frames)
+        categories = None
 
         # Continuously capture images from the camera and run inference
         while cap.isOpened():
             success, image = cap.read()
             if not success:
                 break
-            counter += 1
-
-            image = cv2.flip(image, 1)
-
-            # Ensure that frames are feed to the model at {_MODEL_FPS} frames per second as required in the model specs.
-            current_frame_start_time = time.time()
-            diff = current_frame_start_time - last_inference_start_time
-            if diff * self.model_fps >= (1 - self.model_fps_error_range):
-                # Store the time when inference starts.
-                last_inference_start_time = current_frame_start_time
-
-                # Convert the frame to RGB as required by the TFLite model.
-                frame_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-                # Feed the frame to the video classification model.
-                categories = self.video_model.classify(frame_rgb)
+            timestamp = time.monotonic()
+            probabilities = self.classify_frame(image, timestamp)
+            if probabilities is None:
+                continue
+            categories = self.categories
+            if on_frame is not None:
+                on_frame(probabilities, timestamp)
 
         cap.release()
+        if not categories:
+            return None, 0.0
         return categories[0].label, categories[0].score
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+
+from EdgeDevice.utils.metrics import metrics
+
+
+class TransactionCoalescer:
+    """
+        Coalesces the transactions produced within a short window into a single broadcast.
+
+        Every detection produces one transaction, and during an activity burst several detections follow each other
+        within milliseconds. Instead of one message (a JSON document, a TLS record and a ``sendall`` per peer) per
+        transaction, the transactions are queued and flushed together as one ``PENDING`` list, either when the oldest
+        queued transaction has waited ``window`` seconds or as soon as ``max_items`` transactions are queued, like
+        Nagle's algorithm does for TCP segments. A quiet network therefore only delays a transaction by the window.
+
+        :arg window (float): Maximum seconds a transaction waits for others before being flushed.
+        :arg max_items (int): Number of queued transactions flushed without waiting for the window.
+        :arg batches (int): Number of batches flushed.
+        :arg transactions (int): Number of transactions flushed.
+    """
+
+    def __init__(self, flush, window=0.05, max_items=8, name='TRANSACTION'):
+        """
+            Initializes an instance of the TransactionCoalescer class.
+
+            :param flush: Function sending a batch, called with the list of transactions on the flushing thread.
+            :type flush: callable
+            :param window: Maximum seconds a transaction waits for others before being flushed.
+            :type window: float
+            :param max_items: Number of queued transactions flushed without waiting for the window.
+            :type max_items: int
+            :param name: Name of the coalescer in the node metrics.
+            :type name: str
+        """
+        self.flush = flush
+        self.window = window
+        self.max_items = max_items
+        self.name = name
+        self.pending = []
+        self.deadline = None
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.batches = 0
+        self.transactions = 0
+
+    def start(self):
+        """
+        Starts flushing the batches on a dedicated thread.
+
+        :return: self object
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=f'{self.name}-COALESCER', daemon=True)
+        self.thread.start()
+        return self
+
+    def add(self, transaction):
+        """
+        Queues a transaction for the next batch. Never blocks on the network.
+
+        :param transaction: The signed transaction.
+        :type transaction: dict
+        :return: None
+        """
+        with self.condition:
+            if not self.pending:
+                self.deadline = time.monotonic() + self.window
+            self.pending.append(transaction)
+            if len(self.pending) == 1 or len(self.pending) >= self.max_items:
+                self.condition.notify()
+
+    def take(self):
+        """
+        Waits until a batch is due, on its deadline or when it is full, and takes it out of the queue.
+
+        :return: The transactions of the batch, empty when the coalescer was stopped with nothing queued.
+        :rtype: list[dict]
+        """
+        with self.condition:
+            while self.running:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                delay = self.deadline - time.monotonic()
+                if delay <= 0 or len(self.pending) >= self.max_items:
+                    break
+                self.condition.wait(delay)
+
+            batch, self.pending = self.pending[:self.max_items], self.pending[self.max_items:]
+            self.deadline = time.monotonic() + self.window if self.pending else None
+            return batch
+
+    def send(self, batch):
+        """
+        Flushes a batch, counting it in the node metrics.
+
+        :param batch: The transactions of the batch.
+        :type batch: list[dict]
+        :return: None
+        """
+        try:
+            self.flush(batch)
+        except Exception as e:
+            logging.error(f"[{self.name}] Failed to flush {len(batch)} transactions: {e}")
+            return
+        self.batches += 1
+        self.transactions += len(batch)
+        metrics.increment(f'{self.name}_BATCHES')
+        metrics.increment(f'{self.name}_BATCHED', len(batch))
+
+    def run(self):
+        """
+        Flushes the batches as they become due, until the coalescer is stopped.
+
+        :return: None
+        """
+        while self.running:
+            batch = self.take()
+            if batch:
+                self.send(batch)
+
+    def stop(self):
+        """
+        Stops the coalescer, flushing the transactions still queued.
+
+        :return: None
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+        with self.condition:
+            batch, self.pending, self.deadline = self.pending, [], None
+        while batch:
+            self.send(batch[:self.max_items])
+            batch = batch[self.max_items:]
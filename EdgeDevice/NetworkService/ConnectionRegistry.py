@@ -0,0 +1,206 @@
+import threading
+from typing import NamedTuple, Any
+
+
+def dials(local_id, peer_id):
+    """
+    Tells whether a node dials the link to a peer: of two nodes, the one with the smaller ID dials and the other one
+    accepts, so both ends agree on a single link without negotiating.
+
+    :param local_id: The ID of the node.
+    :type local_id: uuid.UUID
+    :param peer_id: The ID of the peer.
+    :type peer_id: uuid.UUID
+    :return: True if the node dials the peer.
+    :rtype: bool
+    """
+    return local_id < peer_id
+
+
+class Peer(NamedTuple):
+    """A connected peer node, with the address of its socket cached when it connected."""
+    id: Any
+    conn: Any
+    address: tuple
+    local: str = None
+    outbound: Any = None
+    inbound: bool = False
+
+    @property
+    def ip(self):
+        return self.address[0]
+
+    @property
+    def port(self):
+        return self.address[1]
+
+
+class ConnectionRegistry:
+    """
+        Thread-safe registry of the connected peers and known neighbours of a node.
+
+        The connections are added and removed by the accept, message handler, reconnect and election threads, and read
+        far more often, on every broadcast, election and chain sync. Writers take a lock and replace the indexes by
+        updated copies, readers just use the current copies without locking (copy-on-write), so a reader never sees a
+        half updated registry and never blocks a writer. Peers are indexed by node ID, by ``(ip, port)``, by IP and by
+        socket, and keep the address of their socket, so lookups don't scan the connections nor call ``getpeername``.
+
+        :arg peers (tuple): Snapshot of the connected peers, in connection order.
+        :arg neighbours (dict): Snapshot of the IP, public key and local of the known nodes, by node ID.
+    """
+
+    def __init__(self, neighbours=None):
+        """
+            Initializes an instance of the ConnectionRegistry class.
+
+            :param neighbours: The initially known nodes, e.g. the node itself, by node ID.
+            :type neighbours: dict
+        """
+        self.lock = threading.Lock()
+        self.peers = ()
+        self.by_id = {}
+        self.by_address = {}
+        self.by_ip = {}
+        self.by_conn = {}
+        self.neighbours = dict(neighbours or {})
+
+    def __len__(self):
+        return len(self.peers)
+
+    def __iter__(self):
+        return iter(self.peers)
+
+    def __contains__(self, conn):
+        return conn in self.by_conn
+
+    @property
+    def connections(self):
+        """
+        The sockets of the connected peers.
+
+        :return: A snapshot of the sockets.
+        :rtype: tuple[socket.socket]
+        """
+        return tuple(peer.conn for peer in self.peers)
+
+    def _publish(self, peers):
+        """
+        Replaces the peers and rebuilds the indexes. Must be called with the lock held.
+
+        :param peers: The connected peers.
+        :type peers: tuple[Peer]
+        :return: None
+        """
+        self.by_id = {peer.id: peer for peer in peers}
+        self.by_address = {peer.address: peer for peer in peers}
+        self.by_ip = {peer.ip: peer for peer in peers}
+        self.by_conn = {peer.conn: peer for peer in peers}
+        self.peers = peers
+
+    def add(self, peer):
+        """
+        Registers a connected peer, unless a connection to the same node or address is already registered.
+
+        :param peer: The peer.
+        :type peer: Peer
+        :return: True if the peer was added.
+        :rtype: bool
+        """
+        with self.lock:
+            if peer.id in self.by_id or peer.address in self.by_address or peer.conn in self.by_conn:
+                return False
+            self._publish(self.peers + (peer,))
+            return True
+
+    def link(self, peer, local_id):
+        """
+        Registers the link to a peer, deduplicating the links by node ID: when the node is already linked to the
+        peer, the link dialed by the node with the smaller ID is kept, as both ends of the links decide the same.
+
+        :param peer: The peer of the new link.
+        :type peer: Peer
+        :param local_id: The ID of the node.
+        :type local_id: uuid.UUID
+        :return: Whether the new link was registered, and the link it replaced, which the caller closes.
+        :rtype: tuple[bool, Peer]
+        """
+        with self.lock:
+            existing = self.by_id.get(peer.id)
+            if existing is not None:
+                preferred_inbound = not dials(local_id, peer.id)
+                if existing.inbound == preferred_inbound or peer.inbound != preferred_inbound:
+                    return False, None
+                peers = tuple(p for p in self.peers if p is not existing)
+            else:
+                peers = self.peers
+
+            if any(p.address == peer.address or p.conn is peer.conn for p in peers):
+                return False, None
+            self._publish(peers + (peer,))
+            return True, existing
+
+    def remove(self, conn):
+        """
+        Unregisters the peer of a connection.
+
+        :param conn: The socket of the connection.
+        :type conn: socket.socket
+        :return: The removed peer, or None if the connection wasn't registered.
+        :rtype: Peer
+        """
+        with self.lock:
+            peer = self.by_conn.get(conn)
+            if peer is not None:
+                self._publish(tuple(p for p in self.peers if p.conn is not conn))
+            return peer
+
+    def get(self, peer_id):
+        """
+        Looks the connected peer with a node ID up.
+
+        :param peer_id: The ID of the node.
+        :type peer_id: uuid.UUID
+        :return: The peer, or None.
+        :rtype: Peer
+        """
+        return self.by_id.get(peer_id)
+
+    def find(self, ip, port=None):
+        """
+        Looks the connected peer with an address up.
+
+        :param ip: The IP address of the peer.
+        :type ip: str
+        :param port: The port of the peer, any port when None.
+        :type port: int
+        :return: The peer, or None.
+        :rtype: Peer
+        """
+        if port is None:
+            return self.by_ip.get(ip)
+        return self.by_address.get((ip, port))
+
+    def lookup(self, conn):
+        """
+        Looks the peer of a connection up.
+
+        :param conn: The socket of the connection.
+        :type conn: socket.socket
+        :return: The peer, or None.
+        :rtype: Peer
+        """
+        return self.by_conn.get(conn)
+
+    def update_neighbour(self, neighbour_id, **fields):
+        """
+        Adds a known node, or updates some of its fields, e.g. its PUBLIC_KEY.
+
+        :param neighbour_id: The ID of the node.
+        :type neighbour_id: uuid.UUID
+        :param fields: The fields of the node, e.g. IP, PUBLIC_KEY and LOCAL.
+        :return: None
+        """
+        with self.lock:
+            neighbours = dict(self.neighbours)
+            neighbours[neighbour_id] = {**neighbours.get(neighbour_id, {}), **fields}
+            self.neighbours = neighbours
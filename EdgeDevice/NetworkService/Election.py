@@ -0,0 +1,328 @@
+import logging
+import threading
+import time
+
+from EdgeDevice.utils.constants import Messages
+from EdgeDevice.utils.metrics import metrics
+
+IDLE = "IDLE"
+ELECTING = "ELECTING"
+WAITING = "WAITING"
+
+
+class RttEstimator:
+    """
+        Smoothed round-trip time of the links of a node, estimated like the retransmission timeout of TCP (RFC 6298).
+
+        :arg srtt (float): Smoothed round-trip time in seconds, None before the first sample.
+        :arg rttvar (float): Smoothed deviation of the round-trip time in seconds.
+    """
+
+    def __init__(self, initial=1.0, alpha=0.125, beta=0.25):
+        """
+            Initializes an instance of the RttEstimator class.
+
+            :param initial: Timeout in seconds before the first sample.
+            :type initial: float
+            :param alpha: Weight of a new sample in the smoothed round-trip time.
+            :type alpha: float
+            :param beta: Weight of a new sample in the smoothed deviation.
+            :type beta: float
+        """
+        self.initial = initial
+        self.alpha = alpha
+        self.beta = beta
+        self.srtt = None
+        self.rttvar = None
+
+    def add(self, sample):
+        """
+        Adds a measured round-trip time, e.g. between a PING and its PONG.
+
+        :param sample: The round-trip time in seconds.
+        :type sample: float
+        :return: None
+        """
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - sample)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * sample
+
+    def timeout(self):
+        """
+        Returns the time within which an answer is expected.
+
+        :return: ``srtt + 4 * rttvar`` in seconds, or the initial timeout before the first sample.
+        :rtype: float
+        """
+        if self.srtt is None:
+            return self.initial
+        return self.srtt + 4 * self.rttvar
+
+
+class BullyElection:
+    """
+        Bully election of the coordinator of a node, with term numbers, independent of the transport.
+
+        A node starts an election by sending ELECTION to its peers with a higher ID. A higher peer answers OK and starts
+        its own election; a node that gets no OK within ``ok_timeout`` announces itself to every peer with COORDINATOR,
+        and a node that got an OK but no COORDINATOR within ``coordinator_timeout`` starts over. The highest alive node
+        thus wins after at most one timeout, the timeouts being derived from the measured round-trip time instead of
+        fixed sleeps.
+
+        Every election increments the term, and every message carries it: a message of an older term is stale and
+        ignored, so a late OK or COORDINATOR of an earlier election can't override the current one, and a node that
+        sees a newer term drops its own election. A COORDINATOR from a node with a lower ID than this node is contested
+        by a new election, so the highest alive node ends up the coordinator, e.g. after a partition heals.
+
+        The election only calls ``send`` and ``on_coordinator``, after releasing its lock, and is driven by ``receive``
+        and ``tick``, which take the current time so a simulation can run many nodes on a virtual clock.
+
+        :arg term (int): The current term.
+        :arg coordinator: The coordinator of the current term, or None while electing one.
+        :arg state (str): IDLE, ELECTING (waiting for an OK) or WAITING (waiting for a COORDINATOR).
+        :arg deadline (float): Monotonic time of the next timeout, or None when IDLE.
+        :arg campaign (int): The last term this node ran for coordinator in.
+        :arg rtt (RttEstimator): Round-trip time of the links, the timeouts are derived from.
+    """
+
+    def __init__(self, node_id, peers, send, on_coordinator=None, rtt=None, min_timeout=0.2, max_timeout=5.0):
+        """
+            Initializes an instance of the BullyElection class.
+
+            :param node_id: The ID of the node, IDs are compared to elect the highest one.
+            :param peers: Function returning the IDs of the connected peers.
+            :type peers: callable
+            :param send: Function sending an election message, called with the peer ID, the message type, the term and
+                         the coordinator of a COORDINATOR message. It must not block.
+            :type send: callable
+            :param on_coordinator: Function called with the coordinator, or None, and the term when the coordinator
+                                   changes.
+            :type on_coordinator: callable
+            :param rtt: Round-trip time estimator of the links, a new one by default.
+            :type rtt: RttEstimator
+            :param min_timeout: Lower bound of the timeouts, in seconds.
+            :type min_timeout: float
+            :param max_timeout: Upper bound of the timeouts, in seconds.
+            :type max_timeout: float
+        """
+        self.node_id = node_id
+        self.peers = peers
+        self.send = send
+        self.on_coordinator = on_coordinator
+        self.rtt = rtt or RttEstimator()
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.term = 0
+        self.coordinator = None
+        self.state = IDLE
+        self.deadline = None
+        self.started = None
+        self.campaign = None
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    @property
+    def ok_timeout(self):
+        """
+        Seconds to wait for an OK from a higher peer, one round trip with its deviation.
+
+        :rtype: float
+        """
+        return min(self.max_timeout, max(self.min_timeout, self.rtt.timeout()))
+
+    @property
+    def coordinator_timeout(self):
+        """
+        Seconds to wait for a COORDINATOR after an OK: the higher peer waits for its own OK first.
+
+        :rtype: float
+        """
+        return 3 * self.ok_timeout
+
+    def elect(self, now=None):
+        """
+        Starts a new election, e.g. when the coordinator was lost.
+
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        actions = []
+        with self.condition:
+            self._elect(self.term + 1, self._now(now), actions)
+        self._flush(actions)
+
+    def receive(self, sender, message_type, term, coordinator=None, now=None):
+        """
+        Handles an ELECTION, OK or COORDINATOR message from a peer.
+
+        :param sender: The ID of the peer.
+        :param message_type: The type of the message.
+        :type message_type: str
+        :param term: The term of the message.
+        :type term: int
+        :param coordinator: The coordinator announced by a COORDINATOR message.
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        actions = []
+        now = self._now(now)
+        with self.condition:
+            if term > self.term:
+                # a newer election supersedes the one of this node, its outcome is expected within the timeout
+                self.term = term
+                self.state = WAITING
+                self.deadline = now + self.coordinator_timeout
+                self._set_coordinator(None, now, actions)
+                self.condition.notify()
+
+            if message_type == Messages.MESSAGE_TYPE_ELECTION.value:
+                self._receive_election(sender, term, now, actions)
+            elif message_type == Messages.MESSAGE_TYPE_ELECTION_OK.value:
+                if term == self.term and self.state == ELECTING:
+                    self.state = WAITING
+                    self.deadline = now + self.coordinator_timeout
+            elif message_type == Messages.MESSAGE_TYPE_COORDINATOR.value:
+                self._receive_coordinator(coordinator, term, now, actions)
+        self._flush(actions)
+
+    def tick(self, now=None):
+        """
+        Handles the expired timeout of the current election, if any.
+
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        actions = []
+        now = self._now(now)
+        with self.condition:
+            if self.deadline is not None and now >= self.deadline:
+                if self.state == ELECTING:
+                    # no higher peer answered
+                    self._declare(now, actions)
+                elif self.state == WAITING:
+                    logging.info(f"[ELECTION] No COORDINATOR in term {self.term}, starting over")
+                    self._elect(self.term + 1, now, actions)
+        self._flush(actions)
+
+    def _receive_election(self, sender, term, now, actions):
+        if term < self.term or (self.state == IDLE and self.coordinator is not None):
+            # the sender missed the outcome of the election
+            if self.coordinator is not None:
+                actions.append((self.send, sender, Messages.MESSAGE_TYPE_COORDINATOR.value, self.term,
+                                self.coordinator))
+            return
+
+        if sender < self.node_id:
+            actions.append((self.send, sender, Messages.MESSAGE_TYPE_ELECTION_OK.value, term, None))
+            if self.campaign != term:
+                self._elect(term, now, actions)
+
+    def _receive_coordinator(self, coordinator, term, now, actions):
+        if term < self.term or coordinator is None or coordinator == self.coordinator:
+            return
+        if self.coordinator is not None and coordinator < self.coordinator:
+            return
+        if coordinator < self.node_id:
+            # this node outranks the announced coordinator
+            self._elect(self.term + 1, now, actions)
+            return
+        self.state = IDLE
+        self.deadline = None
+        self._set_coordinator(coordinator, now, actions)
+
+    def _elect(self, term, now, actions):
+        self.term = term
+        self.campaign = term
+        self.started = now
+        self._set_coordinator(None, now, actions)
+        higher = [peer for peer in self.peers() if peer > self.node_id]
+        if not higher:
+            self._declare(now, actions)
+            return
+
+        logging.info(f"[ELECTION] Term {term}: sending ELECTION to {len(higher)} higher nodes")
+        metrics.increment('ELECTIONS')
+        for peer in higher:
+            actions.append((self.send, peer, Messages.MESSAGE_TYPE_ELECTION.value, term, None))
+        self.state = ELECTING
+        self.deadline = now + self.ok_timeout
+        self.condition.notify()
+
+    def _declare(self, now, actions):
+        logging.info(f"[ELECTION] Node {self.node_id} is the coordinator of term {self.term}")
+        self.state = IDLE
+        self.deadline = None
+        for peer in self.peers():
+            actions.append((self.send, peer, Messages.MESSAGE_TYPE_COORDINATOR.value, self.term, self.node_id))
+        self._set_coordinator(self.node_id, now, actions)
+
+    def _set_coordinator(self, coordinator, now, actions):
+        if coordinator == self.coordinator:
+            return
+        self.coordinator = coordinator
+        if coordinator is not None and self.started is not None:
+            # seconds from the start of the last election of this node to its outcome
+            metrics.set('ELECTION_CONVERGENCE', now - self.started)
+            self.started = None
+        if self.on_coordinator is not None:
+            actions.append((self.on_coordinator, coordinator, self.term))
+
+    @staticmethod
+    def _flush(actions):
+        for action, *args in actions:
+            try:
+                action(*args)
+            except Exception as e:
+                logging.error(f"[ELECTION] {getattr(action, '__name__', action)} failed: {e}")
+
+    @staticmethod
+    def _now(now):
+        return time.monotonic() if now is None else now
+
+    def run(self):
+        """
+        Fires the timeouts of the elections until the election is stopped.
+
+        :return: None
+        """
+        while True:
+            with self.condition:
+                if not self.running:
+                    return
+                if self.deadline is None:
+                    self.condition.wait()
+                else:
+                    self.condition.wait(max(0.0, self.deadline - time.monotonic()))
+                if not self.running:
+                    return
+            self.tick()
+
+    def start(self):
+        """
+        Starts the timer of the elections on a dedicated thread.
+
+        :return: self object
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='ELECTION', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the timer of the elections.
+
+        :return: None
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,260 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from EdgeDevice.utils.metrics import metrics
+
+
+class PhiAccrualFailureDetector:
+    """
+        Phi accrual failure detector of a peer (Hayashibara et al.), as used by Cassandra and Akka.
+
+        Instead of declaring a peer dead after a fixed timeout, the detector learns the distribution of the intervals
+        between the messages received from the peer, and expresses how unlikely the current silence is as
+        ``phi = -log10(P(interval > silence))``: a phi of 8 means the peer would have been heard from with a
+        probability of 1 - 10^-8 if it was alive. A jittery Wi-Fi link thus gets a proportionally longer grace period,
+        and a steady link is suspected shortly after its usual interval.
+
+        :arg threshold (float): Phi over which the peer is suspected to have failed.
+        :arg last (float): Monotonic time of the last heartbeat, or None before the first one.
+    """
+
+    def __init__(self, threshold=8.0, max_samples=100, min_std=0.5, acceptable_pause=0.0, first_interval=5.0):
+        """
+            Initializes an instance of the PhiAccrualFailureDetector class.
+
+            :param threshold: Phi over which the peer is suspected to have failed.
+            :type threshold: float
+            :param max_samples: Number of most recent intervals the distribution is estimated from.
+            :type max_samples: int
+            :param min_std: Minimum standard deviation of the intervals in seconds, so a perfectly regular peer isn't
+                            suspected on the first late message.
+            :type min_std: float
+            :param acceptable_pause: Seconds added to the mean interval, e.g. for garbage collection pauses.
+            :type acceptable_pause: float
+            :param first_interval: Expected interval in seconds, the distribution starts from it before the first
+                                   intervals are measured.
+            :type first_interval: float
+        """
+        self.threshold = threshold
+        self.min_std = min_std
+        self.acceptable_pause = acceptable_pause
+        self.intervals = deque(maxlen=max_samples)
+        self.total = 0.0
+        self.squares = 0.0
+        self.last = None
+        # bootstrap the distribution like Akka does, with a mean of first_interval and a deviation of a quarter of it
+        for interval in (first_interval - first_interval / 4, first_interval + first_interval / 4):
+            self.add(interval)
+
+    def add(self, interval):
+        """
+        Adds an interval to the distribution, dropping the oldest one when the window is full.
+
+        :param interval: Seconds between two heartbeats.
+        :type interval: float
+        :return: None
+        """
+        if len(self.intervals) == self.intervals.maxlen:
+            oldest = self.intervals[0]
+            self.total -= oldest
+            self.squares -= oldest * oldest
+        self.intervals.append(interval)
+        self.total += interval
+        self.squares += interval * interval
+
+    def heartbeat(self, now):
+        """
+        Records that the peer was heard from, by any message.
+
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        if self.last is not None:
+            self.add(now - self.last)
+        self.last = now
+
+    def phi(self, now):
+        """
+        Computes the suspicion level of the peer.
+
+        :param now: The current monotonic time.
+        :type now: float
+        :return: The phi value, 0 before the first heartbeat.
+        :rtype: float
+        """
+        if self.last is None:
+            return 0.0
+
+        count = len(self.intervals)
+        mean = self.total / count
+        std = max(math.sqrt(max(self.squares / count - mean * mean, 0.0)), self.min_std)
+        y = (now - self.last - mean - self.acceptable_pause) / std
+        # logistic approximation of the normal cumulative distribution function, P(interval > silence) being
+        # 1 / (1 + exp(z)), and phi = log10(1 + exp(z)) computed without overflowing for long silences
+        z = y * (1.5976 + 0.070566 * y * y)
+        if z > 0:
+            return (z + math.log1p(math.exp(-z))) / math.log(10)
+        return math.log1p(math.exp(z)) / math.log(10)
+
+    def is_available(self, now):
+        """
+        Tells whether the peer is still considered alive.
+
+        :param now: The current monotonic time.
+        :type now: float
+        :return: True while phi stays under the threshold.
+        :rtype: bool
+        """
+        return self.phi(now) < self.threshold
+
+
+class HeartbeatScheduler:
+    """
+        Single heartbeat loop of a node, watching every peer with a phi accrual failure detector.
+
+        Any message received from a peer counts as a heartbeat, and a PING is only sent to a peer the node sent nothing
+        to for ``interval`` seconds, so busy links carry no keep-alive traffic at all and an idle link carries one PING
+        (and its PONG) per interval, instead of every peer broadcasting to every other peer.
+
+        :arg interval (float): Seconds without sending anything to a peer after which it is pinged.
+        :arg detectors (dict): Failure detector of each peer, by peer ID.
+        :arg pings (int): Number of PINGs sent.
+        :arg suppressed (int): Number of PINGs not sent because other messages were sent recently.
+    """
+
+    def __init__(self, peers, send_ping, on_failure, interval=5.0, threshold=8.0, min_std=0.5):
+        """
+            Initializes an instance of the HeartbeatScheduler class.
+
+            :param peers: The connected peers, iterated on every tick, e.g. a ConnectionRegistry.
+            :type peers: Iterable[Peer]
+            :param send_ping: Function sending a PING to a peer.
+            :type send_ping: callable
+            :param on_failure: Function called with a peer suspected to have failed.
+            :type on_failure: callable
+            :param interval: Seconds without sending anything to a peer after which it is pinged.
+            :type interval: float
+            :param threshold: Phi over which a peer is suspected to have failed.
+            :type threshold: float
+            :param min_std: Minimum standard deviation of the intervals between the messages of a peer, in seconds.
+            :type min_std: float
+        """
+        self.peers = peers
+        self.send_ping = send_ping
+        self.on_failure = on_failure
+        self.interval = interval
+        self.threshold = threshold
+        self.min_std = min_std
+        self.detectors = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.pings = 0
+        self.suppressed = 0
+
+    def track(self, peer_id, now=None):
+        """
+        Starts watching a new link to a peer, forgetting the history of any previous link.
+
+        :param peer_id: The ID of the peer.
+        :type peer_id: uuid.UUID
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        detector = PhiAccrualFailureDetector(self.threshold, min_std=self.min_std, first_interval=self.interval)
+        detector.heartbeat(time.monotonic() if now is None else now)
+        with self.lock:
+            self.detectors[peer_id] = detector
+
+    def received(self, peer_id, now=None):
+        """
+        Records a message received from a peer.
+
+        :param peer_id: The ID of the peer.
+        :type peer_id: uuid.UUID
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        detector = self.detectors.get(peer_id)
+        if detector is None:
+            self.track(peer_id, now)
+        else:
+            detector.heartbeat(time.monotonic() if now is None else now)
+
+    def forget(self, peer_id):
+        """
+        Stops watching a peer.
+
+        :param peer_id: The ID of the peer.
+        :type peer_id: uuid.UUID
+        :return: None
+        """
+        with self.lock:
+            self.detectors.pop(peer_id, None)
+
+    def tick(self, now):
+        """
+        Reports the peers suspected to have failed, and pings the idle peers.
+
+        :param now: The current monotonic time.
+        :type now: float
+        :return: None
+        """
+        for peer in list(self.peers):
+            detector = self.detectors.get(peer.id)
+            if detector is None:
+                self.track(peer.id, now)
+            elif not detector.is_available(now):
+                logging.warning(f"[HEARTBEAT] {peer.id} suspected to have failed, "
+                                f"phi {detector.phi(now):.1f} after {now - detector.last:.1f}s of silence")
+                metrics.increment('PEER_SUSPECTED')
+                self.forget(peer.id)
+                self.on_failure(peer)
+                continue
+
+            if now - peer.outbound.last_sent >= self.interval:
+                self.send_ping(peer)
+                self.pings += 1
+                metrics.increment('HEARTBEAT_PINGS')
+            else:
+                self.suppressed += 1
+                metrics.increment('HEARTBEAT_SUPPRESSED')
+
+    def run(self):
+        """
+        Ticks a few times per interval until the scheduler is stopped.
+
+        :return: None
+        """
+        while not self.stopped.wait(self.interval / 4):
+            try:
+                self.tick(time.monotonic())
+            except Exception as e:
+                logging.error(f"[HEARTBEAT] Tick failed: {e}")
+
+    def start(self):
+        """
+        Starts the heartbeat loop on a dedicated thread.
+
+        :return: self object
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name='HEARTBEAT', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the heartbeat loop.
+
+        :return: None
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,54 @@
+import codecs
+import json
+
+
+class MessageStream:
+    """
+        Splits the bytes received from a peer into its JSON messages.
+
+        The peers send their messages as JSON documents one after the other, without delimiters, so one ``recv`` can
+        return part of a message (e.g. a chain or a batch of transactions bigger than the buffer) or several of them.
+        The received bytes are accumulated until they hold complete documents, which are decoded in order.
+
+        :arg buffer (str): Received text not decoded into a message yet.
+    """
+
+    def __init__(self, max_size=1 << 22):
+        """
+            Initializes an instance of the MessageStream class.
+
+            :param max_size: Maximum number of characters of an incomplete message before the stream is discarded.
+            :type max_size: int
+        """
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.max_size = max_size
+
+    def feed(self, data):
+        """
+        Adds received bytes to the stream and decodes the messages they complete.
+
+        :param data: The bytes received from the peer.
+        :type data: bytes
+        :return: The complete messages, in the order they were sent.
+        :rtype: list[dict]
+        :raises json.JSONDecodeError: If the stream holds text that is not a JSON message, the stream is then reset.
+        """
+        self.buffer += self.text.decode(data)
+        messages = []
+        while True:
+            self.buffer = self.buffer.lstrip()
+            if not self.buffer:
+                break
+            try:
+                message, end = self.decoder.raw_decode(self.buffer)
+            except json.JSONDecodeError as e:
+                # A message still being received fails too, wait for the rest unless it can't be a message.
+                if self.buffer[0] != '{' or len(self.buffer) > self.max_size:
+                    self.buffer = ''
+                    raise
+                break
+            messages.append(message)
+            self.buffer = self.buffer[end:]
+        return messages
@@ -1,5 +1,6 @@
-import soundfile as sf
 import logging
+import os
+import queue
 import random
 import socket
 import threading
@@ -12,16 +13,40 @@ from zeroconf import ServiceBrowser, ServiceInfo, Zeroconf, IPVersion, NonUnique
 from EdgeDevice.BlockchainService.Blockchain import Blockchain
 from EdgeDevice.InferenceService.audio import AudioInference
 from EdgeDevice.InferenceService.video import VideoInference, VideoClassifierOptions
+from EdgeDevice.InferenceService.fusion import FusionEngine, AUDIO
+from EdgeDevice.InferenceService.cache import InferenceCache, file_key, replay_key
+from EdgeDevice.InferenceService.events import EventStateMachine
+from EdgeDevice.InferenceService.gating import EnergyGate, MotionDetector
+from EdgeDevice.InferenceService.server import VideoInferenceServer
+from EdgeDevice.CaptureService.audio import MicrophoneAudioStream, AudioFileStream
+from EdgeDevice.CaptureService.video import WebcamVideoStream
+from EdgeDevice.CaptureService.queues import BoundedQueue, DropPolicy, capture_source
+from EdgeDevice.NetworkService.Coalescer import TransactionCoalescer
+from EdgeDevice.NetworkService.ConnectionRegistry import ConnectionRegistry, Peer, dials
+from EdgeDevice.NetworkService.Election import BullyElection
+from EdgeDevice.NetworkService.FailureDetector import HeartbeatScheduler
+from EdgeDevice.NetworkService.MessageStream import MessageStream
 from EdgeDevice.NetworkService.NodeListener import NodeListener
+from EdgeDevice.NetworkService.PeerConnection import PeerConnection
+from EdgeDevice.NetworkService.Protocol import NodeProtocol
+from EdgeDevice.NetworkService.ReconnectManager import ReconnectManager
+from EdgeDevice.NetworkService.Tls import SessionCache, client_context, server_context
 from EdgeDevice.HomeAssistantService.HomeAssistant import Homeassistant
-from EdgeDevice.BlockchainService.Transaction import validate_transaction, create_transaction
+from EdgeDevice.BlockchainService.Transaction import create_transaction
 from EdgeDevice.utils.constants import Network, HOST_PORT, BUFFER_SIZE, Messages, Transaction, Inference
+from EdgeDevice.utils.constants import (
+    TRANSACTION_BATCH_WINDOW, TRANSACTION_BATCH_SIZE, PEER_QUEUE_SIZE, PEER_QUEUE_HIGH_WATER, PEER_SLOW_TIMEOUT,
+    HEARTBEAT_INTERVAL, PHI_THRESHOLD, DIAL_TIMEOUT, RECONNECT_WORKERS, RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY,
+    RECONNECT_MAX_ATTEMPTS, ELECTION_MIN_TIMEOUT, ELECTION_MAX_TIMEOUT, CAPTURE_QUEUE_SIZE, AUDIO_SILENCE_THRESHOLD,
+    AUDIO_FLUX_THRESHOLD, AUDIO_CACHE_SIZE, VIDEO_CACHE_SIZE, VIDEO_MOTION_THRESHOLD, VIDEO_KEEP_WARM, VIDEO_IDLE_RESET,
+    FUSION_WINDOW, FUSION_THRESHOLD, FUSION_AUDIO_WEIGHT, FUSION_VIDEO_WEIGHT, FUSION_CLASS_WEIGHTS,
+    EVENT_EXIT_THRESHOLD, EVENT_MIN_DWELL, EVENT_COOLDOWN, EVENT_CLASS_SETTINGS)
 from EdgeDevice.utils.helper import NetworkUtils, MessageHandlerUtils
 
 logger = logging.getLogger(__name__)
 
 
-class Node(threading.Thread):
+class Node(threading.Thread, NodeProtocol):
     def __init__(self, name):
         """
         Initialize a new Node object.
@@ -33,6 +58,8 @@ class Node(threading.Thread):
         super().__init__()
         self.id = uuid.uuid4()
         self.private_key, self.public_key = NetworkUtils.get_keys()
+        # the SENDER of the transactions of the node
+        self.sender = NetworkUtils.key_to_json(self.public_key)
         self.name = name
         self.ip = NetworkUtils.get_interface_ip()
         self.port = HOST_PORT
@@ -40,13 +67,11 @@ class Node(threading.Thread):
         self.keep_alive_timeout = 10
         self.zeroconf = Zeroconf(ip_version=IPVersion.V4Only)
         self.listener = NodeListener(self)
-        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS)
-        self.context.options |= ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
         cert, key = NetworkUtils.get_tls_keys()
-        self.context.load_cert_chain(certfile=cert, keyfile=key)
+        self.context = server_context(cert, key)
+        self.client_context = client_context()
+        self.sessions = SessionCache()
         self.retries = 5
-        self.context.check_hostname = False
-        self.context.verify_mode = ssl.CERT_NONE
         self.socket = self.context.wrap_socket(
             socket.socket(socket.AF_INET, socket.SOCK_STREAM),
             server_side=True,
@@ -60,11 +85,24 @@ class Node(threading.Thread):
         self.state = Network.FOLLOWER
         self.coordinator = None
         self.running = True
-        self.neighbours = {self.id: {'IP': self.ip, 'PUBLIC_KEY': self.public_key, 'LOCAL': self.local}}
-        self.connections = []
+        self.registry = ConnectionRegistry({self.id: {'IP': self.ip, 'PUBLIC_KEY': self.public_key,
+                                                      'LOCAL': self.local}})
+        self.events = EventStateMachine(self.local, FUSION_THRESHOLD, EVENT_EXIT_THRESHOLD, EVENT_MIN_DWELL,
+                                        EVENT_COOLDOWN, EVENT_CLASS_SETTINGS)
         self.blockchain = Blockchain()
-        self.recon_state = False
-        self.election_in_progress = False
+        # timestamp of the last event the node registered or adopted, older transactions are never adopted
+        self.last_event_timestamp = 0
+        self.heartbeat = HeartbeatScheduler(self.registry, self.send_heartbeat, self.handle_peer_failure,
+                                            HEARTBEAT_INTERVAL, PHI_THRESHOLD)
+        self.coalescer = TransactionCoalescer(self.broadcast_transactions, TRANSACTION_BATCH_WINDOW,
+                                              TRANSACTION_BATCH_SIZE)
+        self.reconnects = ReconnectManager(self.dial_peer, RECONNECT_WORKERS, RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY,
+                                           RECONNECT_MAX_ATTEMPTS)
+        self.election = BullyElection(self.id, lambda: [peer.id for peer in self.registry], self.send_election,
+                                      self.handle_coordinator, min_timeout=ELECTION_MIN_TIMEOUT,
+                                      max_timeout=ELECTION_MAX_TIMEOUT)
+        # monotonic time of the last PING sent to each peer, its PONG gives a round-trip time sample
+        self.pings = {}
         self.service_info = ServiceInfo(
             type_="_node._tcp.local.",
             name=f"{self.name}._node._tcp.local.",
@@ -77,6 +115,26 @@ class Node(threading.Thread):
         self.homeassistant_listener = Homeassistant()
         self.blockchain.register_node({self.ip: time.time()})
 
+    @property
+    def connections(self):
+        """
+        The sockets of the connected peers, a snapshot that is safe to iterate while peers come and go.
+
+        :return: The sockets.
+        :rtype: tuple[socket.socket]
+        """
+        return self.registry.connections
+
+    @property
+    def neighbours(self):
+        """
+        The IP, public key and local of the known nodes, by node ID, a snapshot that is safe to iterate.
+
+        :return: The known nodes.
+        :rtype: dict
+        """
+        return self.registry.neighbours
+
     def run(self):
         """
         Start the node
@@ -96,17 +154,23 @@ class Node(threading.Thread):
             self.zeroconf.update_service(self.service_info)
 
         try:
+            # the discovered peers are dialed by the reconnect manager, the zeroconf callbacks only queue them
+            self.reconnects.start()
+            self.election.start()
             logging.info("[DISCOVERY] Starting the discovery service . . .")
             handle_discovery = ServiceBrowser(self.zeroconf, "_node._tcp.local.", [self.listener.update_service])
 
             handle_connections = threading.Thread(target=self.accept_connections)
             handle_connections.start()
+            self.coalescer.start()
+            self.heartbeat.start()
         except KeyboardInterrupt:
             logging.error(f"Machine {Network.HOST_NAME} is shutting down")
             self.stop()
 
-        if len(self.connections) == 0:
-            time.sleep(3)
+        # the peers discovered meanwhile tell the node their coordinator, otherwise it is elected
+        time.sleep(3)
+        if self.coordinator is None:
             self.handle_election()
 
         time.sleep(2)
@@ -141,8 +205,8 @@ class Node(threading.Thread):
     def validate(self, ip, port):
         """
         The ``validate`` method checks if a given IP address and port number are already in use by any of the
-        existing connections in the node. If the IP address and port number are unique, the method returns True.
-        Otherwise, it returns False.
+        existing connections in the node, with a lookup in the connection registry. If the IP address and port number
+        are unique, the method returns True. Otherwise, it returns False.
 
         :param ip: The IP address to validate.
         :type ip: <str>
@@ -150,20 +214,18 @@ class Node(threading.Thread):
         :type port: <int>
         :return: True if the IP address and port number are unique, False otherwise.
         """
-        flag = True
-        for connection in self.connections:
-            if ip != connection.getpeername()[0] and port != connection.getpeername()[1]:
-                flag = True
-            else:
-                flag = False
-        return flag
+        return self.registry.find(ip, port) is None
 
     def connect_to_peer(self, client_host, client_port, client_id, node_local):
         """
         The `connect_to_peer` method is used to create a TLS-encrypted socket connection with the specified client.
-        If the specified client is already connected, it will not create a new connection. It adds a new node by
-        creating a socket connection to the specified client and adds it to the node list. Additionally,
-        it starts threads to handle incoming messages and to send keep-alive messages.
+        If the specified client is already connected, it will not create a new connection. As both nodes of a pair
+        discover each other, only the node with the smaller ID dials, the other one waits for its connection, so each
+        pair of nodes shares a single link. It adds a new node by creating a socket connection to the specified client,
+        introduces itself with a HELLO message and adds it to the node list. Additionally, it starts threads to handle
+        incoming messages and to send keep-alive messages. The connection is made by ``dial_peer`` on the reconnect
+        manager, so the method returns at once, e.g. to the zeroconf callback thread, and failed dials are retried
+        with backoff.
 
         :param node_local:
         :param client_id: The ID of the new node.
@@ -178,93 +240,117 @@ class Node(threading.Thread):
             logging.info(f"[CONNECTION] Already connected to {client_host, client_port, client_id, node_local}")
             return
 
-        while self.running:
-            try:
-                conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                conn.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 5)
-                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
-                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 5)
+        peer_id = uuid.UUID(client_id.decode('utf-8'))
+        if self.registry.get(peer_id) is not None:
+            logging.info(f"[CONNECTION] Already linked to {peer_id}")
+            return
+        if not dials(self.id, peer_id):
+            logging.info(f"[CONNECTION] Waiting for {peer_id} to connect to this node")
+            return
 
-                context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-                context.check_hostname = False
-                context.verify_mode = ssl.CERT_NONE
-                conn = context.wrap_socket(conn, server_hostname=client_host)
+        self.reconnects.request(peer_id, (client_host, client_port, client_id, node_local))
 
-                conn.connect((client_host, client_port))
-                conn.settimeout(self.keep_alive_timeout * 3)
+    def dial_peer(self, target):
+        """
+        The ``dial_peer`` method makes a single attempt to connect to a peer, on a worker thread of the reconnect
+        manager, which retries it later if it fails.
 
-                handle_messages = threading.Thread(target=self.handle_messages, args=(conn,))
-                handle_messages.start()
+        :param target: The host, port, ID and local of the peer, as given to ``connect_to_peer``.
+        :type target: <tuple>
+        :return: True if the peer is connected or no longer needs to be, False if the dial failed.
+        :rtype: <bool>
+        """
+        client_host, client_port, client_id, node_local = target
+        peer_id = uuid.UUID(client_id.decode('utf-8'))
+        if not self.running or self.registry.get(peer_id) is not None:
+            return True
 
-                self.add_node(conn, client_id, node_local)
-                self.list_peers()
+        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 5)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 5)
+
+            # reconnections resume the TLS session of the previous connection to the peer
+            conn = self.client_context.wrap_socket(conn, server_hostname=client_host,
+                                                   session=self.sessions.get((client_host, client_port)))
+
+            # an unreachable peer only holds a worker of the reconnect manager for the dial timeout
+            conn.settimeout(DIAL_TIMEOUT)
+            conn.connect((client_host, client_port))
+            conn.settimeout(self.keep_alive_timeout * 3)
+            self.sessions.record((client_host, client_port), conn)
+
+            hello = MessageHandlerUtils.create_general_message(str(self.id), self.ip, self.port, client_host,
+                                                               client_port, str(peer_id), str(self.coordinator),
+                                                               Messages.MESSAGE_TYPE_HELLO.value)
+            hello["PAYLOAD"]["LOCAL"] = self.local
+            conn.sendall(bytes(json.dumps(hello, indent=2), encoding="utf-8"))
+        except OSError as e:
+            logging.info(f"[CONNECTION] Connection to {client_host}:{client_port} failed: {e}")
+            conn.close()
+            return False
+
+        if not self.add_node(conn, client_id, node_local):
+            conn.close()
+            return True
+
+        handle_messages = threading.Thread(target=self.handle_messages, args=(conn,))
+        handle_messages.start()
+        self.list_peers()
 
-                time.sleep(1)
+        # the first PING gives the coordinator and public key to the peer, the next ones are scheduled
+        self.send_heartbeat(self.registry.lookup(conn))
 
-                handle_keep_alive_messages = threading.Thread(target=self.handle_keep_alive_messages,
-                                                              args=(client_id,))
-                handle_keep_alive_messages.start()
+        self.push_chain(self.registry.lookup(conn))
+        return True
 
-                time.sleep(1)
+    def handle_election(self):
+        """
+        The ``handle_election`` method starts an election of the Bully algorithm, see ``BullyElection``. In this
+        algorithm, nodes with higher IDs bully nodes with lower IDs to become the leader. When a node detects that the
+        leader is unresponsive, it initiates an election by sending ELECTION messages to higher-ID nodes. If no
+        higher-ID node answers OK in time, the node becomes the leader and announces it with COORDINATOR messages. If
+        a higher-ID node answers, it withdraws from the election and waits for the COORDINATOR message.
 
-                handle_chain_messages = threading.Thread(target=self.handle_chain_message,
-                                                         args=("", conn, client_id,
-                                                               Messages.MESSAGE_TYPE_REQUEST_CHAIN.value))
-                handle_chain_messages.start()
-                break
-            except ConnectionRefusedError:
-                print(f"Connection refused by {client_host}:{client_port}, retrying in 10 seconds...")
-                time.sleep(10)
+        :return: None
+        """
+        self.election.elect()
 
-    def handle_election(self):
+    def handle_coordinator(self, coordinator, term):
         """
-        The ``start_election`` method implements the Bully algorithm that is a centralized leader election algorithm.
-        In this algorithm, nodes with higher IDs bully nodes with lower IDs to become the leader. When a node detects
-        that the leader is unresponsive, it initiates an election by sending election messages to higher-ID nodes. If
-        no higher-ID node responds, the node becomes the leader. If a higher-ID node responds, it withdraws from the
-        election. The process continues until a leader is elected.
+        The ``handle_coordinator`` method is called by the election when the coordinator changes. The coordinator
+        publishes the detections to Home Assistant, and a node coordinating alone creates a new block.
 
+        :param coordinator: The new coordinator, or None while an election is in progress.
+        :type coordinator: <uuid.UUID>
+        :param term: The term of the election.
+        :type term: <int>
         :return: None
         """
-        try:
-            if self.coordinator is None and len(self.connections) > 0:
-                self.election_in_progress = True
-                higher_nodes = []
-                for neighbour_id, neighbour in self.neighbours.items():
-                    if neighbour_id > self.id:
-                        higher_nodes.append(neighbour['IP'])
-                if higher_nodes:
-                    for ip in higher_nodes:
-                        for node in self.connections:
-                            if node.getpeername()[0] == ip:
-                                logging.info(f"[ELECTION] Node {self.ip} sent ELECTION message to {ip}")
-                else:
-                    self.coordinator = self.id
-                    logging.info(f"[ELECTION] Node {self.id} is the new coordinator")
-                    self.election_in_progress = False
-            elif self.coordinator is None and len(self.connections) <= 0:
-                self.coordinator = self.id
-                logging.info(f"[ELECTION] Node {self.id} is the coordinator.")
-                self.blockchain.add_block(self.blockchain.new_block())
-                self.homeassistant_listener.start()
-        except ssl.SSLZeroReturnError as e:
-            logging.error(f"SSLZero Return Error {e.strerror}")
-            return
+        if coordinator == self.id and len(self.registry) == 0:
+            self.blockchain.add_block(self.blockchain.new_block())
+        super().handle_coordinator(coordinator, term)
 
     def handle_detection(self):
         """
         Continuously handles audio detection and classification using a pre-trained audio and video model.
 
-        This method initializes an audio model and performs audio inference on an audio file.
-        It continuously monitors the audio waveform for detected classes, creates blockchain transactions for each
-        detected class, and broadcasts the transaction information to the network.
+        The detection loop is driven by the capture queue: it blocks until the next audio window or video frame is
+        captured, so an event is detected one window after it happens. Cheap gates (an audio energy and spectral flux
+        voice activity gate, and a frame difference motion score) decide whether the window or frame is worth running
+        the expensive models on, so idle rooms barely use the CPU. Every result is timestamped and handed to a fusion
+        engine, and the fused scores are debounced by the room state machine, which produces a single event per
+        activity change, registered as a blockchain transaction and broadcast to the network. When the room has extra
+        cameras (``VIDEO_CAMERAS``), all of its cameras are classified by a VideoInferenceServer, whose probabilities
+        are fused like the local frames.
 
         :return: None
         """
         audio_model = {
-            'name': 'yamnet_retrained',
+            'name': Inference.AUDIO_MODEL.value,
             'frequency': 16000,  # sample rate in Hz
             'duration': 0.96,  # duration of each input signal in seconds
             'threshold': 0.75  # confidence threshold for audio classification
@@ -276,324 +362,236 @@ class Node(threading.Thread):
             'threshold': 0.75  # confidence threshold for video classification
         }
 
-        audio_inference = AudioInference(audio_model)
-        if (self.name == "NODE-1"):
-            audio_file_path = f'../RetrainedModels/audio/test_audios/{self.name}/136.wav'
-            waveform, _ = sf.read(audio_file_path, dtype='float32')
+        audio_gate = EnergyGate(AUDIO_SILENCE_THRESHOLD, AUDIO_FLUX_THRESHOLD)
+        audio_cache = InferenceCache(AUDIO_CACHE_SIZE, name='AUDIO')
+        audio_inference = AudioInference(audio_model, audio_gate, audio_cache)
 
         options = VideoClassifierOptions(
             num_threads=Inference.VIDEO_NUM_THREADS.value, max_results=Inference.VIDEO_MAX_RESULTS.value,
             label_allow_list=Inference.VIDEO_ALLOW_LIST.value, label_deny_list=Inference.VIDEO_DENY_LIST.value)
 
-        video_inference = VideoInference(Inference.VIDEO_MODEL.value, Inference.VIDEO_LABEL.value, options,
-                                         video_model['threshold'])
+        # Replay the node test recordings when available, otherwise capture from the microphone and webcam. The
+        # capture queue only keeps the latest window and frame of each stream, so a slow loop never works on stale data.
+        in_q = BoundedQueue(CAPTURE_QUEUE_SIZE, DropPolicy.KEEP_LATEST, key=capture_source)
+        audio_file_path = f'../RetrainedModels/audio/test_audios/{self.name}/136.wav'
         video_file_path = f'../RetrainedModels/video/test_videos/{self.name}/video.gif'
+        if os.path.exists(audio_file_path):
+            audio_stream = AudioFileStream(audio_file_path, in_q)
+        else:
+            audio_stream = MicrophoneAudioStream(0, in_q)
+        video_source = video_file_path if os.path.exists(video_file_path) else 0
+
+        video_server = video_stream = None
+        if Inference.VIDEO_CAMERAS.value:
+            # Several cameras share a pool of classifiers, each one keeping its own streaming states.
+            def on_video_result(name, categories, probabilities, timestamp):
+                in_q.put({'type': 'video_scores', 'source': name, 'data': probabilities, 'timestamp': timestamp})
+
+            video_server = VideoInferenceServer(Inference.VIDEO_MODEL.value, Inference.VIDEO_LABEL.value, options,
+                                                on_result=on_video_result)
+            video_server.add_stream(self.local, video_source, loop=video_source != 0)
+            for index, camera in enumerate(Inference.VIDEO_CAMERAS.value, 1):
+                video_server.add_stream(f'{self.local}-{index}', camera)
+            video_labels = video_server.classifiers[0].labels
+        else:
+            motion_detector = MotionDetector(VIDEO_MOTION_THRESHOLD, keep_warm=VIDEO_KEEP_WARM,
+                                             idle_reset=VIDEO_IDLE_RESET)
+            video_cache = InferenceCache(VIDEO_CACHE_SIZE, name='VIDEO')
+            video_inference = VideoInference(Inference.VIDEO_MODEL.value, Inference.VIDEO_LABEL.value, options,
+                                             video_model['threshold'], motion_detector, video_cache)
+            video_stream = WebcamVideoStream(video_source, 640, 480, in_q, self.local, loop=video_source != 0)
+            video_labels = video_inference.video_model.labels
+        # The frames of the looped recording are the same on every replay, they're cached by their position in it.
+        video_key = file_key(video_file_path) if video_source != 0 else None
+
+        fusion = FusionEngine(audio_inference.class_names, video_labels,
+                              class_weights=FUSION_CLASS_WEIGHTS, audio_weight=FUSION_AUDIO_WEIGHT,
+                              video_weight=FUSION_VIDEO_WEIGHT, window=FUSION_WINDOW, threshold=FUSION_THRESHOLD)
+
+        audio_stream.start()
+        if video_server is not None:
+            video_server.start()
+        elif video_stream.found:
+            video_stream.start()
 
-        last_audio_class = ""
-        last_video_class = ""
         logging.info(f'Inference Starting')
         while self.running:
-            if (self.name == "NODE-1"):
-                inferred_audio_classes, top_score_audio = audio_inference.inference(waveform)
-            else:
-                inferred_audio_classes, top_score_audio = 'water', 0.4521683285714694
-            inferred_video_classes, top_score_video = video_inference.inference(video_file_path)
-
-            last_event_registered_bc = None
-
-            if top_score_video < video_model['threshold'] and top_score_audio < audio_model['threshold']:
-                logging.info(
-                    f"Event {inferred_audio_classes} with {round(top_score_audio, 3)} precision is below the limit "
-                    f"established, proceding with the BC search.")
-                last_event_registered_bc = NetworkUtils.get_last_event_blockchain(
-                    "INFERENCE", self.blockchain.pending_transactions)
-                logging.info(f"Last event registered in {self.local} is {last_event_registered_bc}")
-
-            if top_score_audio >= audio_model['threshold'] or top_score_video >= video_model['threshold']:
-                precision_to_use = max(top_score_video, top_score_audio)
-                if precision_to_use == top_score_video:
-                    last_audio_class = None
-                    inferred_audio_classes = None
-                elif precision_to_use == top_score_audio:
-                    last_video_class = None
-                    inferred_video_classes = None
-
-            if last_event_registered_bc is not None:
-
-                if float(last_event_registered_bc["DATA"]["PRECISION"]) >= float(max(top_score_video, top_score_audio)):
-                    self.process_detection(inferred_audio_classes, inferred_video_classes,
-                                           last_audio_class, last_video_class, audio_inference, video_inference,
-                                           top_score_audio, top_score_video, last_event_registered_bc)
-
-            else:
-                self.process_detection(inferred_audio_classes, inferred_video_classes, last_audio_class,
-                                       last_video_class, audio_inference, video_inference, top_score_audio,
-                                       top_score_video)
-            last_video_class, last_audio_class = inferred_video_classes, inferred_audio_classes
-            time.sleep(2)
-
-    def process_detection(self, inferred_audio_classes=None, inferred_video_classes=None, last_audio_class=None,
-                          last_video_class=None,
-                          audio_inference=None, video_inference=None, top_score_audio=None, top_score_video=None,
-                          last_event_registered=None):
-        inferred_classes, last_class, transaction_type, top_score = "", "", "", ""
-
-        if inferred_audio_classes != last_audio_class:
-            if (self.name == "NODE-1"):
-                inferred_classes, last_class, transaction_type, top_score = inferred_audio_classes, last_audio_class, Transaction.TYPE_AUDIO_INFERENCE.value, top_score_audio
-                logging.info(f'[AUDIO - \'{audio_inference.model_name}\'] {inferred_audio_classes} ({top_score_audio})')
-
-        if last_video_class != inferred_video_classes:
-            if (self.name == "NODE-1"):
-                inferred_classes, last_class, transaction_type, top_score = inferred_video_classes, last_video_class, Transaction.TYPE_VIDEO_INFERENCE.value, top_score_video
-                logging.info(f'[VIDEO - \'{video_inference.model_name}\'] {inferred_video_classes} ({top_score_video})')
-
-        if inferred_classes != last_class:
-
-            if last_event_registered is not None:
-                if float(last_event_registered["DATA"]["PRECISION"]) >= float(max(top_score_video, top_score_audio)):
-                    top_score = last_event_registered["DATA"]["PRECISION"]
-                    inferred_classes = last_event_registered["DATA"]["EVENT_ACTION"]
-                    logging.info(
-                        f'[COLABORATIVE CONCLUSION - \'{video_inference.model_name}\'] water ({top_score})')
-
-            transaction_with_signature = self.create_blockchain_transaction(
-                inferred_classes, 'INFERENCE', self.local, transaction_type, str(top_score))
-
-            data = MessageHandlerUtils.create_transaction_message(
-                Messages.MESSAGE_TYPE_RESPONSE_TRANSACTION.value, str(self.id))
-            data["PAYLOAD"]["PENDING"] = [transaction_with_signature]
-            message = json.dumps(data, indent=2)
-
-            homeassistant_data = MessageHandlerUtils.create_homeassistant_message(
-                str(self.id), inferred_classes, self.local)
-
-            if self.coordinator == self.id and self.coordinator is not None:
-                self.homeassistant_listener.publish_message(homeassistant_data)
-
-            self.broadcast_message(message)
-
-    def handle_reconnects(self):
-        """
-        The ``handle_reconnects`` method is a background thread that monitors the node's connections and attempts to
-        reconnect if there are no active connections. The method also broadcasts a message to all connected nodes if
-        the node recently reconnected.
+            try:
+                item = in_q.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if item['type'] == 'audio':
+                # Silent windows carry no evidence for any class, the fusion window simply ages out.
+                if audio_inference.is_silent(item['data']):
+                    continue
+                fusion.add_audio(audio_inference.predict(item['data']), item['timestamp'])
+
+            elif item['type'] == 'video':
+                key = replay_key(video_key, item['position']) if video_key is not None else None
+                probabilities = video_inference.classify_frame(item['data'], item['timestamp'], key)
+                if probabilities is None:
+                    continue
+                fusion.add_video(probabilities, item['timestamp'])
+
+            elif item['type'] == 'video_scores':
+                fusion.add_video(item['data'], item['timestamp'])
+
+            # Only debounced activity changes of the room are reported, not every change of the top class.
+            scores = fusion.scores(item['timestamp'])
+            top = fusion.top(item['timestamp'], scores)
+            event = self.events.update(top, dict(zip(fusion.labels, scores[0])), item['timestamp'])
+            if event is None:
+                event = self.collaborative_event(top, item['timestamp'])
+
+            if event is not None:
+                self.process_detection(event)
+
+        audio_stream.stop()
+        if video_server is not None:
+            video_server.stop()
+        elif video_stream.found:
+            video_stream.stop()
+
+    def collaborative_event(self, top, now):
+        """
+        Looks for a collaborative conclusion when the local fused result is inconclusive.
+
+        The blockchain is only searched while the room is idle and the best fused class is under its enter threshold,
+        so a window the state machine may still turn into an event, or an ongoing activity, costs nothing. The last
+        inference event another node registered in the blockchain is then adopted when it is newer than the last event
+        of this node and its precision is at least the local fused score. It goes through the cooldown of the room
+        state machine like local detections. A transaction is considered once, so an idle room doesn't adopt the same
+        event again every time the cooldown ends.
+
+        :param top: The best fused class of the current window.
+        :type top: FusedEvent
+        :param now: The current monotonic time.
+        :type now: float
+        :return: The adopted event, or None.
+        :rtype: FusedEvent
+        """
+        if top is None or self.events.active is not None or \
+                top.score >= self.events.settings(top.label).enter_threshold:
+            return None
+
+        logging.debug(
+            f"Event {top.label} with {round(top.score, 3)} precision is below the limit "
+            f"established, proceding with the BC search.")
+        last_event_registered_bc = NetworkUtils.get_last_event_blockchain(
+            "INFERENCE", self.blockchain.pending_transactions, self.sender, self.last_event_timestamp)
+        if last_event_registered_bc is None:
+            return None
+
+        logging.debug(f"Last event registered in {self.local} is {last_event_registered_bc}")
+        self.last_event_timestamp = last_event_registered_bc["DATA"]["TIMESTAMP"]
+        precision = float(last_event_registered_bc["DATA"]["PRECISION"])
+        action = last_event_registered_bc["DATA"]["EVENT_ACTION"]
+        if precision < top.score:
+            return None
+
+        event = self.events.accept(top._replace(label=action, score=precision), now)
+        if event is not None:
+            logging.info(f'[COLABORATIVE CONCLUSION] {event.label} ({event.score})')
+        return event
+
+    def process_detection(self, event):
+        """
+        Registers a fused detection event as a blockchain transaction, publishes it to Home Assistant when the node is
+        the coordinator and broadcasts it to the network.
+
+        :param event: The fused detection event.
+        :type event: FusedEvent
         :return: None
         """
-        exp_backoff_time = 0
-        while self.running:
-            if len(self.connections) < 1 and self.recon_state is True:
-                self.blockchain.nodes[self.ip] = time.time()
-                print("Attempting to reconnect...")
-                exp_backoff_time = self.keep_alive_timeout + exp_backoff_time
-                time.sleep(exp_backoff_time)
-            elif len(self.connections) > 0 and self.recon_state is True:
-                print("Coordinator not seen for a while. Starting new election...")
-                self.coordinator = None
-                self.handle_election()
-                self.recon_state = False
-                break
+        transaction_type = Transaction.TYPE_AUDIO_INFERENCE.value if event.modality == AUDIO \
+            else Transaction.TYPE_VIDEO_INFERENCE.value
+        logging.info(f'[{event.modality.upper()} + FUSION] {event.label} ({event.score}, audio {event.audio_score}, '
+                     f'video {event.video_score})')
 
-    def handle_keep_alive_messages(self, client_id):
-        """
-        The ``handle_keep_alive_messages`` method sends keep-alive messages to the specified connection periodically
-        to maintain the connection. The keep-alive message
-        includes information such as the sender's metadata, message type, last time alive, coordinator information, and
-        public key. If an exception occurs during the process, the function breaks the loop and closes the connection.
+        transaction_with_signature = self.create_blockchain_transaction(
+            event.label, 'INFERENCE', self.local, transaction_type, str(event.score))
 
-        :param client_id: The unique identifier of the connected peer node.
-        :type client_id: <bytes>
-        :return: None
-        """
-        neighbour_id = uuid.UUID(client_id.decode('utf-8'))
-        neighbour = self.neighbours.get(neighbour_id)
-        while self.running:
-            try:
-                data = MessageHandlerUtils.create_keep_alive_message(str(self.id), self.ip, self.port,
-                                                                     str(neighbour_id), str(self.coordinator),
-                                                                     Messages.MESSAGE_TYPE_PING.value)
-
-                if neighbour is not None and neighbour['PUBLIC_KEY'] is None:
-                    data["PAYLOAD"]["PUBLIC_KEY"] = NetworkUtils.key_to_json(self.public_key)
-
-                time.sleep(2)
-                message = json.dumps(data, indent=2)
-                self.broadcast_message(message)
-                time.sleep(self.keep_alive_timeout * 2)
-            except socket.error as e:
-                logging.error(f"Socket error: {e.args}")
-                break
+        homeassistant_data = MessageHandlerUtils.create_homeassistant_message(
+            str(self.id), event.label, self.local)
 
-            except Exception as ex:
-                logging.error(f"Exception error in Keep Alive: {ex.args}")
-                break
+        if transaction_with_signature is not None:
+            self.last_event_timestamp = transaction_with_signature["DATA"]["TIMESTAMP"]
+        self.publish_event(transaction_with_signature, homeassistant_data)
 
-    def handle_chain_message(self, message, conn, neighbour_id, message_type):
+    def handle_reconnects(self, peer):
         """
-        Handles incoming chain-related messages between nodes in the blockchain network.
-
-        This method processes different types of chain messages based on their message type.
-        It allows the current node to respond to requests for the blockchain or update its own blockchain
-        based on received chain information.
-
-        :param message: The incoming message data.
-        :param conn: The connection object representing the connection with the sending node.
-        :param neighbour_id: The ID of the neighboring node that sent the message.
-        :param message_type: The type of the incoming message (request or response).
+        The ``handle_reconnects`` method reacts to the loss of a peer. The node redials the peer through the reconnect
+        manager when it is the node that dials their link, the peer redials it otherwise, and starts a new election
+        when the lost peer was the coordinator.
 
+        :param peer: The lost peer.
+        :type peer: <Peer>
         :return: None
         """
-        if message_type == Messages.MESSAGE_TYPE_REQUEST_CHAIN.value:
-            if self.coordinator == self.id:
-                data = MessageHandlerUtils.create_general_message(str(self.id), self.ip, self.port,
-                                                                  conn.getpeername()[0],
-                                                                  conn.getpeername()[1],
-                                                                  str(neighbour_id), str(self.coordinator),
-                                                                  Messages.MESSAGE_TYPE_RESPONSE_CHAIN.value)
+        if not self.running:
+            return
 
-                data["PAYLOAD"]["CHAIN"] = self.blockchain.chain
+        if dials(self.id, peer.id):
+            self.reconnects.request(peer.id, (peer.ip, peer.port, str(peer.id).encode('utf-8'),
+                                              (peer.local or '').encode('utf-8')))
 
-                message_json = json.dumps(data, indent=2)
-                logging.info(f"CHAIN MESSAGE: {message_json}")
-                conn.send(bytes(message_json, encoding="utf-8"))
-        elif message_type == Messages.MESSAGE_TYPE_RESPONSE_CHAIN.value:
-            self.blockchain.chain = message["PAYLOAD"].get("CHAIN")
-            logging.info(f"IP: {self.ip} , CHAIN: {self.blockchain.chain}")
-            logging.info("Blockchain chain was updated with information from coordinator")
+        if peer.id == self.coordinator:
+            logging.info("Coordinator lost. Starting new election...")
+            self.handle_election()
 
-    def handle_transaction_message(self, message, conn, neighbour_id, message_type):
+    def handle_peer_failure(self, peer):
         """
-        Handles incoming transaction-related messages between nodes in the blockchain network.
-
-        This method processes different types of transaction messages based on their message type.
-        It allows the current node to respond to requests for pending transactions or validate and
-        incorporate received transactions into its pending transaction pool.
-
-        :param message: The incoming message data.
-        :param conn: The connection object representing the connection with the sending node.
-        :param neighbour_id: The ID of the neighboring node that sent the message.
-        :param message_type: The type of the incoming message (request or response).
+        The ``handle_peer_failure`` method disconnects a peer the failure detector suspects to have failed, like a
+        connection timeout does, without waiting for the timeout.
 
+        :param peer: The suspected peer.
+        :type peer: <Peer>
         :return: None
         """
+        self.remove_node(peer.conn, "FailureDetector")
         try:
-            if message_type == Messages.MESSAGE_TYPE_REQUEST_TRANSACTION.value:
-                for tx in self.blockchain.pending_transactions:
-                    data = MessageHandlerUtils.create_transaction_message(
-                        Messages.MESSAGE_TYPE_RESPONSE_TRANSACTION.value, str(neighbour_id))
-
-                    data["PAYLOAD"]["PENDING"] = [tx]
-                    message = json.dumps(data, indent=2)
-                    conn.send(bytes(message, encoding="utf-8"))
-
-            elif message_type == Messages.MESSAGE_TYPE_RESPONSE_TRANSACTION.value:
-                tx_list = message["PAYLOAD"]["PENDING"]
-
-                if isinstance(tx_list, list):
-                    for transaction_with_signature in tx_list:
-                        tx = transaction_with_signature["DATA"]
-                        signature = transaction_with_signature["SIGNATURE"]
-                        if transaction_with_signature not in self.blockchain.pending_transactions:
-                            if validate_transaction(tx, signature):
-                                logging.info("[TRANSACTION] Transaction validated and inserted in blockchain")
-
-                                self.blockchain.pending_transactions.append(transaction_with_signature)
-                                # logging.info(f"\nPending Transactions: {self.blockchain.pending_transactions}")
-                            else:
-                                logging.warning("Received invalid transaction")
-                                return
-                        else:
-                            logging.warning(f"Transaction {tx} already in pending transactions!")
-                else:
-                    logging.warning("Invalid transaction format")
-
-        except Exception as e:
-            logging.error(f"Handle transaction message error: {e}")
-
-    def handle_general_message(self, message, conn, neighbour_id, message_type=Messages.MESSAGE_TYPE_PONG.value):
-        """
-        Handles incoming general messages between nodes in the blockchain network.
-
-        This method processes general messages exchanged between nodes and handles the coordination
-        of network activities, such as setting the network coordinator and exchanging public keys.
-
-        :param message: The incoming message data.
-        :param conn: The connection object representing the connection with the sending node.
-        :param neighbour_id: The ID of the neighboring node that sent the message.
-        :param message_type: The type of the incoming message (default: PONG message type).
-
-        :return: None
-        """
-        if self.coordinator is None:
-            self.coordinator = uuid.UUID(message["PAYLOAD"].get("COORDINATOR"))
-
-            logging.info(f"Network Coordinator is {self.coordinator}")
-
-            message_type = Messages.MESSAGE_TYPE_REQUEST_TRANSACTION.value
-
-        neighbour = self.neighbours.get(neighbour_id)
-        if neighbour is not None and neighbour['PUBLIC_KEY'] is None:
-            public_key_base64 = message['PAYLOAD']['PUBLIC_KEY']
-            public_key = NetworkUtils.load_key_from_json(public_key_base64)
-            if public_key is not None:
-                self.neighbours[neighbour_id]['PUBLIC_KEY'] = public_key
-
-        data = MessageHandlerUtils.create_general_message(str(self.id), self.ip, self.port, conn.getpeername()[0],
-                                                          conn.getpeername()[1],
-                                                          str(neighbour_id), str(self.coordinator), message_type)
-
-        if neighbour is not None and neighbour['PUBLIC_KEY'] is None:
-            data["PAYLOAD"]["PUBLIC_KEY"] = NetworkUtils.key_to_json(self.public_key)
-
-        message_json = json.dumps(data, indent=2)
-        conn.send(bytes(message_json, encoding="utf-8"))
+            # wakes up the message handler blocked on the connection
+            peer.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        peer.conn.close()
 
     def handle_messages(self, conn):
         """
 
         The ``handle_messages`` method handles incoming messages from a peer node. It listens for messages on the
         connection object and responds to them appropriately. If the received message is a valid JSON message,
-        it extracts the message type and processes it accordingly. If the message is empty, it updates the node's
-        priority and breaks the loop. If there is a socket timeout or OSError, the method sets the ``recon_state``
-        flag to True and removes the node from the list of connections. If the connection is reset, it also removes
-        the node from the list and closes the connection.
+        it extracts the message type and processes it accordingly. Messages split over several reads, or sharing one
+        read, are reassembled by a ``MessageStream``. If the message is empty, it updates the node's
+        priority, removes the node from the list of connections and breaks the loop. If there is a socket timeout,
+        OSError or the connection is reset, it also removes the node from the list and closes the connection, and the
+        lost node is redialed by ``handle_reconnects``.
 
         :param conn: socket connection object representing the connection to the peer node
         :type conn: <socket.socket>
         :return: None
         """
+        stream = MessageStream()
         while self.running:
             try:
-                data = conn.recv(BUFFER_SIZE).decode()
+                data = conn.recv(BUFFER_SIZE)
 
                 if not data:
                     logging.info(f"Data not found {data}")
                     self.service_info.priority = random.randint(1, 100)
                     self.zeroconf.update_service(self.service_info)
+                    if conn in self.registry:
+                        self.remove_node(conn, "Closed")
                     break
 
-                message = json.loads(data)
-                message_type = message.get("TYPE")
-
-                if Messages.MESSAGE_TYPE_PING.value != message_type and Messages.MESSAGE_TYPE_PONG.value != message_type: logging.info(
-                    f"[MESSAGE TYPE]: {message_type}")
-
-                neighbour_id = uuid.UUID(message['META']['FROM_ADDRESS']['ID'])
-
-                if message_type == Messages.MESSAGE_TYPE_REQUEST_TRANSACTION.value:
-                    self.handle_transaction_message(message, conn, str(neighbour_id), message_type)
-
-                elif message_type == Messages.MESSAGE_TYPE_RESPONSE_TRANSACTION.value:
-                    self.handle_transaction_message(message, conn, str(neighbour_id), message_type)
-
-                elif message_type == Messages.MESSAGE_TYPE_REQUEST_CHAIN.value:
-                    self.handle_chain_message(message, conn, str(neighbour_id), message_type)
+                # any message is a sign of life of the peer, not only the keep-alive messages
+                peer = self.registry.lookup(conn)
+                if peer is not None:
+                    self.heartbeat.received(peer.id)
 
-                elif message_type == Messages.MESSAGE_TYPE_RESPONSE_CHAIN.value:
-                    self.handle_chain_message(message, conn, neighbour_id, message_type)
-
-                elif message_type == Messages.MESSAGE_TYPE_PING.value:
-                    self.handle_general_message(message, conn, neighbour_id)
+                for message in stream.feed(data):
+                    self.handle_message(message, conn)
 
             except json.JSONDecodeError as e:
                 logging.error("Error decoding JSON:", e)
@@ -608,36 +606,59 @@ class Node(threading.Thread):
                 break
 
             except socket.timeout as e:
-                logging.error("Error timeout:", e.args)
-                self.recon_state = True
-                if conn in self.connections:
+                logging.error(f"Error timeout: {e.args}")
+                if conn in self.registry:
                     self.remove_node(conn, "Timeout")
                     conn.close()
-                    handle_reconects = threading.Thread(target=self.handle_reconnects)
-                    handle_reconects.start()
                     break
 
             except ConnectionResetError as c:
                 logging.error(f"Connection Reset Error {c.strerror}")
-                if conn in self.connections:
+                if conn in self.registry:
                     self.remove_node(conn, "ConnectionResetError")
                     conn.close()
                 break
 
             except OSError as e:
                 logging.error(f"System Error {e.strerror}")
-                if conn in self.connections:
+                if conn in self.registry:
                     self.remove_node(conn, "OSError")
                     conn.close()
                 break
 
             except Exception as ex:
                 logging.error(f"Exception Error {ex.args}")
-                if conn in self.connections:
+                if conn in self.registry:
                     self.remove_node(conn, "Exception")
                     conn.close()
                 break
 
+    def handle_hello_message(self, message, conn, neighbour_id):
+        """
+        Registers an accepted connection once the dialing node introduced itself, unless the nodes are already linked
+        by the connection that wins the tie-break, in which case the new connection is closed.
+
+        :param message: The HELLO message.
+        :type message: dict
+        :param conn: socket connection object the message was received on
+        :type conn: <socket.socket>
+        :param neighbour_id: The ID of the dialing node.
+        :type neighbour_id: uuid.UUID
+        :return: None
+        """
+        port = message['META']['FROM_ADDRESS'].get('PORT')
+        local = message['PAYLOAD'].get('LOCAL', '')
+        if not self.add_node(conn, str(neighbour_id), local, port, inbound=True):
+            logging.info(f"[CONNECTION] Duplicate link from {neighbour_id} closed")
+            conn.close()
+            return
+
+        conn.settimeout(self.keep_alive_timeout * 3)
+        # the peer reconnected by itself
+        self.reconnects.cancel(neighbour_id)
+        self.list_peers()
+        self.push_chain(self.registry.lookup(conn))
+
     def create_blockchain_transaction(self, event_action, event_type, event_local, event_description="",
                                       event_accuracy="1.0"):
         """
@@ -683,17 +704,27 @@ class Node(threading.Thread):
 
         return None
 
-    def broadcast_message(self, message):
+    def handle_slow_peer(self, conn):
         """
-        The ``broadcast_message`` method broadcasts a message to all connected peers. The message is encoded and sent to
-        each peer using the ``sendall`` method of the socket object.
+        The ``handle_slow_peer`` method removes a peer whose connection was closed by its outbound queue, because the
+        peer was too slow or the connection failed.
 
-        :param message: The message to be broadcast
-        :type message: <bytes>
+        :param conn: socket connection object of the peer
+        :type conn: <socket.socket>
         :return: None
         """
-        for peer in self.connections:
-            peer.sendall(bytes(message, encoding="utf-8"))
+        self.remove_node(conn, "PeerConnection")
+
+    def peer_of(self, conn):
+        """
+        The ``peer_of`` method returns the registered peer of a connection, see ``NodeProtocol``.
+
+        :param conn: socket connection object of the peer
+        :type conn: <socket.socket>
+        :return: The peer, or None if the connection isn't registered.
+        :rtype: <Peer>
+        """
+        return self.registry.lookup(conn)
 
     def list_peers(self):
         """Prints a list of all connected peers.
@@ -704,8 +735,8 @@ class Node(threading.Thread):
         :return: None
         """
         print("\nPeers:")
-        for i, conn in enumerate(self.connections):
-            print(f"[{i}] <{conn.getpeername()[0]}:{conn.getpeername()[1]}>")
+        for i, peer in enumerate(self.registry):
+            print(f"[{i}] <{peer.ip}:{peer.port}>")
 
     def stop(self):
         """
@@ -713,36 +744,55 @@ class Node(threading.Thread):
         :return: None
         """
         self.running = False
+        self.reconnects.stop()
+        self.election.stop()
+        self.heartbeat.stop()
+        self.coalescer.stop()
         self.zeroconf.close()
 
-    def add_node(self, conn, client_id, node_local):
+    def add_node(self, conn, client_id, node_local, port=None, inbound=False):
         """
         The ``add_node`` method checks if the node is already in the list of connections, if the node is not in the list
         of connections add the new node to the BlockchainService network and to the list of node peer connections.
 
         :param node_local: The local where the node is set
+        :type node_local: <bytes> or <str>
         :param client_id:The ID of the new node.
-        :type client_id: <bytes>
+        :type client_id: <bytes> or <str>
         :param conn: A socket connection object representing the new node to be added.
         :type conn: <socket.socket>
-        :return: None
-        """
-        for connections in self.connections:
-            if connections.getpeername()[0] == conn.getpeername()[0]:
-                return
-        client_id = client_id.decode('utf-8')
-        node_local = node_local.decode('utf-8')
-        if conn not in self.connections:
-            self.connections.append(conn)
-            self.blockchain.register_node({conn.getpeername()[0]: time.time()})
-
-            new_client_id = uuid.UUID(client_id)
-            new_ip = conn.getpeername()[0]
-            new_public_key = None
-            self.neighbours[new_client_id] = {'IP': new_ip, 'PUBLIC_KEY': new_public_key, 'LOCAL': node_local}
-
-            logging.info(f"Node [{conn.getpeername()[0]}] added to the network")
-            logging.info(f"Nodes in Blockchain: [IP:TIMESTAMP]{self.blockchain.nodes}")
+        :param port: The port the new node listens on, defaults to the port of the connection.
+        :type port: <int>
+        :param inbound: Whether the connection was accepted from the new node rather than dialed.
+        :type inbound: <bool>
+        :return: True if the node was added, False if a link to the node is already registered.
+        :rtype: <bool>
+        """
+        ip, conn_port = conn.getpeername()[:2]
+        address = (ip, port or conn_port)
+        new_client_id = uuid.UUID(client_id.decode('utf-8') if isinstance(client_id, bytes) else client_id)
+        node_local = node_local.decode('utf-8') if isinstance(node_local, bytes) else node_local
+        outbound = PeerConnection(conn, f'{address[0]}:{address[1]}', maxsize=PEER_QUEUE_SIZE,
+                                  high_water=PEER_QUEUE_HIGH_WATER, slow_timeout=PEER_SLOW_TIMEOUT,
+                                  on_close=self.handle_slow_peer)
+        added, replaced = self.registry.link(Peer(new_client_id, conn, address, node_local, outbound, inbound),
+                                             self.id)
+        if not added:
+            outbound.close()
+            return False
+        if replaced is not None:
+            # both nodes dialed each other, keep the link dialed by the node with the smaller ID
+            logging.info(f"[CONNECTION] Replaced duplicate link to {new_client_id}")
+            replaced.outbound.close()
+            replaced.conn.close()
+
+        self.heartbeat.track(new_client_id)
+        self.blockchain.register_node({address[0]: time.time()})
+        self.registry.update_neighbour(new_client_id, IP=address[0], PUBLIC_KEY=None, LOCAL=node_local)
+
+        logging.info(f"Node [{address[0]}] added to the network")
+        logging.info(f"Nodes in Blockchain: [IP:TIMESTAMP]{self.blockchain.nodes}")
+        return True
 
     def remove_node(self, conn, function):
         """
@@ -755,8 +805,15 @@ class Node(threading.Thread):
         :return: None
         """
         logging.info(f"Removed by {function}")
-        if conn in self.connections:
-            logging.info(f"Node {conn} removed from the network")
-            self.connections.remove(conn)
+        peer = self.registry.remove(conn)
+        if peer is not None:
+            logging.info(f"Node {peer.ip}:{peer.port} removed from the network")
+            self.heartbeat.forget(peer.id)
+            self.pings.pop(peer.id, None)
+            peer.outbound.close()
+            if not peer.inbound:
+                # the TLS 1.3 session ticket of the connection arrived after its handshake
+                self.sessions.save(peer.address, conn)
+            self.handle_reconnects(peer)
         logging.info(f"Nodes still available:")
         self.list_peers()
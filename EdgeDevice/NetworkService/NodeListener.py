@@ -19,7 +19,8 @@ class NodeListener:
         Adds a service to the node's peer list, if it is not already present.
 
         This method retrieves the IP addresses of the service and adds them as peers, if they are different from
-        the IP address of the node itself. It uses the Zeroconf instance to get the service information.
+        the IP address of the node itself. It uses the Zeroconf instance to get the service information. The peers are
+        only queued to be dialed by the reconnect manager of the node, so a slow dial never blocks the zeroconf thread.
 
         :param zeroconf: The Zeroconf instance that discovered the service.
         :type zeroconf: <Zeroconf>
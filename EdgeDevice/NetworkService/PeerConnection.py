@@ -0,0 +1,200 @@
+import logging
+import queue
+import socket
+import threading
+import time
+
+from EdgeDevice.utils.metrics import metrics
+
+
+class PeerConnection:
+    """
+        Outbound side of a peer connection: a bounded queue of messages drained by a dedicated writer thread.
+
+        ``send`` only queues the message, so broadcasting to every peer costs the caller one queue operation per peer
+        no matter how slow their links are, and a peer stuck in a blocking ``sendall`` (e.g. a TLS peer that stopped
+        reading) only stalls its own writer. The writer sends everything queued in one ``sendall``. A queue above its
+        high-water mark marks the peer as slow; a peer that stays slow for ``slow_timeout`` seconds, or whose queue is
+        full, is disconnected, since it would otherwise miss messages anyway and resynchronizes its chain and pending
+        transactions when it reconnects.
+
+        :arg conn (socket.socket): The socket of the connection.
+        :arg name (str): Name of the peer in the logs, e.g. its address.
+        :arg maxsize (int): Maximum number of queued messages.
+        :arg high_water (int): Number of queued messages over which the peer is slow.
+        :arg slow_since (float): Monotonic time the peer became slow, or None.
+        :arg last_sent (float): Monotonic time messages were last sent to the peer, or the connection was created.
+        :arg closed (bool): Whether the connection was closed.
+    """
+
+    def __init__(self, conn, name=None, maxsize=64, high_water=48, slow_timeout=10.0, on_close=None):
+        """
+            Initializes an instance of the PeerConnection class, and starts its writer thread.
+
+            :param conn: The socket of the connection.
+            :type conn: socket.socket
+            :param name: Name of the peer in the logs, defaults to its address.
+            :type name: str
+            :param maxsize: Maximum number of queued messages.
+            :type maxsize: int
+            :param high_water: Number of queued messages over which the peer is slow.
+            :type high_water: int
+            :param slow_timeout: Seconds a peer can stay slow before it is disconnected.
+            :type slow_timeout: float
+            :param on_close: Function called with the connection when it is closed because of a failure or a slow
+                             peer, on the thread that detected it.
+            :type on_close: callable
+        """
+        self.conn = conn
+        self.name = name or self.address(conn)
+        self.maxsize = maxsize
+        self.high_water = high_water
+        self.slow_timeout = slow_timeout
+        self.on_close = on_close
+        self.queue = queue.Queue(maxsize)
+        self.lock = threading.Lock()
+        self.slow_since = None
+        self.closed = False
+        self.sent = 0
+        self.last_sent = time.monotonic()
+        self.thread = threading.Thread(target=self.run, name=f'{self.name}-WRITER', daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def address(conn):
+        """
+        Formats the address of the peer of a socket.
+
+        :param conn: The socket of the connection.
+        :type conn: socket.socket
+        :return: The address as ip:port, or the socket itself when it's not connected.
+        :rtype: str
+        """
+        try:
+            ip, port = conn.getpeername()[:2]
+            return f'{ip}:{port}'
+        except OSError:
+            return str(conn)
+
+    def send(self, data):
+        """
+        Queues a message for the peer, without blocking.
+
+        :param data: The encoded message.
+        :type data: bytes
+        :return: True if the message was queued, False if the connection is closed or was closed because the peer
+                 is too slow.
+        :rtype: bool
+        """
+        if self.closed:
+            return False
+
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            self.fail(f"outbound queue full ({self.maxsize} messages)")
+            return False
+
+        depth = self.queue.qsize()
+        if depth < self.high_water:
+            self.slow_since = None
+        elif self.slow_since is None:
+            self.slow_since = time.monotonic()
+            metrics.increment('PEER_SLOW')
+            logging.warning(f"[PEER] {self.name} is slow, {depth} messages queued")
+        elif time.monotonic() - self.slow_since > self.slow_timeout:
+            self.fail(f"slow for more than {self.slow_timeout}s")
+            return False
+        return True
+
+    def run(self):
+        """
+        Sends the queued messages until the connection is closed, everything queued at once in a single ``sendall``.
+
+        :return: None
+        """
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            chunks = [data]
+            while True:
+                try:
+                    data = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if data is None:
+                    self.write(chunks)
+                    return
+                chunks.append(data)
+            if not self.write(chunks):
+                return
+
+    def write(self, chunks):
+        """
+        Sends messages to the peer.
+
+        :param chunks: The encoded messages.
+        :type chunks: list[bytes]
+        :return: True if they were sent, False if the connection failed.
+        :rtype: bool
+        """
+        try:
+            self.conn.sendall(b''.join(chunks))
+        except (OSError, ValueError) as e:
+            self.fail(f"send error {e}")
+            return False
+        self.sent += len(chunks)
+        self.last_sent = time.monotonic()
+        return True
+
+    def fail(self, reason):
+        """
+        Disconnects the peer after a failure, and notifies the owner of the connection.
+
+        :param reason: Why the peer is disconnected.
+        :type reason: str
+        :return: None
+        """
+        if not self.close():
+            return
+        metrics.increment('PEER_DISCONNECTS')
+        logging.warning(f"[PEER] Disconnecting {self.name}: {reason}")
+        try:
+            # wakes up the reader of the connection, which cleans it up
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if self.on_close is not None:
+            self.on_close(self.conn)
+
+    def close(self):
+        """
+        Stops the writer once the messages already queued are sent. The socket itself is left to its owner.
+
+        :return: False if the connection was already closed.
+        :rtype: bool
+        """
+        with self.lock:
+            if self.closed:
+                return False
+            self.closed = True
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return True
+            except queue.Full:
+                # the writer is stuck, drop what it didn't send so it stops after its current message
+                self.clear()
+
+    def clear(self):
+        """
+        Drops the queued messages.
+
+        :return: None
+        """
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
@@ -0,0 +1,353 @@
+import json
+import logging
+import time
+import uuid
+
+from EdgeDevice.BlockchainService.Transaction import validate_transaction
+from EdgeDevice.utils.constants import Messages
+from EdgeDevice.utils.helper import NetworkUtils, MessageHandlerUtils
+
+
+class NodeProtocol:
+    """
+        The messages the nodes exchange, independent of the transport, shared by ``Node`` and the ``SimNode`` of the
+        simulator so both run the same protocol.
+
+        The peers are the ``Peer`` entries of the connection registry, and messages are sent through their outbound
+        queue. A transport identifies the connection a message was received on by a link of its own (a socket for
+        ``Node``, the ID of the sending node in the simulator), and provides:
+
+        - ``peer_of(link)``, the registered peer of a link, or None.
+        - ``handle_hello_message(message, link, neighbour_id)``, registering the peer that dialed a link.
+
+        The class expects the ``id``, ``ip``, ``port``, ``public_key``, ``coordinator``, ``registry``, ``blockchain``,
+        ``election``, ``coalescer``, ``homeassistant_listener`` and ``pings`` attributes of the node.
+    """
+
+    def general_message(self, peer, message_type):
+        """
+        Creates a general message to a peer, carrying the coordinator and term of the node.
+
+        :param peer: The peer.
+        :type peer: Peer
+        :param message_type: The type of the message.
+        :type message_type: str
+        :return: The message.
+        :rtype: dict
+        """
+        data = MessageHandlerUtils.create_general_message(str(self.id), self.ip, self.port, peer.ip, peer.port,
+                                                          str(peer.id), str(self.coordinator), message_type)
+        data["PAYLOAD"]["TERM"] = self.election.term
+        return data
+
+    def send_to(self, peer, message):
+        """
+        Encodes a message and queues it on the outbound queue of a peer.
+
+        :param peer: The peer.
+        :type peer: Peer
+        :param message: The message.
+        :type message: dict
+        :return: None
+        """
+        peer.outbound.send(bytes(json.dumps(message, indent=2), encoding="utf-8"))
+
+    def handle_message(self, message, link):
+        """
+        Dispatches a message received from a peer node to the handler of its type. Only a HELLO message is handled on
+        a link whose peer isn't registered.
+
+        :param message: The decoded message.
+        :type message: dict
+        :param link: The link the message was received on.
+        :return: None
+        """
+        message_type = message.get("TYPE")
+        if message_type not in (Messages.MESSAGE_TYPE_PING.value, Messages.MESSAGE_TYPE_PONG.value):
+            logging.info(f"[MESSAGE TYPE]: {message_type}")
+
+        neighbour_id = uuid.UUID(message['META']['FROM_ADDRESS']['ID'])
+        if message_type == Messages.MESSAGE_TYPE_HELLO.value:
+            self.handle_hello_message(message, link, neighbour_id)
+            return
+
+        peer = self.peer_of(link)
+        if peer is None:
+            return
+
+        if message_type == Messages.MESSAGE_TYPE_PING.value:
+            self.handle_general_message(message, peer, Messages.MESSAGE_TYPE_PONG.value)
+
+        elif message_type == Messages.MESSAGE_TYPE_PONG.value:
+            sent = self.pings.pop(peer.id, None)
+            if sent is not None:
+                self.election.rtt.add(time.monotonic() - sent)
+            # only the dialing node pings, it learns the coordinator and public key of the peer from the answer
+            self.handle_general_message(message, peer, None)
+
+        elif message_type == Messages.MESSAGE_TYPE_REQUEST_TRANSACTION.value:
+            self.send_transactions(peer)
+
+        elif message_type == Messages.MESSAGE_TYPE_RESPONSE_TRANSACTION.value:
+            self.handle_transactions(message["PAYLOAD"].get("PENDING"))
+
+        elif message_type == Messages.MESSAGE_TYPE_REQUEST_CHAIN.value:
+            self.push_chain(peer)
+
+        elif message_type == Messages.MESSAGE_TYPE_RESPONSE_CHAIN.value:
+            self.receive_chain(message["PAYLOAD"].get("CHAIN"))
+
+        elif message_type in (Messages.MESSAGE_TYPE_ELECTION.value, Messages.MESSAGE_TYPE_ELECTION_OK.value,
+                              Messages.MESSAGE_TYPE_COORDINATOR.value):
+            coordinator = message["PAYLOAD"].get("COORDINATOR")
+            self.election.receive(peer.id, message_type, message["PAYLOAD"].get("TERM", 0),
+                                  uuid.UUID(coordinator) if coordinator not in (None, "None") else None)
+
+    def handle_general_message(self, message, peer, message_type):
+        """
+        Learns the coordinator and public key of a peer from a PING or PONG and answers it. A node that learns the
+        coordinator asks the peer for its pending transactions.
+
+        :param message: The message.
+        :type message: dict
+        :param peer: The peer.
+        :type peer: Peer
+        :param message_type: The type of the answer, None to only answer when the coordinator was learnt.
+        :type message_type: str
+        :return: None
+        """
+        coordinator = message["PAYLOAD"].get("COORDINATOR")
+        if coordinator not in (None, "None"):
+            # the coordinator of the peer is adopted unless it is stale or outranked by this node, see BullyElection
+            learnt = self.coordinator is None
+            self.election.receive(peer.id, Messages.MESSAGE_TYPE_COORDINATOR.value, message["PAYLOAD"].get("TERM", 0),
+                                  uuid.UUID(coordinator))
+            if learnt and self.coordinator is not None:
+                message_type = Messages.MESSAGE_TYPE_REQUEST_TRANSACTION.value
+
+        neighbour = self.registry.neighbours.get(peer.id)
+        if neighbour is not None and neighbour['PUBLIC_KEY'] is None and message['PAYLOAD'].get('PUBLIC_KEY'):
+            public_key = NetworkUtils.load_key_from_json(message['PAYLOAD']['PUBLIC_KEY'])
+            if public_key is not None:
+                self.registry.update_neighbour(peer.id, PUBLIC_KEY=public_key)
+
+        if message_type is None:
+            return
+
+        data = self.general_message(peer, message_type)
+        self.offer_public_key(data, neighbour)
+        self.send_to(peer, data)
+
+    def offer_public_key(self, data, neighbour):
+        """
+        Adds the public key of the node to a message for a neighbour that doesn't know it yet.
+
+        :param data: The message.
+        :type data: dict
+        :param neighbour: The IP, public key and local of the neighbour, or None.
+        :type neighbour: dict
+        :return: None
+        """
+        if self.public_key is not None and neighbour is not None and neighbour['PUBLIC_KEY'] is None:
+            data["PAYLOAD"]["PUBLIC_KEY"] = NetworkUtils.key_to_json(self.public_key)
+
+    def send_heartbeat(self, peer):
+        """
+        Sends a keep-alive message to a peer, called by the heartbeat scheduler when nothing else was sent to the peer
+        for a while. The message carries the coordinator and term of the node, and its public key until the peer knows
+        it.
+
+        :param peer: The peer to ping.
+        :type peer: Peer
+        :return: None
+        """
+        if peer is None:
+            return
+        data = MessageHandlerUtils.create_keep_alive_message(str(self.id), self.ip, self.port, str(peer.id),
+                                                             str(self.coordinator), Messages.MESSAGE_TYPE_PING.value)
+        data["PAYLOAD"]["TERM"] = self.election.term
+        self.offer_public_key(data, self.registry.neighbours.get(peer.id))
+
+        self.pings[peer.id] = time.monotonic()
+        self.send_to(peer, data)
+
+    def send_election(self, peer_id, message_type, term, coordinator):
+        """
+        Sends an ELECTION, ELECTION_OK or COORDINATOR message of the election to a peer.
+
+        :param peer_id: The ID of the peer.
+        :type peer_id: uuid.UUID
+        :param message_type: The type of the message.
+        :type message_type: str
+        :param term: The term of the election.
+        :type term: int
+        :param coordinator: The announced coordinator of a COORDINATOR message, or None.
+        :type coordinator: uuid.UUID
+        :return: None
+        """
+        peer = self.registry.get(peer_id)
+        if peer is None:
+            return
+        data = self.general_message(peer, message_type)
+        data["PAYLOAD"]["COORDINATOR"] = str(coordinator)
+        data["PAYLOAD"]["TERM"] = term
+        self.send_to(peer, data)
+
+    def handle_coordinator(self, coordinator, term):
+        """
+        Called by the election when the coordinator changes. The coordinator publishes the detections to Home
+        Assistant.
+
+        :param coordinator: The new coordinator, or None while an election is in progress.
+        :type coordinator: uuid.UUID
+        :param term: The term of the election.
+        :type term: int
+        :return: None
+        """
+        self.coordinator = coordinator
+        if coordinator is None:
+            return
+
+        logging.info(f"[ELECTION] Network Coordinator is {coordinator} (term {term})")
+        if coordinator == self.id and self.homeassistant_listener.ident is None:
+            self.homeassistant_listener.start()
+
+    def push_chain(self, peer):
+        """
+        Sends the chain to a peer when the node is the coordinator, e.g. to a new peer.
+
+        :param peer: The peer.
+        :type peer: Peer
+        :return: None
+        """
+        if peer is None or self.coordinator != self.id:
+            return
+        data = self.general_message(peer, Messages.MESSAGE_TYPE_RESPONSE_CHAIN.value)
+        data["PAYLOAD"]["CHAIN"] = self.blockchain.chain
+        self.send_to(peer, data)
+
+    def receive_chain(self, chain):
+        """
+        Replaces the chain of the node by the chain of the coordinator.
+
+        :param chain: The chain.
+        :type chain: list[dict]
+        :return: None
+        """
+        self.blockchain.chain = chain
+        logging.info("Blockchain chain was updated with information from coordinator")
+
+    def transactions_message(self, transactions):
+        """
+        Creates a RECEIVE_TRANSACTION message carrying a list of transactions.
+
+        :param transactions: The signed transactions.
+        :type transactions: list[dict]
+        :return: The message.
+        :rtype: dict
+        """
+        data = MessageHandlerUtils.create_transaction_message(Messages.MESSAGE_TYPE_RESPONSE_TRANSACTION.value,
+                                                             str(self.id))
+        data["PAYLOAD"]["PENDING"] = transactions
+        return data
+
+    def send_transactions(self, peer):
+        """
+        Sends the pending transactions to a peer, in batches of the size of the broadcast ones.
+
+        :param peer: The peer.
+        :type peer: Peer
+        :return: None
+        """
+        pending = list(self.blockchain.pending_transactions)
+        batch_size = self.coalescer.max_items
+        for i in range(0, len(pending), batch_size):
+            self.send_to(peer, self.transactions_message(pending[i:i + batch_size]))
+
+    def broadcast_transactions(self, transactions):
+        """
+        Broadcasts a batch of transactions to all connected peers, in a single message per peer. The message is
+        encoded once and queued on the outbound queue of each peer, so a slow peer never delays the caller or the
+        other peers.
+
+        :param transactions: The signed transactions.
+        :type transactions: list[dict]
+        :return: None
+        """
+        data = bytes(json.dumps(self.transactions_message(transactions), indent=2), encoding="utf-8")
+        for peer in self.registry:
+            peer.outbound.send(data)
+
+    def handle_transactions(self, transactions):
+        """
+        Adds the new valid transactions received from a peer to the pending transactions. A batch is dropped from its
+        first invalid transaction.
+
+        :param transactions: The received transactions.
+        :type transactions: list[dict]
+        :return: None
+        """
+        if not isinstance(transactions, list):
+            logging.warning("Invalid transaction format")
+            return
+
+        try:
+            for transaction in transactions:
+                if not self.is_new_transaction(transaction):
+                    logging.debug(f"Transaction {transaction['DATA']} already in pending transactions!")
+                    continue
+                if not self.verify_transaction(transaction):
+                    logging.warning("Received invalid transaction")
+                    return
+                self.add_transaction(transaction)
+        except Exception as e:
+            logging.error(f"Handle transaction message error: {e}")
+
+    def is_new_transaction(self, transaction):
+        """
+        Tells whether a transaction isn't in the pending transactions yet.
+
+        :param transaction: The transaction.
+        :type transaction: dict
+        :rtype: bool
+        """
+        return transaction not in self.blockchain.pending_transactions
+
+    def verify_transaction(self, transaction):
+        """
+        Verifies the signature of a transaction by its sender.
+
+        :param transaction: The transaction.
+        :type transaction: dict
+        :rtype: bool
+        """
+        return validate_transaction(transaction["DATA"], transaction["SIGNATURE"])
+
+    def add_transaction(self, transaction):
+        """
+        Adds a received transaction to the pending transactions.
+
+        :param transaction: The transaction.
+        :type transaction: dict
+        :return: None
+        """
+        logging.info("[TRANSACTION] Transaction validated and inserted in blockchain")
+        self.blockchain.pending_transactions.append(transaction)
+
+    def publish_event(self, transaction, homeassistant_data):
+        """
+        Publishes a detection event registered by the node to Home Assistant when the node is the coordinator, and
+        queues its transaction for broadcast. Transactions of an activity burst are broadcast together, see
+        ``TransactionCoalescer``.
+
+        :param transaction: The transaction of the event, or None if it was already pending.
+        :type transaction: dict
+        :param homeassistant_data: The message published to Home Assistant.
+        :type homeassistant_data: dict
+        :return: None
+        """
+        if self.coordinator == self.id and self.coordinator is not None:
+            self.homeassistant_listener.publish_message(homeassistant_data)
+
+        if transaction is not None:
+            self.coalescer.add(transaction)
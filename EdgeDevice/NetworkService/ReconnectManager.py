@@ -0,0 +1,198 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from EdgeDevice.utils.metrics import metrics
+
+
+class ReconnectManager:
+    """
+        Dials peers on a pool of worker threads, retrying failed dials with capped exponential backoff and jitter.
+
+        Callers, e.g. the zeroconf callbacks or the failure detector, only ``request`` a dial and return at once. Each
+        peer has its own backoff state: after the n-th failed attempt it is retried after a random delay between 0 and
+        ``min(cap, base * 2^n)`` seconds ("full jitter"), so after an outage every node redials every peer in parallel
+        within a fraction of a second, then backs off without the nodes retrying in lockstep, and no thread spins while
+        waiting.
+
+        :arg base (float): Delay cap of the first retry, in seconds.
+        :arg cap (float): Maximum delay between two attempts, in seconds.
+        :arg max_attempts (int): Number of failed attempts after which a peer is given up, None to retry forever.
+        :arg attempts (dict): Number of failed attempts of each pending peer.
+        :arg targets (dict): Target and request number of each pending peer, the scheduled attempts of an earlier
+                             request of a peer are dropped.
+    """
+
+    def __init__(self, dial, workers=4, base=0.5, cap=30.0, max_attempts=None, rng=None):
+        """
+            Initializes an instance of the ReconnectManager class.
+
+            :param dial: Function making one attempt to connect to a peer, called with the target of the request on a
+                         worker thread. It returns True when the peer is connected (or no longer needs to be), False
+                         or raises to be retried.
+            :type dial: callable
+            :param workers: Number of dials run concurrently.
+            :type workers: int
+            :param base: Delay cap of the first retry, in seconds.
+            :type base: float
+            :param cap: Maximum delay between two attempts, in seconds.
+            :type cap: float
+            :param max_attempts: Number of failed attempts after which a peer is given up, None to retry forever.
+            :type max_attempts: int
+            :param rng: Random generator of the jitter.
+            :type rng: random.Random
+        """
+        self.dial = dial
+        self.workers = workers
+        self.base = base
+        self.cap = cap
+        self.max_attempts = max_attempts
+        self.rng = rng or random.Random()
+        self.condition = threading.Condition()
+        self.schedule = []
+        self.requests = itertools.count()
+        self.targets = {}
+        self.attempts = {}
+        self.running = False
+        self.executor = None
+        self.thread = None
+
+    def delay(self, attempts):
+        """
+        Draws the delay before the next attempt to dial a peer.
+
+        :param attempts: Number of failed attempts so far.
+        :type attempts: int
+        :return: The delay in seconds.
+        :rtype: float
+        """
+        return self.rng.uniform(0, min(self.cap, self.base * 2 ** attempts))
+
+    def start(self):
+        """
+        Starts the scheduler thread and the worker pool.
+
+        :return: self object
+        """
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='RECONNECT')
+        self.thread = threading.Thread(target=self.run, name='RECONNECT-SCHEDULER', daemon=True)
+        self.thread.start()
+        return self
+
+    def request(self, key, target):
+        """
+        Asks for a peer to be dialed as soon as possible, unless it is already pending.
+
+        :param key: Identifies the peer, e.g. its node ID.
+        :param target: Passed to the dial function, e.g. the address of the peer.
+        :return: True if a dial was scheduled, False if the peer was already pending.
+        :rtype: bool
+        """
+        with self.condition:
+            if key in self.targets:
+                return False
+            number = next(self.requests)
+            self.targets[key] = (target, number)
+            self.attempts[key] = 0
+            heapq.heappush(self.schedule, (time.monotonic(), number, key))
+            self.condition.notify()
+            return True
+
+    def cancel(self, key):
+        """
+        Stops dialing a peer, e.g. because it connected to the node.
+
+        :param key: Identifies the peer.
+        :return: None
+        """
+        with self.condition:
+            self.targets.pop(key, None)
+            self.attempts.pop(key, None)
+
+    def pending(self, key):
+        """
+        Tells whether a peer is waiting to be dialed or being dialed.
+
+        :param key: Identifies the peer.
+        :return: True if the peer is pending.
+        :rtype: bool
+        """
+        return key in self.targets
+
+    def run(self):
+        """
+        Hands the due dials over to the worker pool, until the manager is stopped.
+
+        :return: None
+        """
+        with self.condition:
+            while self.running:
+                if not self.schedule:
+                    self.condition.wait()
+                    continue
+                due, number, key = self.schedule[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+                heapq.heappop(self.schedule)
+                target, current = self.targets.get(key, (None, None))
+                if current == number:
+                    self.executor.submit(self.attempt, key, target, number)
+
+    def attempt(self, key, target, number):
+        """
+        Dials a peer once, and schedules the next attempt if it failed.
+
+        :param key: Identifies the peer.
+        :param target: Passed to the dial function.
+        :param number: The request the attempt belongs to.
+        :type number: int
+        :return: None
+        """
+        metrics.increment('RECONNECT_ATTEMPTS')
+        try:
+            connected = self.dial(target)
+        except Exception as e:
+            logging.debug(f"[RECONNECT] Dialing {key} failed: {e}")
+            connected = False
+
+        with self.condition:
+            if self.targets.get(key, (None, None))[1] != number:
+                # the peer was cancelled, or requested again, meanwhile
+                return
+            if connected:
+                metrics.increment('RECONNECT_SUCCESSES')
+                del self.targets[key], self.attempts[key]
+                return
+
+            self.attempts[key] += 1
+            if self.max_attempts is not None and self.attempts[key] >= self.max_attempts:
+                logging.warning(f"[RECONNECT] Giving up on {key} after {self.attempts[key]} attempts")
+                metrics.increment('RECONNECT_GIVEN_UP')
+                del self.targets[key], self.attempts[key]
+                return
+
+            delay = self.delay(self.attempts[key])
+            logging.info(f"[RECONNECT] Retrying {key} in {delay:.2f}s (attempt {self.attempts[key] + 1})")
+            heapq.heappush(self.schedule, (time.monotonic() + delay, number, key))
+            self.condition.notify()
+
+    def stop(self):
+        """
+        Stops the scheduler and waits for the dials in progress.
+
+        :return: None
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
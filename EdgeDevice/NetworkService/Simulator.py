@@ -0,0 +1,1020 @@
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+import uuid
+from typing import NamedTuple, Any
+
+import psutil
+
+from EdgeDevice.BlockchainService.Blockchain import Blockchain
+from EdgeDevice.NetworkService.Coalescer import TransactionCoalescer
+from EdgeDevice.NetworkService.ConnectionRegistry import ConnectionRegistry, Peer, dials
+from EdgeDevice.NetworkService.Election import BullyElection
+from EdgeDevice.NetworkService.FailureDetector import HeartbeatScheduler
+from EdgeDevice.NetworkService.MessageStream import MessageStream
+from EdgeDevice.NetworkService.Protocol import NodeProtocol
+from EdgeDevice.utils.constants import Messages, Transaction
+from EdgeDevice.utils.helper import MessageHandlerUtils
+
+DELIVER = "DELIVER"
+FLUSH = "FLUSH"
+CALL = "CALL"
+
+
+class LoopbackNetwork:
+    """
+        In-memory network between simulated nodes, standing in for their TLS sockets.
+
+        Every ``send`` is delivered to the receiving node after the link latency plus a random jitter, by a single
+        delivery thread, unless it is lost, with a probability of ``loss``, or the nodes are on different sides of a
+        partition, at the time of the send or of the delivery.
+
+        :arg latency (float): One way delay of the links, in seconds.
+        :arg jitter (float): Maximum random delay added to the latency, in seconds.
+        :arg loss (float): Probability of a message to be lost.
+        :arg sent (int): Number of messages sent.
+        :arg delivered (int): Number of messages delivered.
+        :arg dropped (int): Number of messages lost or dropped by a partition.
+        :arg bytes (int): Number of bytes delivered.
+    """
+
+    def __init__(self, latency=0.001, jitter=0.0, loss=0.0, seed=None):
+        """
+            Initializes an instance of the LoopbackNetwork class.
+
+            :param latency: One way delay of the links, in seconds.
+            :type latency: float
+            :param jitter: Maximum random delay added to the latency, in seconds.
+            :type jitter: float
+            :param loss: Probability of a message to be lost.
+            :type loss: float
+            :param seed: Seed of the random latencies and losses.
+            :type seed: int
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.endpoints = {}
+        self.groups = None
+        self.events = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes = 0
+
+    def attach(self, node_id, deliver):
+        """
+        Connects a node to the network.
+
+        :param node_id: The ID of the node.
+        :param deliver: Function called with the sender ID and the data of each message delivered to the node.
+        :type deliver: callable
+        :return: None
+        """
+        with self.condition:
+            self.endpoints[node_id] = deliver
+
+    def detach(self, node_id):
+        """
+        Disconnects a node, e.g. when it crashes: the messages to it are dropped.
+
+        :param node_id: The ID of the node.
+        :return: None
+        """
+        with self.condition:
+            self.endpoints.pop(node_id, None)
+
+    def partition(self, *groups):
+        """
+        Splits the network: only the nodes of the same group reach each other, until ``heal``.
+
+        :param groups: The node IDs of each side of the partition.
+        :type groups: Iterable
+        :return: None
+        """
+        with self.condition:
+            self.groups = {node_id: i for i, group in enumerate(groups) for node_id in group}
+
+    def heal(self):
+        """
+        Ends the partition.
+
+        :return: None
+        """
+        with self.condition:
+            self.groups = None
+
+    def reachable(self, source, destination):
+        """
+        Tells whether a node reaches another one, i.e. both are attached and on the same side of any partition.
+
+        :param source: The ID of the sending node.
+        :param destination: The ID of the receiving node.
+        :return: True if a message can be delivered.
+        :rtype: bool
+        """
+        groups = self.groups
+        if destination not in self.endpoints:
+            return False
+        return groups is None or groups.get(source) == groups.get(destination)
+
+    def send(self, source, destination, data, reliable=False):
+        """
+        Sends a message, without blocking.
+
+        :param source: The ID of the sending node.
+        :param destination: The ID of the receiving node.
+        :param data: The encoded message.
+        :type data: bytes
+        :param reliable: Whether the message can't be lost, e.g. the handshake of a connection, although it is still
+                         dropped by a partition.
+        :type reliable: bool
+        :return: False if the message was lost or dropped.
+        :rtype: bool
+        """
+        with self.condition:
+            self.sent += 1
+            if not self.reachable(source, destination) or (not reliable and self.rng.random() < self.loss):
+                self.dropped += 1
+                return False
+            delivery = time.monotonic() + self.latency + self.rng.uniform(0, self.jitter)
+            number = next(self.sequence)
+            heapq.heappush(self.events, (delivery, number, source, destination, data))
+            if self.events[0][1] == number:
+                # the message is due before the one the delivery thread waits for
+                self.condition.notify()
+            return True
+
+    def run(self):
+        """
+        Delivers the messages when they are due, until the network is stopped.
+
+        :return: None
+        """
+        while True:
+            with self.condition:
+                while self.running and (not self.events or self.events[0][0] > time.monotonic()):
+                    self.condition.wait(self.events[0][0] - time.monotonic() if self.events else None)
+                if not self.running:
+                    return
+                _, _, source, destination, data = heapq.heappop(self.events)
+                deliver = self.endpoints.get(destination) if self.reachable(source, destination) else None
+                if deliver is None:
+                    self.dropped += 1
+                    continue
+                self.delivered += 1
+                self.bytes += len(data)
+            deliver(source, data)
+
+    def start(self):
+        """
+        Starts the delivery thread.
+
+        :return: self object
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='LOOPBACK-NETWORK', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the delivery thread, dropping the messages in flight.
+
+        :return: None
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+
+class SimService(NamedTuple):
+    """The service a simulated node announces, like the zeroconf service info of a node."""
+    id: Any
+    address: tuple
+    local: str
+
+
+class SimDiscovery:
+    """
+        Stands in for zeroconf: every node registered is announced to the nodes already registered, and those to it.
+
+        :arg nodes (dict): The registered nodes, by node ID.
+    """
+
+    def __init__(self):
+        """
+            Initializes an instance of the SimDiscovery class.
+        """
+        self.nodes = {}
+        self.lock = threading.Lock()
+
+    def register(self, node):
+        """
+        Registers the service of a node, and announces it.
+
+        :param node: The node.
+        :type node: SimNode
+        :return: None
+        """
+        with self.lock:
+            others = list(self.nodes.values())
+            self.nodes[node.id] = node
+        for other in others:
+            other.call(other.discovered, node.service)
+            node.call(node.discovered, other.service)
+
+    def unregister(self, node):
+        """
+        Removes the service of a node.
+
+        :param node: The node.
+        :type node: SimNode
+        :return: None
+        """
+        with self.lock:
+            self.nodes.pop(node.id, None)
+
+    def announce(self):
+        """
+        Announces every service again, as zeroconf does when the network changes, e.g. after a partition healed.
+
+        :return: None
+        """
+        with self.lock:
+            nodes = list(self.nodes.values())
+        for node in nodes:
+            for other in nodes:
+                if other is not node:
+                    node.call(node.discovered, other.service)
+
+
+class SimBlockchain(Blockchain):
+    """Blockchain of a simulated node, whose clock is the local clock instead of being synchronized over NTP."""
+
+    def sync_clocks(self):
+        self.local_time_offset = 0.0
+
+
+class SimHomeassistant:
+    """
+        Stands in for the MQTT client of Home Assistant, recording the messages the coordinator publishes.
+
+        :arg messages (list): The published messages, with the monotonic time they were published at.
+    """
+
+    def __init__(self):
+        """
+            Initializes an instance of the SimHomeassistant class.
+        """
+        self.messages = []
+        # like the thread identifier of the MQTT client, set once it is started
+        self.ident = None
+
+    def start(self):
+        """
+        Marks the client as started, when the node becomes the coordinator.
+
+        :return: None
+        """
+        self.ident = threading.get_ident()
+
+    def publish_message(self, message):
+        """
+        Records a message published to Home Assistant.
+
+        :param message: The message.
+        :type message: dict
+        :return: None
+        """
+        self.messages.append((time.monotonic(), message))
+
+
+class SimLink:
+    """
+        One end of the link between two simulated nodes, used as both the connection and the outbound queue of a
+        ``Peer``, like a socket and its ``PeerConnection``.
+
+        :arg last_sent (float): Monotonic time a message was last sent on the link, or the link was created.
+        :arg sent (int): Number of messages sent on the link.
+    """
+
+    def __init__(self, network, source, destination):
+        """
+            Initializes an instance of the SimLink class.
+
+            :param network: The network the link is on.
+            :type network: LoopbackNetwork
+            :param source: The ID of the node owning this end of the link.
+            :param destination: The ID of the node at the other end.
+        """
+        self.network = network
+        self.source = source
+        self.destination = destination
+        self.last_sent = time.monotonic()
+        self.sent = 0
+
+    def send(self, data, reliable=False):
+        """
+        Sends a message to the node at the other end.
+
+        :param data: The encoded message.
+        :type data: bytes
+        :param reliable: Whether the message can't be lost.
+        :type reliable: bool
+        :return: False if the message was lost or dropped.
+        :rtype: bool
+        """
+        self.sent += 1
+        self.last_sent = time.monotonic()
+        return self.network.send(self.source, self.destination, data, reliable)
+
+    def close(self):
+        """
+        Closes the link, nothing is queued on it.
+
+        :return: True
+        :rtype: bool
+        """
+        return True
+
+
+class SimNode(NodeProtocol):
+    """
+        A node of the simulated mesh, running the message handlers of ``Node`` (see ``NodeProtocol``) with the same
+        network components (connection registry, message stream, transaction coalescer, heartbeat scheduler with its
+        phi accrual failure detectors, and Bully election), but without sockets, TLS, zeroconf, NTP, MQTT or inference.
+
+        Everything the node does runs on its own thread, fed by an inbox, so the CPU time of that thread is the CPU
+        time of the node. The transactions aren't signed, the simulation measures the network layer.
+
+        :arg id (uuid.UUID): The ID of the node.
+        :arg coordinator (uuid.UUID): The coordinator the node knows, or None.
+        :arg received (dict): Monotonic time each transaction was first received or created at, by transaction ID.
+        :arg chain_synced (float): Monotonic time the chain was last received from the coordinator, or None.
+        :arg cpu (float): CPU seconds used by the node thread.
+    """
+
+    def __init__(self, name, network, discovery, address, local="SALA", node_id=None, heartbeat_interval=1.0,
+                 phi_threshold=8.0, min_std=0.2, election_timeouts=(0.05, 1.0), batch_window=0.01, batch_size=8):
+        """
+            Initializes an instance of the SimNode class.
+
+            :param name: The name of the node, e.g. "Node-1".
+            :type name: str
+            :param network: The network of the node.
+            :type network: LoopbackNetwork
+            :param discovery: The discovery service of the node.
+            :type discovery: SimDiscovery
+            :param address: The IP address and port of the node, only used in the messages.
+            :type address: tuple[str, int]
+            :param local: Where the node is set.
+            :type local: str
+            :param node_id: The ID of the node, a random one by default.
+            :type node_id: uuid.UUID
+            :param heartbeat_interval: Seconds without sending anything to a peer after which it is pinged.
+            :type heartbeat_interval: float
+            :param phi_threshold: Phi over which a peer is suspected to have failed.
+            :type phi_threshold: float
+            :param min_std: Minimum standard deviation of the heartbeat intervals, in seconds.
+            :type min_std: float
+            :param election_timeouts: Lower and upper bounds of the election timeouts, in seconds.
+            :type election_timeouts: tuple[float, float]
+            :param batch_window: Maximum seconds a transaction waits to be broadcast with others.
+            :type batch_window: float
+            :param batch_size: Transactions broadcast without waiting for the window.
+            :type batch_size: int
+        """
+        self.id = node_id or uuid.uuid4()
+        self.name = name
+        self.network = network
+        self.discovery = discovery
+        self.ip, self.port = address
+        self.local = local
+        self.service = SimService(self.id, address, local)
+        # the transactions aren't signed, nor the public keys exchanged
+        self.public_key = None
+        self.registry = ConnectionRegistry({self.id: {"IP": self.ip, "PUBLIC_KEY": None, "LOCAL": local}})
+        self.blockchain = SimBlockchain()
+        self.homeassistant_listener = SimHomeassistant()
+        self.coordinator = None
+        self.streams = {}
+        self.pings = {}
+        self.received = {}
+        self.chain_synced = None
+        self.inbox = queue.Queue()
+        self.heartbeat = HeartbeatScheduler(self.registry, self.send_heartbeat, self.handle_peer_failure,
+                                            heartbeat_interval, phi_threshold, min_std)
+        self.election = BullyElection(self.id, lambda: [peer.id for peer in self.registry], self.send_election,
+                                      self.handle_coordinator, min_timeout=election_timeouts[0],
+                                      max_timeout=election_timeouts[1])
+        self.coalescer = TransactionCoalescer(lambda batch: self.inbox.put((FLUSH, batch)), batch_window, batch_size)
+        self.running = False
+        self.thread = None
+        self.cpu = 0.0
+
+    def start(self):
+        """
+        Starts the node thread, connects the node to the network and announces it.
+
+        :return: self object
+        """
+        self.running = True
+        self.network.attach(self.id, lambda source, data: self.inbox.put((DELIVER, source, data)))
+        self.coalescer.start()
+        self.thread = threading.Thread(target=self.run, name=f'{self.name}-SIM', daemon=True)
+        self.thread.start()
+        self.discovery.register(self)
+        return self
+
+    def stop(self):
+        """
+        Stops the node, like a crash: the peers only notice through their failure detectors.
+
+        :return: None
+        """
+        self.discovery.unregister(self)
+        self.network.detach(self.id)
+        self.running = False
+        self.inbox.put((CALL, lambda: None))
+        if self.thread is not None:
+            self.thread.join()
+        self.coalescer.stop()
+
+    def call(self, function, *args):
+        """
+        Runs a function on the node thread.
+
+        :param function: The function.
+        :type function: callable
+        :param args: The arguments of the function.
+        :return: None
+        """
+        self.inbox.put((CALL, function, *args))
+
+    def run(self):
+        """
+        Handles the inbox and the heartbeat and election timers, until the node is stopped.
+
+        :return: None
+        """
+        start = time.thread_time()
+        tick = self.heartbeat.interval / 4
+        next_tick = time.monotonic() + tick
+        while self.running:
+            deadline = next_tick if self.election.deadline is None else min(next_tick, self.election.deadline)
+            try:
+                kind, *args = self.inbox.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                kind = None
+
+            try:
+                if kind == DELIVER:
+                    self.handle_data(*args)
+                elif kind == FLUSH:
+                    self.broadcast_transactions(*args)
+                elif kind == CALL:
+                    args[0](*args[1:])
+
+                now = time.monotonic()
+                if now >= next_tick:
+                    self.heartbeat.tick(now)
+                    next_tick = now + tick
+                self.election.tick(now)
+            except Exception as e:
+                logging.error(f"[{self.name}] {kind} failed: {e}")
+            self.cpu = time.thread_time() - start
+
+    def discovered(self, service):
+        """
+        Links the node to a discovered node, when it is the node that dials their link, like ``connect_to_peer``.
+
+        :param service: The service of the discovered node.
+        :type service: SimService
+        :return: None
+        """
+        if self.registry.get(service.id) is not None or not dials(self.id, service.id):
+            return
+        if not self.network.reachable(self.id, service.id):
+            return
+
+        peer = self.link(service.id, service.address, service.local, inbound=False)
+        hello = self.general_message(peer, Messages.MESSAGE_TYPE_HELLO.value)
+        hello["PAYLOAD"]["LOCAL"] = self.local
+        # the connection is established by the TCP handshake, it isn't lost
+        peer.outbound.send(bytes(json.dumps(hello, indent=2), encoding="utf-8"), reliable=True)
+        self.send_heartbeat(peer)
+        self.push_chain(peer)
+
+    def link(self, peer_id, address, local, inbound):
+        """
+        Registers the link to a peer, like ``Node.add_node``.
+
+        :param peer_id: The ID of the peer.
+        :type peer_id: uuid.UUID
+        :param address: The IP address and port of the peer.
+        :type address: tuple[str, int]
+        :param local: Where the peer is set.
+        :type local: str
+        :param inbound: Whether the peer dialed the link.
+        :type inbound: bool
+        :return: The registered peer.
+        :rtype: Peer
+        """
+        link = SimLink(self.network, self.id, peer_id)
+        peer = Peer(peer_id, link, tuple(address), local, link, inbound)
+        added, replaced = self.registry.link(peer, self.id)
+        if not added:
+            return self.registry.get(peer_id)
+        self.streams[peer_id] = MessageStream()
+        self.heartbeat.track(peer_id)
+        self.registry.update_neighbour(peer_id, IP=address[0], PUBLIC_KEY=None, LOCAL=local)
+        return peer
+
+    def handle_data(self, source, data):
+        """
+        Decodes the data received from a node, like ``Node.handle_messages``.
+
+        :param source: The ID of the sending node.
+        :type source: uuid.UUID
+        :param data: The data.
+        :type data: bytes
+        :return: None
+        """
+        peer = self.registry.get(source)
+        stream = self.streams.get(source) if peer is not None else MessageStream()
+        if peer is not None:
+            self.heartbeat.received(source)
+        for message in stream.feed(data):
+            self.handle_message(message, source)
+
+    def handle_hello_message(self, message, source, neighbour_id):
+        """
+        Registers the link a node dialed, like ``Node.handle_hello_message``, and sends it the chain when the node is
+        the coordinator.
+
+        :param message: The HELLO message.
+        :type message: dict
+        :param source: The ID of the sending node.
+        :type source: uuid.UUID
+        :param neighbour_id: The ID of the dialing node.
+        :type neighbour_id: uuid.UUID
+        :return: None
+        """
+        address = (message['META']['FROM_ADDRESS']['IP'], message['META']['FROM_ADDRESS']['PORT'])
+        peer = self.link(source, address, message['PAYLOAD'].get('LOCAL', ''), inbound=True)
+        self.push_chain(peer)
+
+    def peer_of(self, source):
+        """
+        Returns the registered peer of a sending node, see ``NodeProtocol``.
+
+        :param source: The ID of the sending node.
+        :type source: uuid.UUID
+        :return: The peer, or None if the node isn't linked.
+        :rtype: Peer
+        """
+        return self.registry.get(source)
+
+    def receive_chain(self, chain):
+        """
+        Replaces the chain of the node by the chain of the coordinator, and records when it was received.
+
+        :param chain: The chain.
+        :type chain: list[dict]
+        :return: None
+        """
+        super().receive_chain(chain)
+        self.chain_synced = time.monotonic()
+
+    def is_new_transaction(self, transaction):
+        """
+        Tells whether a transaction wasn't received or created by the node yet, by its ID.
+
+        :param transaction: The transaction.
+        :type transaction: dict
+        :rtype: bool
+        """
+        return transaction["DATA"]["ID"] not in self.received
+
+    def verify_transaction(self, transaction):
+        """
+        Accepts every transaction, the transactions of the simulation aren't signed.
+
+        :param transaction: The transaction.
+        :type transaction: dict
+        :rtype: bool
+        """
+        return True
+
+    def add_transaction(self, transaction):
+        """
+        Adds a received transaction to the pending transactions, and records when it was received.
+
+        :param transaction: The transaction.
+        :type transaction: dict
+        :return: None
+        """
+        self.received[transaction["DATA"]["ID"]] = time.monotonic()
+        super().add_transaction(transaction)
+
+    def handle_peer_failure(self, peer):
+        """
+        Removes a peer suspected by the failure detector, redials it when the node dials their link, and elects a new
+        coordinator when it was the coordinator, like ``Node.handle_reconnects``.
+
+        :param peer: The suspected peer.
+        :type peer: Peer
+        :return: None
+        """
+        self.registry.remove(peer.conn)
+        self.heartbeat.forget(peer.id)
+        self.streams.pop(peer.id, None)
+        self.pings.pop(peer.id, None)
+        # a crashed or partitioned peer isn't reachable, it is announced again when it comes back
+        self.discovered(SimService(peer.id, peer.address, peer.local))
+        if peer.id == self.coordinator:
+            self.election.elect()
+
+    def detect(self, action, transaction_id=None, accuracy="1.0"):
+        """
+        Registers a detection event as a transaction, publishes it to Home Assistant when the node is the coordinator
+        and queues it for broadcast, like ``Node.process_detection``.
+
+        :param action: The detected action.
+        :type action: str
+        :param transaction_id: The ID of the transaction, a random one by default.
+        :type transaction_id: str
+        :param accuracy: The accuracy of the detection.
+        :type accuracy: str
+        :return: The ID of the transaction.
+        :rtype: str
+        """
+        transaction_id = transaction_id or uuid.uuid4().hex
+        transaction = {
+            "DATA": {
+                "ID": transaction_id,
+                "TIMESTAMP": self.blockchain.get_synchronized_time(),
+                "SENDER": str(self.id),
+                "EVENT_ACTION": action,
+                "EVENT_TYPE": Transaction.TYPE_AUDIO_INFERENCE.value,
+                "EVENT_LOCAL": self.local,
+                "EVENT_ACCURACY": accuracy,
+            },
+            "SIGNATURE": None,
+        }
+        self.received[transaction_id] = time.monotonic()
+        self.blockchain.pending_transactions.append(transaction)
+        self.publish_event(transaction, MessageHandlerUtils.create_homeassistant_message(str(self.id), action,
+                                                                                        self.local))
+        return transaction_id
+
+
+class Simulation:
+    """
+        A mesh of simulated nodes on a loopback network, with the scenarios the benchmarks are made of.
+
+        :arg network (LoopbackNetwork): The network of the nodes.
+        :arg discovery (SimDiscovery): The discovery service of the nodes.
+        :arg nodes (list): The nodes, including the crashed ones.
+    """
+
+    def __init__(self, latency=0.001, jitter=0.0, loss=0.0, seed=None, **options):
+        """
+            Initializes an instance of the Simulation class.
+
+            :param latency: One way delay of the links, in seconds.
+            :type latency: float
+            :param jitter: Maximum random delay added to the latency, in seconds.
+            :type jitter: float
+            :param loss: Probability of a message to be lost.
+            :type loss: float
+            :param seed: Seed of the network and of the events.
+            :type seed: int
+            :param options: Options of the nodes, see ``SimNode``.
+        """
+        self.network = LoopbackNetwork(latency, jitter, loss, seed)
+        self.discovery = SimDiscovery()
+        self.rng = random.Random(seed)
+        self.options = options
+        self.nodes = []
+
+    @property
+    def alive(self):
+        """
+        The nodes that didn't crash.
+
+        :rtype: list[SimNode]
+        """
+        return [node for node in self.nodes if node.running]
+
+    def __enter__(self):
+        self.network.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def add_node(self, node_id=None):
+        """
+        Starts a new node, which discovers the running ones.
+
+        :param node_id: The ID of the node, a random one by default.
+        :type node_id: uuid.UUID
+        :return: The node.
+        :rtype: SimNode
+        """
+        i = len(self.nodes)
+        node = SimNode(f"Node-{i}", self.network, self.discovery, (f"10.0.{i // 250}.{i % 250 + 1}", 5000),
+                       node_id=node_id, **self.options)
+        self.nodes.append(node)
+        return node.start()
+
+    def crash(self, node):
+        """
+        Stops a node without notice.
+
+        :param node: The node.
+        :type node: SimNode
+        :return: None
+        """
+        node.stop()
+
+    def partition(self, *groups):
+        """
+        Splits the network between groups of nodes.
+
+        :param groups: The nodes of each side of the partition.
+        :type groups: Iterable[Iterable[SimNode]]
+        :return: None
+        """
+        self.network.partition(*[[node.id for node in group] for group in groups])
+
+    def heal(self):
+        """
+        Ends the partition, and announces the nodes again so the lost links are restored.
+
+        :return: None
+        """
+        self.network.heal()
+        self.discovery.announce()
+
+    def linked(self):
+        """
+        Tells whether every alive node is linked to every other one.
+
+        :rtype: bool
+        """
+        alive = self.alive
+        return all(len(node.registry) == len(alive) - 1 for node in alive)
+
+    def converged(self, nodes=None):
+        """
+        Tells whether the nodes agree on their highest node as the coordinator.
+
+        :param nodes: The nodes, all the alive nodes by default.
+        :type nodes: list[SimNode]
+        :return: True if they agree.
+        :rtype: bool
+        """
+        nodes = self.alive if nodes is None else nodes
+        leader = max(node.id for node in nodes)
+        return all(node.coordinator == leader and node.election.deadline is None for node in nodes)
+
+    @staticmethod
+    def wait_for(condition, timeout=30.0, interval=0.005):
+        """
+        Waits for a condition to hold.
+
+        :param condition: Function returning whether the condition holds.
+        :type condition: callable
+        :param timeout: Maximum seconds to wait.
+        :type timeout: float
+        :param interval: Seconds between two checks.
+        :type interval: float
+        :return: The seconds waited, or None on timeout.
+        :rtype: float
+        """
+        start = time.monotonic()
+        while not condition():
+            if time.monotonic() - start > timeout:
+                return None
+            time.sleep(interval)
+        return time.monotonic() - start
+
+    def elect(self, timeout=30.0):
+        """
+        Starts an election on every node, like nodes starting without a coordinator.
+
+        :param timeout: Maximum seconds to wait for the election to converge.
+        :type timeout: float
+        :return: The seconds until every node agreed on the coordinator, or None on timeout.
+        :rtype: float
+        """
+        for node in self.alive:
+            node.call(node.election.elect)
+        return self.wait_for(self.converged, timeout)
+
+    def coordinator(self):
+        """
+        Returns the alive node that is the coordinator.
+
+        :rtype: SimNode
+        """
+        return next(node for node in self.alive if node.coordinator == node.id)
+
+    def fail_over(self, timeout=30.0):
+        """
+        Crashes the coordinator.
+
+        :param timeout: Maximum seconds to wait for a new coordinator.
+        :type timeout: float
+        :return: The seconds until every node agreed on a new coordinator, including the failure detection, or None
+                 on timeout.
+        :rtype: float
+        """
+        self.crash(self.coordinator())
+        return self.wait_for(self.converged, timeout)
+
+    def events(self, count, rate=None, timeout=30.0):
+        """
+        Makes random nodes detect events, and waits for every node to receive them.
+
+        :param count: Number of events.
+        :type count: int
+        :param rate: Events per second, as fast as possible when None.
+        :type rate: float
+        :param timeout: Maximum seconds to wait for the events to reach every node.
+        :type timeout: float
+        :return: The THROUGHPUT in events per second and the LATENCY percentiles (P50 and P99, in seconds) of the
+                 events received by every node, and the ratio of the events DELIVERED to every node.
+        :rtype: dict
+        """
+        nodes = self.alive
+        ids = []
+        start = time.monotonic()
+        for i in range(count):
+            node = self.rng.choice(nodes)
+            transaction_id = f"{node.name}-{i}"
+            ids.append(transaction_id)
+            node.call(node.detect, "Fall", transaction_id)
+            if rate:
+                time.sleep(max(0.0, start + (i + 1) / rate - time.monotonic()))
+
+        self.wait_for(lambda: all(len(node.received) >= count for node in nodes), timeout)
+        end = time.monotonic()
+
+        latencies = []
+        for transaction_id in ids:
+            times = [node.received.get(transaction_id) for node in nodes]
+            if None not in times:
+                latencies.append(max(times) - min(times))
+        delivered = len(latencies) / count
+        last = max((max(node.received.values()) for node in nodes if node.received), default=end)
+        return {
+            "THROUGHPUT": round(len(latencies) / max(last - start, 1e-9), 1),
+            "LATENCY_P50": round(statistics.median(latencies), 4) if latencies else None,
+            "LATENCY_P99": round(sorted(latencies)[min(len(latencies) - 1, int(len(latencies) * 0.99))], 4)
+            if latencies else None,
+            "DELIVERED": round(delivered, 4),
+        }
+
+    def sync_chain(self, blocks, transactions_per_block=8, timeout=30.0):
+        """
+        Gives the coordinator a chain, then starts a node that joins the mesh and gets the chain from the coordinator.
+
+        :param blocks: Number of blocks of the chain.
+        :type blocks: int
+        :param transactions_per_block: Number of transactions of each block.
+        :type transactions_per_block: int
+        :param timeout: Maximum seconds to wait for the chain.
+        :type timeout: float
+        :return: The seconds from the start of the node to the chain being received, or None on timeout.
+        :rtype: float
+        """
+        coordinator = self.coordinator()
+        chain = []
+        for height in range(blocks):
+            transactions = [{"DATA": {"ID": f"BLOCK-{height}-{i}", "EVENT_ACTION": "Fall"}, "SIGNATURE": None}
+                            for i in range(transactions_per_block)]
+            chain.append(Blockchain.create_block(height, transactions, chain[-1]["HASH"] if chain else None,
+                                                 format(self.rng.getrandbits(64), "x"), coordinator.blockchain.target,
+                                                 time.time()))
+        coordinator.call(setattr, coordinator.blockchain, "chain", chain)
+        self.wait_for(lambda: coordinator.blockchain.chain is chain, timeout)
+
+        # the lowest possible ID, so the node doesn't take over as coordinator with an empty chain
+        start = time.monotonic()
+        node = self.add_node(uuid.UUID(int=1))
+        if self.wait_for(lambda: node.chain_synced is not None and len(node.blockchain.chain) == blocks,
+                         timeout) is None:
+            return None
+        return node.chain_synced - start
+
+    def usage(self):
+        """
+        Reports the CPU time of the node threads and the memory of the process.
+
+        :return: The mean and maximum CPU seconds per node, and the resident memory of the process in MB.
+        :rtype: dict
+        """
+        cpu = [node.cpu for node in self.nodes]
+        return {
+            "CPU_PER_NODE": round(statistics.mean(cpu), 4),
+            "CPU_MAX": round(max(cpu), 4),
+            "RSS_MB": round(psutil.Process(os.getpid()).memory_info().rss / 2 ** 20, 1),
+        }
+
+    def stop(self):
+        """
+        Stops the nodes and the network.
+
+        :return: None
+        """
+        for node in self.alive:
+            node.stop()
+        self.network.stop()
+
+
+def benchmark(count, events=200, blocks=100, latency=0.001, jitter=0.0, loss=0.0, seed=0):
+    """
+    Measures a mesh of nodes: cold start election, event throughput, chain sync of a joining node, coordinator fail
+    over, and the CPU and memory used.
+
+    :param count: Number of nodes.
+    :type count: int
+    :param events: Number of events detected.
+    :type events: int
+    :param blocks: Number of blocks of the chain synchronized.
+    :type blocks: int
+    :param latency: One way delay of the links, in seconds.
+    :type latency: float
+    :param jitter: Maximum random delay added to the latency, in seconds.
+    :type jitter: float
+    :param loss: Probability of a message to be lost.
+    :type loss: float
+    :param seed: Seed of the network and of the events.
+    :type seed: int
+    :return: The measures.
+    :rtype: dict
+    """
+    rss = psutil.Process(os.getpid()).memory_info().rss
+    with Simulation(latency, jitter, loss, seed) as simulation:
+        for _ in range(count):
+            simulation.add_node()
+        linked = simulation.wait_for(simulation.linked)
+        result = {"NODES": count, "LINKED": round(linked, 4) if linked is not None else None}
+        election = simulation.elect()
+        result["ELECTION"] = round(election, 4) if election is not None else None
+        result.update(simulation.events(events))
+        chain_sync = simulation.sync_chain(blocks)
+        result["CHAIN_SYNC"] = round(chain_sync, 4) if chain_sync is not None else None
+        fail_over = simulation.fail_over()
+        result["FAIL_OVER"] = round(fail_over, 4) if fail_over is not None else None
+        result.update(simulation.usage())
+        result["RSS_PER_NODE_KB"] = round((psutil.Process(os.getpid()).memory_info().rss - rss) / 1024 /
+                                          len(simulation.nodes), 1)
+        result["MESSAGES"] = simulation.network.delivered
+        result["DROPPED"] = simulation.network.dropped
+    return result
+
+
+def main():
+    """
+    Runs the benchmark for increasing numbers of nodes and prints a line of measures per run.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Simulate a mesh of nodes in one process and measure it.')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[3, 10, 25, 50], help='numbers of nodes to simulate')
+    parser.add_argument('--events', type=int, default=200, help='events detected in each run')
+    parser.add_argument('--blocks', type=int, default=100, help='blocks of the chain synchronized')
+    parser.add_argument('--latency', type=float, default=0.001, help='one way delay of the links, in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random delay added to the latency, in seconds')
+    parser.add_argument('--loss', type=float, default=0.0, help='probability of a message to be lost')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the network and of the events')
+    args = parser.parse_args()
+
+    for count in args.nodes:
+        print(json.dumps(benchmark(count, args.events, args.blocks, args.latency, args.jitter, args.loss,
+                                   args.seed)))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
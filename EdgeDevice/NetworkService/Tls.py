@@ -0,0 +1,228 @@
+import argparse
+import logging
+import os
+import socket
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from EdgeDevice.utils.metrics import metrics
+
+
+def server_context(certfile, keyfile):
+    """
+    Creates the TLS context of the node server, shared by every accepted connection.
+
+    The server issues session tickets, so peers reconnecting after a Wi-Fi blip resume their session with an
+    abbreviated handshake instead of a full one with the certificate signature.
+
+    :param certfile: Path of the certificate of the node.
+    :type certfile: str
+    :param keyfile: Path of the private key of the certificate.
+    :type keyfile: str
+    :return: The server context.
+    :rtype: ssl.SSLContext
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options &= ~ssl.OP_NO_TICKET
+    context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+    return context
+
+
+@lru_cache(maxsize=None)
+def client_context():
+    """
+    Returns the TLS context of the connections dialed by the node, created once and shared by every connection, as
+    loading the settings and ciphers of a context costs more than most handshakes.
+
+    The nodes use self-signed certificates, so the certificates are not verified, as before.
+
+    :return: The client context.
+    :rtype: ssl.SSLContext
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class SessionCache:
+    """
+        TLS sessions of the peers the node dialed, to resume them when the node reconnects.
+
+        A resumed session skips the certificate exchange and signature of a full handshake, which dominate the
+        handshake time on a Raspberry Pi or Jetson class device. With TLS 1.3 the session ticket arrives after the
+        handshake, so the session of a connection is saved again when it closes.
+
+        :arg maxsize (int): Maximum number of sessions kept, the least recently used one is dropped first.
+        :arg resumed (int): Number of handshakes that resumed a session.
+        :arg full (int): Number of full handshakes.
+    """
+
+    def __init__(self, maxsize=64):
+        """
+            Initializes an instance of the SessionCache class.
+
+            :param maxsize: Maximum number of sessions kept.
+            :type maxsize: int
+        """
+        self.maxsize = maxsize
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.resumed = 0
+        self.full = 0
+
+    def get(self, address):
+        """
+        Returns the session of a peer.
+
+        :param address: The IP address and port of the peer.
+        :type address: tuple[str, int]
+        :return: The session, or None.
+        :rtype: ssl.SSLSession
+        """
+        with self.lock:
+            return self.sessions.get(address)
+
+    def save(self, address, conn):
+        """
+        Saves the session of a connection dialed to a peer.
+
+        :param address: The IP address and port of the peer.
+        :type address: tuple[str, int]
+        :param conn: The TLS connection.
+        :type conn: ssl.SSLSocket
+        :return: None
+        """
+        try:
+            session = conn.session
+        except (AttributeError, ValueError, OSError):
+            return
+        if session is None:
+            return
+        with self.lock:
+            self.sessions[address] = session
+            self.sessions.move_to_end(address)
+            while len(self.sessions) > self.maxsize:
+                self.sessions.popitem(last=False)
+
+    def record(self, address, conn):
+        """
+        Counts the handshake of a new connection as resumed or full, in the cache and in the node metrics, and saves
+        its session.
+
+        :param address: The IP address and port of the peer.
+        :type address: tuple[str, int]
+        :param conn: The TLS connection, after its handshake.
+        :type conn: ssl.SSLSocket
+        :return: None
+        """
+        if conn.session_reused:
+            self.resumed += 1
+            metrics.increment('TLS_HANDSHAKES_RESUMED')
+        else:
+            self.full += 1
+            metrics.increment('TLS_HANDSHAKES_FULL')
+        self.save(address, conn)
+
+
+def benchmark_handshakes(certfile, keyfile, runs=50):
+    """
+    Measures the latency of full and resumed TLS handshakes with a certificate, against a local server.
+
+    :param certfile: Path of the certificate.
+    :type certfile: str
+    :param keyfile: Path of the private key of the certificate.
+    :type keyfile: str
+    :param runs: Number of handshakes of each kind.
+    :type runs: int
+    :return: The median latency in milliseconds of the FULL and RESUMED handshakes, and the RESUMED_RATIO of the
+             handshakes offered a session that did resume it.
+    :rtype: dict
+    """
+    server = server_context(certfile, keyfile)
+    listener = socket.create_server(('127.0.0.1', 0))
+    address = listener.getsockname()
+
+    def serve():
+        for _ in range(runs * 2 + 1):
+            conn, _ = listener.accept()
+            try:
+                with server.wrap_socket(conn, server_side=True) as tls:
+                    # application data after the handshake carries the TLS 1.3 session tickets
+                    tls.sendall(b'\0')
+                    tls.recv(1)
+            except (OSError, ssl.SSLError):
+                pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+
+    context = client_context()
+
+    def handshake(session=None):
+        start = time.perf_counter()
+        with context.wrap_socket(socket.create_connection(address), session=session) as tls:
+            elapsed = time.perf_counter() - start
+            tls.recv(1)
+            tls.sendall(b'\0')
+            return elapsed, tls.session, tls.session_reused
+
+    _, session, _ = handshake()
+    full = [handshake()[0] for _ in range(runs)]
+    resumed, reused = [], 0
+    for _ in range(runs):
+        elapsed, session, was_reused = handshake(session)
+        resumed.append(elapsed)
+        reused += was_reused
+
+    thread.join()
+    listener.close()
+    return {
+        'FULL': round(statistics.median(full) * 1000, 3),
+        'RESUMED': round(statistics.median(resumed) * 1000, 3),
+        'RESUMED_RATIO': reused / runs,
+    }
+
+
+def main():
+    """
+    Benchmarks the TLS handshakes of the node certificates, or of freshly generated RSA and ECDSA certificates.
+
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Measure the TLS handshake latency of the peer connections.')
+    parser.add_argument('--cert', help='certificate to benchmark, both key types are generated when omitted')
+    parser.add_argument('--key', help='private key of the certificate')
+    parser.add_argument('--runs', type=int, default=50, help='handshakes of each kind')
+    args = parser.parse_args()
+
+    if args.cert:
+        print(f'{args.cert}: {benchmark_handshakes(args.cert, args.key, args.runs)}')
+        return
+
+    from EdgeDevice.utils.helper import NetworkUtils
+
+    cwd = os.getcwd()
+    for key_type in ('RSA', 'ECDSA'):
+        with tempfile.TemporaryDirectory() as directory:
+            # generate_tls_keys writes the certificate to the Keys folder of the working directory
+            os.mkdir(os.path.join(directory, 'Keys'))
+            os.chdir(directory)
+            try:
+                NetworkUtils.generate_tls_keys(key_type)
+                cert, key = NetworkUtils.get_tls_keys()
+                print(f'{key_type}: {benchmark_handshakes(cert, key, args.runs)}')
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
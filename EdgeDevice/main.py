@@ -2,12 +2,13 @@ import logging
 import time
 from EdgeDevice.NetworkService.Node import Node
 from EdgeDevice.utils import HOST_NAME
+from EdgeDevice.utils.constants import Network
 from EdgeDevice.utils.helper import NetworkUtils
 
 
 def main():
     NetworkUtils.generate_keys()
-    NetworkUtils.generate_tls_keys()
+    NetworkUtils.generate_tls_keys(Network.TLS_KEY_TYPE.value)
 
     logging.basicConfig(level=logging.DEBUG, format='[%(levelname)s] %(message)s')
     time.sleep(1)
@@ -1,9 +1,11 @@
+import os
 import random
 import socket
 from enum import Enum
 
 HOST_PORT = random.randint(5000, 6000)
 BUFFER_SIZE = 4096
+MODELS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
 
 
 class Network(Enum):
@@ -13,10 +15,33 @@ class Network(Enum):
     COORDINATOR = "COORDINATOR"
     FOLLOWER = "FOLLOWER"
     CANDIDATE = "CANDIDATE"
+    TLS_KEY_TYPE = "ECDSA"  # key of the node TLS certificate, "ECDSA" (P-256) or "RSA"
+
+
+# Tuning of the network service. These are plain constants rather than Network members, since Enum members with equal
+# values are aliases of each other.
+TRANSACTION_BATCH_WINDOW = 0.05  # seconds a transaction waits to be broadcast together with the next ones
+TRANSACTION_BATCH_SIZE = 8  # transactions broadcast without waiting for the window
+PEER_QUEUE_SIZE = 64  # messages waiting to be sent to a peer, a peer with a full queue is disconnected
+PEER_QUEUE_HIGH_WATER = 48  # queued messages over which a peer is slow
+PEER_SLOW_TIMEOUT = 10.0  # seconds a peer can stay slow before it is disconnected
+HEARTBEAT_INTERVAL = 5.0  # seconds without sending anything to a peer after which it is pinged
+PHI_THRESHOLD = 8.0  # suspicion level of the phi accrual failure detector over which a peer is disconnected
+DIAL_TIMEOUT = 5.0  # seconds to connect to a peer and complete the TLS handshake
+RECONNECT_WORKERS = 4  # peers dialed concurrently
+RECONNECT_BASE_DELAY = 0.5  # seconds, maximum delay before the first redial of a peer, doubled on each failure
+RECONNECT_MAX_DELAY = 30.0  # seconds, maximum delay between two dials of a peer
+RECONNECT_MAX_ATTEMPTS = 20  # failed dials after which a peer is left to be rediscovered by zeroconf
+ELECTION_MIN_TIMEOUT = 0.2  # seconds, lower bound of the election timeouts derived from the round-trip time
+ELECTION_MAX_TIMEOUT = 5.0  # seconds, upper bound of the election timeouts
 
 
 class Messages(Enum):
     # Define constants for message types
+    MESSAGE_TYPE_HELLO = "HELLO"
+    MESSAGE_TYPE_ELECTION = "ELECTION"
+    MESSAGE_TYPE_ELECTION_OK = "ELECTION_OK"
+    MESSAGE_TYPE_COORDINATOR = "COORDINATOR"
     MESSAGE_TYPE_PING = "PING"
     MESSAGE_TYPE_PONG = "PONG"
     MESSAGE_TYPE_REQUEST_TRANSACTION = "REQUEST_TRANSACTION"
@@ -44,7 +69,30 @@ class Homeassistant(Enum):
 class Inference(Enum):
     VIDEO_LABEL = 'models/movinet_retrained_class.txt'
     VIDEO_MODEL = 'models/movinet_a0_int8.tflite'
-    VIDEO_NUM_THREADS = 4
+    VIDEO_NUM_THREADS = None  # None uses the thread count tuned for the model on this machine
     VIDEO_MAX_RESULTS = 4
     VIDEO_ALLOW_LIST = ['watching tv', 'washing dishes', 'reading book', 'eating burger', 'opening door']
     VIDEO_DENY_LIST = ['playing pinball', 'auctioning']
+    VIDEO_CAMERAS = ()  # extra camera sources of the room (indices or URLs), served by a shared classifier pool
+    AUDIO_MODEL = 'yamnet_retrained'  # or the quantized yamnet_retrained_float16 and yamnet_retrained_int8 exports
+    AUDIO_SILENCE_LABEL = 'silence'
+
+
+# Tuning of the inference service, plain constants for the same reason as the network ones.
+CAPTURE_QUEUE_SIZE = 8  # maximum number of audio windows and video frames waiting to be classified
+AUDIO_SILENCE_THRESHOLD = -50.0  # dBFS, same silence threshold used to prepare the training sounds
+AUDIO_FLUX_THRESHOLD = -35.0  # dB, spectral flux over which a quiet audio window is still classified
+AUDIO_CACHE_SIZE = 256  # audio windows whose class probabilities are kept, e.g. the windows of a replayed file
+VIDEO_CACHE_SIZE = 256  # videos and frames of a replayed file whose class probabilities are kept
+VIDEO_MOTION_THRESHOLD = 1.0  # mean absolute difference of downscaled grayscale frames
+VIDEO_KEEP_WARM = 5.0  # seconds, maximum interval between two classified frames without motion
+VIDEO_IDLE_RESET = 60.0  # seconds without motion after which the streaming states are cleared
+FUSION_WINDOW = 4.0  # seconds of audio windows and video frames fused together
+FUSION_THRESHOLD = 0.75
+FUSION_AUDIO_WEIGHT = 0.5
+FUSION_VIDEO_WEIGHT = 0.5
+FUSION_CLASS_WEIGHTS = {'water': (0.7, 0.3), 'washing dishes': (0.3, 0.7)}
+EVENT_EXIT_THRESHOLD = 0.5  # fused score under which the activity of a room ends (enter is FUSION_THRESHOLD)
+EVENT_MIN_DWELL = 1.5  # seconds a score must stay over/under a threshold to enter/leave an activity
+EVENT_COOLDOWN = 30.0  # minimum seconds between two events of the same activity in a room
+EVENT_CLASS_SETTINGS = {'knock': {'min_dwell': 0.0, 'cooldown': 5.0}}
@@ -1,3 +1,4 @@
+import os
 import socket
 import time
 import uuid
@@ -8,6 +9,8 @@ import psutil
 from pydub import AudioSegment
 
 from EdgeDevice.InferenceService.audio import AudioInference
+from EdgeDevice.InferenceService.video import VideoInference, VideoClassifierOptions
+from EdgeDevice.utils.constants import MODELS_DIRECTORY, Inference
 import rsa
 from collections import deque
 import cv2
@@ -19,6 +22,7 @@ from datetime import datetime, timedelta
 from cryptography import x509
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa as rsaCripto
+from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives import hashes
 from cryptography.x509.oid import NameOID
 import json
@@ -40,7 +44,12 @@ models = {
         {'name': 'yamnet_retrained', 'duration': 0.96, 'frequency': 16000, 'model': AudioInference, 'threshold': 0.6}
     ],
     'video': [
-        # {'name': 'charades', 'model': VideoInference}
+        {'name': 'movinet', 'model': VideoInference, 'threshold': 0.75,
+         'path': os.path.join(MODELS_DIRECTORY, 'movinet_a0_int8.tflite'),
+         'labels': os.path.join(MODELS_DIRECTORY, 'movinet_retrained_class.txt'),
+         'options': VideoClassifierOptions(max_results=Inference.VIDEO_MAX_RESULTS.value,
+                                           label_allow_list=Inference.VIDEO_ALLOW_LIST.value,
+                                           label_deny_list=Inference.VIDEO_DENY_LIST.value)}
     ]
 }
 
@@ -383,16 +392,31 @@ class NetworkUtils(object):
         return flag
 
     @staticmethod
-    def get_last_event_blockchain(search_type, block_chain_data):
+    def get_last_event_blockchain(search_type, block_chain_data, exclude_sender=None, after=0):
+        """
+        Get the most recent transaction of a given type.
+
+        :param search_type: The event type of the transactions, e.g. "INFERENCE".
+        :type search_type: <str>
+        :param block_chain_data: The transactions to search, e.g. the pending transactions of the blockchain.
+        :type block_chain_data: <list>
+        :param exclude_sender: Optional sender whose transactions are skipped, e.g. the node itself.
+        :type exclude_sender: <str>
+        :param after: Only transactions with a timestamp strictly greater than this one are considered.
+        :type after: <int>
+        :return: The most recent matching transaction, or None if there is none.
+        """
         # Initialize variables to store the last event and timestamp
         last_event = None
-        last_event_timestamp = 0
+        last_event_timestamp = after
 
         # Iterate through the data and find the last event with the specified type
         for item in block_chain_data:
             event_data = item.get('DATA', {})
             event_type = event_data.get('EVENT_TYPE', '')
             event_timestamp = event_data.get('TIMESTAMP', 0)
+            if exclude_sender is not None and event_data.get('SENDER') == exclude_sender:
+                continue
 
             if event_type == search_type and event_timestamp > last_event_timestamp:
                 last_event_timestamp = event_timestamp
@@ -402,7 +426,7 @@ class NetworkUtils(object):
         if last_event:
             return last_event
         else:
-            logging.warning(f'No event of type {search_type} found')
+            logging.debug(f'No event of type {search_type} found')
             return None
 
     @staticmethod
@@ -427,22 +451,30 @@ class NetworkUtils(object):
         return None
 
     @staticmethod
-    def generate_tls_keys():
+    def generate_tls_keys(key_type="RSA"):
         """
-        The `generate_tls_keys` method generates a new RSA private key and a self-signed TLS certificate.
+        The `generate_tls_keys` method generates a new RSA or ECDSA private key and a self-signed TLS certificate.
 
-        Generates a new RSA private key using the specified public exponent and key size. Then, creates a self-signed TLS
+        Generates a new RSA private key using the specified public exponent and key size, or an ECDSA private key on the
+        P-256 curve, whose handshakes are much cheaper to sign on the edge devices. Then, creates a self-signed TLS
         certificate without a common name, using the provided subject and issuer information. The certificate is valid for
         one year from the current date. The private key and certificate are saved to file's in the 'Keys' folder within the
         current working directory.
 
+        :param key_type: The type of the private key, "RSA" or "ECDSA".
+        :type key_type: str
         :return: None
         """
-        # Generate a new RSA private key
-        private_key = rsaCripto.generate_private_key(
-            public_exponent=PUBLIC_EXPONENT,
-            key_size=BUFFER_SIZE * 2
-        )
+        if key_type == "ECDSA":
+            private_key = ec.generate_private_key(ec.SECP256R1())
+        elif key_type == "RSA":
+            # Generate a new RSA private key
+            private_key = rsaCripto.generate_private_key(
+                public_exponent=PUBLIC_EXPONENT,
+                key_size=BUFFER_SIZE * 2
+            )
+        else:
+            raise ValueError(f"Unsupported TLS key type {key_type}")
 
         # Create a self-signed certificate without a common name
         subject = issuer = x509.Name([
@@ -616,6 +648,38 @@ class NetworkUtils(object):
         return public_key_base64
 
 
+def consume(in_q, timeout=None):
+    """
+    Yields the items of a queue until a None item is received, which is how the pipeline workers are stopped.
+
+    :param in_q: The queue to consume.
+    :type in_q: queue.Queue
+    :param timeout: Optional time, in seconds, to wait for each item before giving up.
+    :type timeout: float
+    :return: A generator of the queue items.
+    """
+    while True:
+        item = in_q.get(timeout=timeout)
+        if item is None:
+            return
+        yield item
+
+
+def increment(counter, value=1):
+    """
+    Increments a counter shared between processes, if any.
+
+    :param counter: The shared counter, or None.
+    :type counter: multiprocessing.Value
+    :param value: Amount added to the counter.
+    :type value: int
+    :return: None
+    """
+    if counter is not None:
+        with counter.get_lock():
+            counter.value += value
+
+
 class InferenceUtils(object):
 
     def handle_detection(self):
@@ -654,67 +718,109 @@ class InferenceUtils(object):
         # class_prediction = predict_on_video(model, input_video_file_path, 20)
         # print("[CLASS_PREDICTION] : ", class_prediction)
 
-    def data_processing_worker(self, in_q, out_q):
+    def data_processing_worker(self, in_q, out_q, counter=None, configs=None):
         """
         Process data items from the input queue and send processed items to the output queue.
 
         The `data_processing_worker` method continuously processes data items from the `in_q` queue. For each data item,
         it iterates through the specified models and creates a new item with updated information, which is then placed
-        into the `out_q` queue.
+        into the `out_q` queue, or into the queue of the model when `out_q` is a dictionary of queues by model name.
+        The items share the captured data, or its `SharedFrameRing` ticket (`slot` and `seq`), since the models only
+        read it. The worker stops when it receives None.
 
         :param in_q: The input queue for receiving data items.
         :type in_q: queue.Queue
-        :param out_q: The output queue for sending processed data items.
-        :type out_q: queue.Queue
+        :param out_q: The output queue for sending processed data items, or the input queue of each model.
+        :type out_q: queue.Queue or dict[str, queue.Queue]
+        :param counter: Optional shared counter of the processed data items.
+        :type counter: multiprocessing.Value
+        :param configs: The models of each data type, defaults to ``models``.
+        :type configs: dict[str, list[dict]]
         """
-        while True:
-            item = in_q.get()
-            for model in models[item['type']]:
-                new_item = {'type': item['type'], 'name': model['name'], 'data': item['data'][:]}
-                out_q.put(new_item)
+        for item in consume(in_q):
+            for model in (configs or models)[item['type']]:
+                new_item = dict(item, name=model['name'])
+                (out_q[model['name']] if isinstance(out_q, dict) else out_q).put(new_item)
+            increment(counter)
 
-    def inference_worker(self, in_q, out_q):
+    def inference_worker(self, in_q, out_q, rings=None, names=None, counter=None, configs=None):
         """
         Perform inference on data items from the input queue and send results to the output queue.
 
         The `inference_worker` method initializes local models for audio and video based on the specified configurations.
         It continuously retrieves data items from the `in_q` queue, performs inference using the corresponding model,
-        and puts the prediction result into the `out_q` queue.
+        and puts the prediction result into the `out_q` queue. Audio windows are classified one by one, and video frames
+        as the consecutive frames of a stream, at the frame rate of the model. Items carrying a `SharedFrameRing` ticket
+        are classified in place in shared memory, and dropped if the capture overwrote their slot in the meantime. The
+        worker stops when it receives None.
 
         :param in_q: The input queue for receiving data items.
         :type in_q: queue.Queue
         :param out_q: The output queue for sending inference results.
         :type out_q: queue.Queue
-        """
+        :param rings: The shared frame rings of the captured data, by data type.
+        :type rings: dict[str, SharedFrameRing]
+        :param names: Names of the models loaded by this worker, defaults to all of them.
+        :type names: list[str]
+        :param counter: Optional shared counter of the classified data items.
+        :type counter: multiprocessing.Value
+        :param configs: The models of each data type, defaults to ``models``.
+        :type configs: dict[str, list[dict]]
+        """
+        configs = configs or models
         local_models = {}
-        for audio_model in models['audio']:
-            model = audio_model['model'](audio_model)
-            local_models[audio_model['name']] = model
-
-        for video_model in models['video']:
-            model = video_model['model']()
-            local_models[video_model['name']] = model
+        for audio_model in configs['audio']:
+            if names is None or audio_model['name'] in names:
+                model = audio_model['model'](audio_model)
+                local_models[audio_model['name']] = model
+
+        for video_model in configs['video']:
+            if names is None or video_model['name'] in names:
+                model = video_model['model'](video_model['path'], video_model['labels'], video_model['options'],
+                                             video_model['threshold'])
+                local_models[video_model['name']] = model
+
+        for item in consume(in_q):
+            ring = rings[item['type']] if 'slot' in item else None
+            if ring is None:
+                data = item['data']
+            else:
+                data, _ = ring.view(item['slot'], item['seq'])
+                if data is None:
+                    continue
 
-        while True:
-            item = in_q.get()
-            prediction = local_models[item['name']].inference(item['data'])
-            if prediction != 'Unknown':
-                out_q.put({'prediction': prediction, 'type': item['type'], 'timestamp': str(datetime.datetime.now())})
+            if item['type'] == 'video':
+                prediction = local_models[item['name']].inference_frame(data, item['timestamp'])
+            else:
+                prediction = local_models[item['name']].inference(data)
+            if ring is not None and not ring.valid(item['slot'], item['seq']):
+                continue
+            increment(counter)
+            if prediction is not None and prediction != 'Unknown':
+                out_q.put({'prediction': prediction, 'type': item['type'], 'name': item['name'],
+                           'timestamp': str(datetime.now())})
 
-    def network_worker(self, in_q):
+    def network_worker(self, in_q, publish=None, counter=None):
         """
         Process network-related tasks for items from the input queue.
 
-        The `network_worker` method continuously processes network-related tasks from the `in_q` queue. It includes a
-        delay of one second for simulating network activity and prints the received item.
+        The `network_worker` method continuously processes network-related tasks from the `in_q` queue, handing every
+        received item to the `publish` callable, or logging it when there is none. The worker stops when it receives
+        None.
 
         :param in_q: The input queue for receiving network-related tasks.
         :type in_q: queue.Queue
-        """
-        while True:
-            item = in_q.get()
-            time.sleep(1)
-            print(item)
+        :param publish: Optional callable publishing an item, it must be picklable to run in another process.
+        :type publish: callable
+        :param counter: Optional shared counter of the published items.
+        :type counter: multiprocessing.Value
+        """
+        for item in consume(in_q):
+            if publish is None:
+                logging.info(f"[PIPELINE] {item}")
+            else:
+                publish(item)
+            increment(counter)
 
     def download_youtube_videos(self, youtube_video_url, output_directory):
         """
@@ -0,0 +1,81 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """
+        Thread-safe registry of the counters and gauges reported by the services of the node.
+        :arg counters (dict): Monotonic counters, e.g. the number of audio windows skipped by the silence gate.
+        :arg gauges (dict): Last value of measurements that can go up and down, e.g. a queue depth.
+    """
+
+    def __init__(self):
+        """
+            Initializes an instance of the Metrics class.
+        """
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.gauges = {}
+
+    def increment(self, name, value=1):
+        """
+        Increments a counter.
+
+        :param name: Name of the counter.
+        :type name: str
+        :param value: Amount added to the counter.
+        :type value: int
+        :return: None
+        """
+        with self.lock:
+            self.counters[name] += value
+
+    def set(self, name, value):
+        """
+        Sets the value of a gauge.
+
+        :param name: Name of the gauge.
+        :type name: str
+        :param value: The new value of the gauge.
+        :type value: float
+        :return: None
+        """
+        with self.lock:
+            self.gauges[name] = value
+
+    def get(self, name, default=0):
+        """
+        Returns the value of a counter or gauge.
+
+        :param name: Name of the counter or gauge.
+        :type name: str
+        :param default: Value returned when nothing was recorded under that name.
+        :return: The value of the counter or gauge.
+        """
+        with self.lock:
+            if name in self.counters:
+                return self.counters[name]
+            return self.gauges.get(name, default)
+
+    def snapshot(self):
+        """
+        Reports the current value of every counter and gauge.
+
+        :return: A dictionary with the values, keyed by name.
+        :rtype: dict
+        """
+        with self.lock:
+            return {**self.counters, **self.gauges}
+
+    def reset(self):
+        """
+        Clears every counter and gauge.
+
+        :return: None
+        """
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,41 @@
+import numpy as np
+from EdgeDevice.InferenceService.cache import InferenceCache, audio_key, file_key, replay_key
+
+
+def test_cache_evicts_least_recently_used():
+    cache = InferenceCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    cache.cached(b'a', lambda: compute('a'))
+    cache.cached(b'b', lambda: compute('b'))
+    cache.cached(b'a', lambda: compute('a'))
+    cache.cached(b'c', lambda: compute('c'))
+    cache.cached(b'a', lambda: compute('a'))
+    cache.cached(b'b', lambda: compute('b'))
+
+    assert calls == ['a', 'b', 'c', 'b']
+    assert cache.hits == 2
+    assert cache.hit_rate == 2 / 6
+
+
+def test_audio_keys_ignore_insignificant_differences():
+    rng = np.random.default_rng(0)
+    waveform = rng.uniform(-0.5, 0.5, 15360).astype(np.float32)
+
+    assert audio_key(waveform) == audio_key(waveform.astype(np.float64))
+    assert audio_key(waveform) != audio_key(waveform * 0.5)
+
+
+def test_replay_keys_depend_on_file_and_position(tmp_path):
+    first, second = tmp_path / 'first.gif', tmp_path / 'second.gif'
+    first.write_bytes(b'first')
+    second.write_bytes(b'second')
+
+    assert file_key(str(first)) == file_key(str(first))
+    assert replay_key(file_key(str(first)), 3) == replay_key(file_key(str(first)), 3)
+    assert replay_key(file_key(str(first)), 3) != replay_key(file_key(str(first)), 4)
+    assert replay_key(file_key(str(first)), 3) != replay_key(file_key(str(second)), 3)
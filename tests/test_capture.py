@@ -0,0 +1,98 @@
+import queue
+import time
+
+import cv2
+import numpy as np
+
+from EdgeDevice.CaptureService.video import WebcamVideoStream, source_kind, WEBCAM, STREAM, FILE
+
+TEST_VIDEO = 'RetrainedModels/video/test_videos/NODE-1/video.gif'
+
+
+def test_source_kind():
+    assert source_kind(0) == WEBCAM
+    assert source_kind('1') == WEBCAM
+    assert source_kind('rtsp://192.168.1.10:554/stream1') == STREAM
+    assert source_kind(TEST_VIDEO) == FILE
+
+
+def test_file_replay_is_paced_by_speed():
+    frames = {}
+    for speed in (1.0, 4.0):
+        in_q = queue.Queue()
+        stream = WebcamVideoStream(TEST_VIDEO, 640, 480, in_q, loop=True, speed=speed)
+        stream.start()
+        time.sleep(1.0)
+        stream.stop()
+        frames[speed] = stream.frames
+
+        timestamps = [in_q.get()['timestamp'] for _ in range(in_q.qsize())]
+        assert timestamps == sorted(timestamps)
+
+    assert frames[4.0] > 2 * frames[1.0]
+
+
+class BrokenCapture:
+    """Capture of a file that can't be rewound, or delivers no more frames once rewound."""
+
+    def __init__(self, capture, seekable):
+        self.capture = capture
+        self.seekable = seekable
+        self.rewinds = 0
+
+    def read(self):
+        if self.rewinds:
+            return False, None
+        return self.capture.read()
+
+    def set(self, prop, value):
+        self.rewinds += 1
+        return self.seekable
+
+    def release(self):
+        self.capture.release()
+
+
+def video_file(path, frames=5):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (160, 120))
+    for i in range(frames):
+        writer.write(np.full((120, 160, 3), i * 40, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_looped_file_that_cannot_be_replayed_is_given_up(tmp_path):
+    for seekable in (False, True):
+        in_q = queue.Queue()
+        stream = WebcamVideoStream(video_file(tmp_path / 'video.avi'), 160, 120, in_q, loop=True, speed=0)
+        stream.stream = capture = BrokenCapture(stream.stream, seekable)
+        stream.start()
+        stream.thread.join(timeout=5)
+
+        assert not stream.thread.is_alive()
+        assert stream.frames == 5
+        assert capture.rewinds == (1 if not seekable else 5)
+        stream.stop()
+
+
+def test_file_without_frames_is_not_found(tmp_path):
+    path = tmp_path / 'empty.avi'
+    cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (160, 120)).release()
+
+    assert not WebcamVideoStream(str(path), 160, 120, queue.Queue(), loop=True).found
+
+
+def test_file_frames_carry_their_position_across_replays(tmp_path):
+    in_q = queue.Queue(maxsize=12)
+    stream = WebcamVideoStream(video_file(tmp_path / 'video.avi'), 160, 120, in_q, loop=True, speed=0)
+    stream.start()
+    positions = [in_q.get(timeout=5)['position'] for _ in range(12)]
+    stream.running = False
+    while stream.thread.is_alive():
+        try:
+            in_q.get_nowait()
+        except queue.Empty:
+            pass
+    stream.stop()
+
+    assert positions == [0, 1, 2, 3, 4, 0, 1, 2, 3, 4, 0, 1]
@@ -0,0 +1,67 @@
+import json
+import threading
+import time
+
+from EdgeDevice.NetworkService.Coalescer import TransactionCoalescer
+from EdgeDevice.NetworkService.MessageStream import MessageStream
+
+
+def collect():
+    batches = []
+    flushed = threading.Event()
+
+    def flush(batch):
+        batches.append(list(batch))
+        flushed.set()
+
+    return batches, flushed, flush
+
+
+def test_burst_is_flushed_as_full_batches():
+    batches, _, flush = collect()
+    coalescer = TransactionCoalescer(flush, window=10.0, max_items=4).start()
+
+    for i in range(8):
+        coalescer.add(i)
+    time.sleep(0.1)
+
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    coalescer.stop()
+
+
+def test_single_transaction_is_flushed_on_deadline():
+    batches, flushed, flush = collect()
+    coalescer = TransactionCoalescer(flush, window=0.05, max_items=4).start()
+
+    start = time.monotonic()
+    coalescer.add('tx')
+    assert flushed.wait(1.0)
+
+    assert batches == [['tx']]
+    assert time.monotonic() - start >= 0.05
+    assert coalescer.batches == 1 and coalescer.transactions == 1
+    coalescer.stop()
+
+
+def test_stop_flushes_queued_transactions():
+    batches, _, flush = collect()
+    coalescer = TransactionCoalescer(flush, window=10.0, max_items=4).start()
+
+    for i in range(6):
+        coalescer.add(i)
+    coalescer.stop()
+
+    assert [tx for batch in batches for tx in batch] == list(range(6))
+
+
+def test_stream_reassembles_split_and_joined_messages():
+    messages = [{'TYPE': 'RECEIVE_TRANSACTION', 'PAYLOAD': {'PENDING': ['ç' * 3000]}}, {'TYPE': 'PING'}]
+    data = b''.join(json.dumps(message, indent=2).encode() for message in messages)
+    stream = MessageStream()
+
+    received = []
+    for i in range(0, len(data), 1000):
+        received.extend(stream.feed(data[i:i + 1000]))
+
+    assert received == messages
+    assert stream.buffer == ''
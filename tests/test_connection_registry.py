@@ -0,0 +1,94 @@
+import threading
+import uuid
+
+from EdgeDevice.NetworkService.ConnectionRegistry import ConnectionRegistry, Peer, dials
+
+
+def make_peer(i):
+    return Peer(uuid.UUID(int=i), object(), (f'10.0.0.{i}', 5000 + i), 'SALA')
+
+
+def test_peers_are_indexed_by_id_address_and_socket():
+    registry = ConnectionRegistry()
+    peers = [make_peer(i) for i in range(1, 4)]
+    for peer in peers:
+        assert registry.add(peer)
+
+    assert len(registry) == 3
+    assert registry.get(uuid.UUID(int=2)) is peers[1]
+    assert registry.find('10.0.0.3') is peers[2]
+    assert registry.find('10.0.0.3', 5003) is peers[2]
+    assert registry.find('10.0.0.3', 6000) is None
+    assert registry.lookup(peers[0].conn) is peers[0]
+    assert peers[0].conn in registry
+
+
+def test_duplicate_peers_are_rejected_and_removed_peers_unindexed():
+    registry = ConnectionRegistry()
+    peer = make_peer(1)
+    registry.add(peer)
+
+    assert not registry.add(peer._replace(conn=object()))
+    assert registry.remove(peer.conn) is peer
+    assert registry.remove(peer.conn) is None
+    assert registry.get(peer.id) is None and registry.find(peer.ip) is None
+    assert len(registry) == 0
+
+
+def test_snapshots_are_stable_while_peers_change():
+    registry = ConnectionRegistry()
+    for i in range(1, 51):
+        registry.add(make_peer(i))
+
+    def churn():
+        for i in range(51, 251):
+            peer = make_peer(i)
+            registry.add(peer)
+            registry.remove(peer.conn)
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    while writer.is_alive():
+        # iterating while another thread adds and removes peers never fails
+        assert len([peer for peer in registry]) >= 50
+    writer.join()
+    assert len(registry) == 50
+
+
+def test_neighbour_updates_keep_other_fields():
+    node_id = uuid.uuid4()
+    registry = ConnectionRegistry({node_id: {'IP': '10.0.0.1', 'PUBLIC_KEY': None, 'LOCAL': 'SALA'}})
+    before = registry.neighbours
+
+    registry.update_neighbour(node_id, PUBLIC_KEY='key')
+
+    assert registry.neighbours[node_id] == {'IP': '10.0.0.1', 'PUBLIC_KEY': 'key', 'LOCAL': 'SALA'}
+    assert before[node_id]['PUBLIC_KEY'] is None
+
+
+def test_duplicate_links_keep_the_one_dialed_by_the_smaller_id():
+    small, large = uuid.UUID(int=1), uuid.UUID(int=2)
+    address = ('10.0.0.2', 5002)
+
+    # the node with the smaller ID dialed first, the link accepted from the other node loses on both ends
+    registry = ConnectionRegistry()
+    dialed = Peer(large, object(), address, 'SALA', inbound=False)
+    assert registry.link(dialed, small) == (True, None)
+    assert registry.link(Peer(large, object(), address, 'SALA', inbound=True), small) == (False, None)
+    assert registry.get(large) is dialed
+
+    # the node with the larger ID dialed anyway, the link accepted from the smaller ID replaces it
+    registry = ConnectionRegistry()
+    dialed = Peer(small, object(), ('10.0.0.1', 5001), 'SALA', inbound=False)
+    accepted = Peer(small, object(), ('10.0.0.1', 5001), 'SALA', inbound=True)
+    registry.link(dialed, large)
+    assert registry.link(accepted, large) == (True, dialed)
+    assert registry.get(small) is accepted
+    assert registry.lookup(dialed.conn) is None
+
+
+def test_only_the_smaller_id_dials():
+    small, large = uuid.UUID(int=1), uuid.UUID(int=2)
+
+    assert dials(small, large)
+    assert not dials(large, small)
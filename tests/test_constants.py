@@ -0,0 +1,7 @@
+from EdgeDevice.utils.constants import Network, Inference
+
+
+def test_settings_are_not_aliases():
+    # Enum members with equal values are aliases, a setting would silently share the member of another one
+    for settings in (Network, Inference):
+        assert list(settings.__members__) == [member.name for member in settings]
@@ -0,0 +1,139 @@
+import heapq
+import itertools
+import logging
+import random
+
+import pytest
+
+from EdgeDevice.NetworkService.Election import BullyElection, RttEstimator
+from EdgeDevice.utils.constants import Messages
+
+
+class SimulatedNetwork:
+    """Nodes running the election over a fully connected network with random latencies, on a virtual clock."""
+
+    def __init__(self, count, seed=0, latency=(0.001, 0.02)):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.now = 0.0
+        self.events = []
+        self.sequence = itertools.count()
+        self.alive = set(range(count))
+        self.messages = 0
+        self.nodes = {}
+        for node_id in range(count):
+            rtt = RttEstimator()
+            for _ in range(10):
+                rtt.add(self.rng.uniform(*latency) + self.rng.uniform(*latency))
+            self.nodes[node_id] = BullyElection(
+                node_id, lambda node_id=node_id: [peer for peer in self.nodes if peer != node_id],
+                lambda peer, *message, sender=node_id: self.send(sender, peer, *message), rtt=rtt)
+
+    def send(self, sender, peer, message_type, term, coordinator):
+        self.messages += 1
+        delivery = self.now + self.rng.uniform(*self.latency)
+        heapq.heappush(self.events, (delivery, next(self.sequence), sender, peer, message_type, term, coordinator))
+
+    def crash(self, node_id):
+        # the peers only notice through the missing answers, the failure detector is slower than an election
+        self.alive.discard(node_id)
+
+    def converged(self):
+        leader = max(self.alive)
+        terms = {self.nodes[node_id].term for node_id in self.alive}
+        return len(terms) == 1 and all(self.nodes[node_id].coordinator == leader for node_id in self.alive)
+
+    def run(self, until=60.0):
+        while self.now < until:
+            deadlines = [(node.deadline, node_id) for node_id, node in self.nodes.items()
+                         if node_id in self.alive and node.deadline is not None]
+            next_deadline = min(deadlines, default=None)
+            next_message = self.events[0][0] if self.events else None
+            if next_deadline is None and next_message is None:
+                return self.now
+            if next_message is None or (next_deadline is not None and next_deadline[0] < next_message):
+                self.now = next_deadline[0]
+                self.nodes[next_deadline[1]].tick(self.now)
+            else:
+                _, _, sender, peer, message_type, term, coordinator = heapq.heappop(self.events)
+                self.now = next_message
+                if peer in self.alive:
+                    self.nodes[peer].receive(sender, message_type, term, coordinator, self.now)
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize('count', [3, 5, 10, 25, 50])
+def test_cold_start_converges_on_the_highest_node(count):
+    network = SimulatedNetwork(count, seed=count)
+    for node_id in network.alive:
+        network.nodes[node_id].elect(0.0)
+
+    elapsed = network.run()
+
+    assert network.converged()
+    # the highest node declares at once, everyone else hears it within a message delay
+    assert elapsed <= network.nodes[0].coordinator_timeout
+    print(f'{count} nodes: cold start converged in {elapsed * 1000:.0f}ms with {network.messages} messages')
+
+
+@pytest.mark.parametrize('count', [3, 5, 10, 25, 50])
+def test_coordinator_failure_is_replaced_within_a_bounded_time(count):
+    network = SimulatedNetwork(count, seed=count)
+    network.nodes[0].elect(0.0)
+    network.run()
+    assert network.converged()
+
+    network.crash(count - 1)
+    start = network.now
+    network.nodes[network.rng.choice(sorted(network.alive))].elect(start)
+    elapsed = network.run() - start
+
+    assert network.converged()
+    assert network.nodes[0].coordinator == count - 2
+    # the new highest node waits one OK timeout for the crashed coordinator, then announces itself
+    bound = max(node.ok_timeout for node in network.nodes.values()) + 2 * network.latency[1]
+    assert elapsed <= bound
+    print(f'{count} nodes: coordinator replaced in {elapsed * 1000:.0f}ms with {network.messages} messages')
+
+
+def test_stale_coordinator_is_ignored():
+    sent = []
+    election = BullyElection(5, lambda: [1, 9], lambda *message: sent.append(message))
+    election.receive(9, Messages.MESSAGE_TYPE_COORDINATOR.value, 3, 9, now=0.0)
+    assert (election.coordinator, election.term) == (9, 3)
+
+    election.receive(7, Messages.MESSAGE_TYPE_COORDINATOR.value, 2, 7, now=1.0)
+
+    assert (election.coordinator, election.term) == (9, 3)
+    assert sent == []
+
+
+def test_lower_coordinator_is_contested():
+    sent = []
+    election = BullyElection(5, lambda: [1, 9], lambda *message: sent.append(message))
+
+    election.receive(1, Messages.MESSAGE_TYPE_COORDINATOR.value, 1, 1, now=0.0)
+
+    assert election.coordinator is None
+    assert election.term == 2
+    assert sent == [(9, Messages.MESSAGE_TYPE_ELECTION.value, 2, None)]
+
+
+def test_timeouts_follow_the_round_trip_time():
+    rtt = RttEstimator()
+    election = BullyElection(1, lambda: [], lambda *message: None, rtt=rtt, min_timeout=0.01, max_timeout=5.0)
+    assert election.ok_timeout == 1.0
+
+    for _ in range(20):
+        rtt.add(0.05)
+
+    assert 0.05 <= election.ok_timeout < 0.1
+    rtt.add(60.0)
+    assert election.ok_timeout == 5.0
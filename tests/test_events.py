@@ -0,0 +1,51 @@
+from EdgeDevice.InferenceService.events import EventStateMachine
+from EdgeDevice.InferenceService.fusion import FusedEvent, AUDIO
+
+
+def top(label, score, now):
+    return FusedEvent(label, score, score, 0.0, AUDIO, now)
+
+
+def test_flickering_predictions_produce_no_events():
+    events = EventStateMachine('COZINHA', min_dwell=1.0)
+
+    emitted = []
+    for step in range(20):
+        now = step * 0.5
+        label = 'water' if step % 2 == 0 else 'speech'
+        emitted.append(events.update(top(label, 0.9, now), {label: 0.9}, now))
+
+    assert emitted == [None] * 20
+    assert events.active is None
+
+
+def test_sustained_activity_is_reported_once():
+    events = EventStateMachine('COZINHA', min_dwell=1.0)
+
+    emitted = [events.update(top('water', 0.8, now), {'water': 0.8}, now) for now in (0.0, 0.5, 1.0, 1.5, 2.0)]
+
+    assert [event.label for event in emitted if event is not None] == ['water']
+    assert emitted[2] is not None
+    assert events.active == 'water'
+
+
+def test_hysteresis_and_cooldown():
+    events = EventStateMachine('COZINHA', exit_threshold=0.5, min_dwell=0.0, cooldown=10.0)
+
+    assert events.update(top('water', 0.8, 0.0), {'water': 0.8}, 0.0) is not None
+    # Between the exit and the enter thresholds the activity goes on.
+    assert events.update(top('water', 0.6, 1.0), {'water': 0.6}, 1.0) is None
+    assert events.active == 'water'
+    # Under the exit threshold it ends, and coming back within the cooldown is not reported again.
+    events.update(None, {'water': 0.2}, 2.0)
+    assert events.active is None
+    assert events.update(top('water', 0.8, 3.0), {'water': 0.8}, 3.0) is None
+    assert events.active == 'water'
+    events.update(None, {'water': 0.2}, 4.0)
+    assert events.update(top('water', 0.8, 12.0), {'water': 0.8}, 12.0) is not None
+
+
+def test_class_settings_override_defaults():
+    events = EventStateMachine('COZINHA', min_dwell=5.0, class_settings={'knock': {'min_dwell': 0.0}})
+
+    assert events.update(top('knock', 0.9, 0.0), {'knock': 0.9}, 0.0).label == 'knock'
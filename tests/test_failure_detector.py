@@ -0,0 +1,66 @@
+import random
+import uuid
+from types import SimpleNamespace
+
+from EdgeDevice.NetworkService.FailureDetector import HeartbeatScheduler, PhiAccrualFailureDetector
+
+
+def trained(intervals):
+    detector = PhiAccrualFailureDetector(min_std=0.05, first_interval=1.0)
+    now = 0.0
+    detector.heartbeat(now)
+    for interval in intervals:
+        now += interval
+        detector.heartbeat(now)
+    return detector, now
+
+
+def test_phi_grows_with_silence():
+    detector, now = trained([1.0] * 50)
+
+    assert detector.phi(now + 1.0) < 1.0
+    assert detector.is_available(now + 1.2)
+    assert not detector.is_available(now + 3.0)
+    assert detector.phi(now + 2.0) < detector.phi(now + 3.0)
+
+
+def test_jittery_peers_get_a_longer_grace_period():
+    rng = random.Random(0)
+    steady, steady_now = trained([1.0] * 50)
+    jittery, jittery_now = trained([rng.uniform(0.2, 1.8) for _ in range(50)])
+
+    assert steady.phi(steady_now + 2.5) > jittery.phi(jittery_now + 2.5)
+    assert jittery.is_available(jittery_now + 2.5)
+
+
+def peer(last_sent):
+    return SimpleNamespace(id=uuid.uuid4(), outbound=SimpleNamespace(last_sent=last_sent))
+
+
+def test_scheduler_only_pings_idle_peers():
+    busy, idle = peer(last_sent=9.0), peer(last_sent=0.0)
+    pinged = []
+    scheduler = HeartbeatScheduler([busy, idle], pinged.append, lambda p: None, interval=5.0)
+    for p in (busy, idle):
+        scheduler.track(p.id, now=0.0)
+
+    scheduler.tick(10.0)
+
+    assert pinged == [idle]
+    assert (scheduler.pings, scheduler.suppressed) == (1, 1)
+
+
+def test_scheduler_reports_silent_peers():
+    alive, dead = peer(last_sent=0.0), peer(last_sent=0.0)
+    failed = []
+    scheduler = HeartbeatScheduler([alive, dead], lambda p: None, failed.append, interval=1.0, min_std=0.1)
+    for now in range(20):
+        scheduler.received(alive.id, now=float(now))
+        if now < 10:
+            scheduler.received(dead.id, now=float(now))
+
+    scheduler.tick(19.5)
+
+    assert failed == [dead]
+    assert dead.id not in scheduler.detectors
+    assert alive.id in scheduler.detectors
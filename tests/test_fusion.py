@@ -0,0 +1,63 @@
+import numpy as np
+from EdgeDevice.InferenceService.fusion import FusionEngine, AUDIO, VIDEO
+
+AUDIO_LABELS = ['water', 'knock', 'speech']
+VIDEO_LABELS = ['washing dishes', 'reading book', 'water']
+
+
+def test_fusion_combines_modalities_with_class_weights():
+    fusion = FusionEngine(AUDIO_LABELS, VIDEO_LABELS, class_weights={'water': (0.75, 0.25)}, threshold=0.5)
+
+    fusion.add_audio(np.array([0.9, 0.05, 0.05]), timestamp=10.0)
+    fusion.add_video(np.array([0.1, 0.1, 0.5]), timestamp=10.5)
+
+    event = fusion.fuse(now=11.0)
+
+    assert event.label == 'water'
+    assert np.isclose(event.score, 0.75 * 0.9 + 0.25 * 0.5)
+    assert event.modality == AUDIO
+
+
+def test_fusion_scores_single_modality_classes_alone():
+    fusion = FusionEngine(AUDIO_LABELS, VIDEO_LABELS, threshold=0.5)
+
+    fusion.add_audio(np.array([0.0, 0.8, 0.2]), timestamp=10.0)
+    fusion.add_video(np.array([0.3, 0.3, 0.4]), timestamp=10.0)
+
+    event = fusion.fuse(now=10.0)
+
+    # 'knock' is only known by the audio model, so the video scores don't dilute it.
+    assert event.label == 'knock'
+    assert np.isclose(event.score, 0.8)
+
+
+def test_fusion_drops_results_outside_the_window():
+    fusion = FusionEngine(AUDIO_LABELS, VIDEO_LABELS, window=2.0, threshold=0.5)
+
+    fusion.add_top(VIDEO, 'reading book', 0.9, timestamp=0.0)
+    fusion.add_top(AUDIO, 'speech', 0.7, timestamp=5.0)
+
+    event = fusion.fuse(now=5.0)
+
+    assert event.label == 'speech'
+    assert event.video_score == 0
+
+
+def test_fusion_does_not_repeat_events():
+    fusion = FusionEngine(AUDIO_LABELS, VIDEO_LABELS, threshold=0.5)
+
+    fusion.add_top(AUDIO, 'speech', 0.9, timestamp=0.0)
+    assert fusion.fuse(now=0.0).label == 'speech'
+
+    fusion.add_top(AUDIO, 'speech', 0.95, timestamp=1.0)
+    assert fusion.fuse(now=1.0) is None
+
+
+def test_top_reuses_precomputed_scores():
+    fusion = FusionEngine(AUDIO_LABELS, VIDEO_LABELS, threshold=0.5)
+    fusion.add_audio(np.array([0.2, 0.7, 0.1]), timestamp=0.0)
+    fusion.add_video(np.array([0.6, 0.2, 0.2]), timestamp=0.5)
+
+    scores = fusion.scores(1.0)
+
+    assert fusion.top(1.0, scores) == fusion.top(1.0)
@@ -0,0 +1,67 @@
+import numpy as np
+from EdgeDevice.InferenceService.gating import EnergyGate, MotionDetector
+
+FS = 16000
+
+
+def noise(dbfs, seconds=0.96):
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(FS * seconds)) * 10 ** (dbfs / 20)).astype(np.float32)
+
+
+def test_energy_gate_skips_background_noise():
+    gate = EnergyGate(-50.0)
+
+    assert not gate.check(np.zeros(int(FS * 0.96), dtype=np.float32))
+    assert not gate.check(noise(-65))
+    assert gate.check(noise(-40))
+
+
+def test_energy_gate_catches_short_sounds():
+    gate = EnergyGate(-50.0)
+    waveform = noise(-70)
+    # A 10 ms knock, too short to raise the RMS energy of the whole window over the threshold.
+    waveform[8000:8160] += 0.02 * np.sign(np.sin(np.arange(160)))
+
+    assert 10 * np.log10(np.mean(waveform ** 2)) < -50
+    assert gate.check(waveform)
+
+
+def scene(block_x=None):
+    frame = np.random.default_rng(0).integers(0, 64, (480, 640, 3), dtype=np.uint8)
+    if block_x is not None:
+        frame[200:300, block_x:block_x + 100] = 255
+    return frame
+
+
+def test_motion_detector_skips_static_frames():
+    detector = MotionDetector(threshold=1.0, keep_warm=5.0)
+
+    assert detector.check(scene(), 0.0)
+    assert not detector.check(scene(), 0.2)
+    assert not detector.check(scene(), 4.0)
+    # the model still sees the scene every keep_warm seconds
+    assert detector.check(scene(), 5.2)
+
+
+def test_motion_detector_passes_moving_frames():
+    detector = MotionDetector(threshold=1.0, keep_warm=5.0)
+    detector.check(scene(100), 0.0)
+
+    assert detector.check(scene(200), 0.2)
+    assert detector.check(scene(300), 0.4)
+    assert not detector.check(scene(300), 0.6)
+
+
+def test_motion_detector_calls_on_idle_once_per_idle_period():
+    calls = []
+    detector = MotionDetector(threshold=1.0, idle_reset=1.0, on_idle=lambda: calls.append(True))
+
+    detector.check(scene(100), 0.0)
+    for now in (0.5, 1.0, 1.5, 2.0):
+        detector.check(scene(100), now)
+    assert len(calls) == 1
+
+    detector.check(scene(200), 2.5)
+    detector.check(scene(200), 4.0)
+    assert len(calls) == 2
@@ -0,0 +1,98 @@
+import itertools
+import json
+import uuid
+from types import SimpleNamespace
+
+from EdgeDevice.InferenceService.events import EventStateMachine
+from EdgeDevice.InferenceService.fusion import FusedEvent, AUDIO
+from EdgeDevice.NetworkService.ConnectionRegistry import ConnectionRegistry, Peer
+from EdgeDevice.NetworkService.Election import BullyElection
+from EdgeDevice.NetworkService.Node import Node
+from EdgeDevice.NetworkService.Protocol import NodeProtocol
+from EdgeDevice.NetworkService.Simulator import SimNode
+from EdgeDevice.utils.constants import Messages
+from EdgeDevice.utils.helper import MessageHandlerUtils
+
+
+def transaction(sender, action, precision, timestamp):
+    return {"DATA": {"SENDER": sender, "EVENT_TYPE": "INFERENCE", "EVENT_ACTION": action,
+                     "PRECISION": str(precision), "TIMESTAMP": timestamp}, "SIGNATURE": None}
+
+
+def node(pending_transactions):
+    """A node without network, which registers its events in ``pending_transactions``."""
+    node = Node.__new__(Node)
+    node.id, node.local, node.sender, node.coordinator = 'NODE-1', 'SALA', 'NODE-1-KEY', None
+    node.events = EventStateMachine('SALA', min_dwell=0.0, cooldown=30.0)
+    node.blockchain = SimpleNamespace(pending_transactions=pending_transactions)
+    node.coalescer = SimpleNamespace(add=lambda transaction_with_signature: None)
+    node.last_event_timestamp = 0
+
+    clock = itertools.count(200)
+
+    def create_blockchain_transaction(action, event_type, local, description, accuracy):
+        pending_transactions.append(transaction(node.sender, action, accuracy, next(clock)))
+        return pending_transactions[-1]
+
+    node.create_blockchain_transaction = create_blockchain_transaction
+    return node
+
+
+def test_idle_room_adopts_a_peer_event_once():
+    pending_transactions = [transaction('NODE-2-KEY', 'Fall', 0.9, 100)]
+    room = node(pending_transactions)
+
+    emitted = []
+    # an idle room, whose fused results stay inconclusive for several cooldowns
+    for now in range(0, 300, 5):
+        top = FusedEvent('speech', 0.3, 0.3, 0.0, AUDIO, now)
+        event = room.events.update(top, {'speech': 0.3}, now)
+        if event is None:
+            event = room.collaborative_event(top, now)
+        if event is not None:
+            room.process_detection(event)
+            emitted.append(event.label)
+
+    assert emitted == ['Fall']
+    # the node registered the adopted event, it is never adopted back
+    assert [tx["DATA"]["SENDER"] for tx in pending_transactions] == ['NODE-2-KEY', 'NODE-1-KEY']
+
+
+class Outbox(list):
+    """Outbound queue of a peer, keeping the decoded messages."""
+
+    def send(self, data):
+        self.append(json.loads(data))
+        return True
+
+
+def test_node_and_simulator_share_the_message_handlers():
+    for name in ('handle_message', 'handle_general_message', 'send_heartbeat', 'send_election', 'push_chain',
+                 'handle_transactions', 'broadcast_transactions'):
+        assert getattr(Node, name) is getattr(NodeProtocol, name)
+        assert getattr(SimNode, name) is getattr(NodeProtocol, name)
+
+
+def test_node_learns_the_coordinator_from_a_ping():
+    node = Node.__new__(Node)
+    node.id, node.ip, node.port, node.public_key, node.coordinator = uuid.UUID(int=1), '10.0.0.1', 5000, None, None
+    node.pings = {}
+    node.registry = ConnectionRegistry({node.id: {'IP': node.ip, 'PUBLIC_KEY': None, 'LOCAL': 'SALA'}})
+    node.election = BullyElection(node.id, lambda: [peer.id for peer in node.registry], node.send_election,
+                                  node.handle_coordinator)
+    node.blockchain = SimpleNamespace(pending_transactions=[], chain=[])
+    peer = Peer(uuid.UUID(int=2), 'conn', ('10.0.0.2', 5000), 'SALA', Outbox())
+    node.registry.link(peer, node.id)
+    node.registry.update_neighbour(peer.id, IP=peer.ip, PUBLIC_KEY=None, LOCAL='SALA')
+
+    ping = MessageHandlerUtils.create_keep_alive_message(str(peer.id), peer.ip, peer.port, str(node.id),
+                                                         str(peer.id), Messages.MESSAGE_TYPE_PING.value)
+    ping["PAYLOAD"]["TERM"] = 1
+    node.handle_message(ping, 'conn')
+    node.handle_message(ping, 'conn')
+
+    assert node.coordinator == peer.id
+    # the node asks the coordinator it learnt for the pending transactions, then answers the pings
+    assert [message["TYPE"] for message in peer.outbound] == [Messages.MESSAGE_TYPE_REQUEST_TRANSACTION.value,
+                                                              Messages.MESSAGE_TYPE_PONG.value]
+    assert peer.outbound[-1]["PAYLOAD"]["COORDINATOR"] == str(peer.id)
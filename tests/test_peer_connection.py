@@ -0,0 +1,57 @@
+import socket
+import threading
+import time
+
+from EdgeDevice.NetworkService.PeerConnection import PeerConnection
+
+
+def receive(conn, size):
+    data = b''
+    while len(data) < size:
+        data += conn.recv(size - len(data))
+    return data
+
+
+def test_messages_are_sent_in_order():
+    local, remote = socket.socketpair()
+    peer = PeerConnection(local, 'peer')
+
+    for i in range(10):
+        assert peer.send(b'%d;' % i)
+
+    assert receive(remote, 20) == b''.join(b'%d;' % i for i in range(10))
+    peer.close()
+    local.close()
+    remote.close()
+
+
+def test_stalled_peer_never_blocks_the_sender_and_is_disconnected():
+    local, remote = socket.socketpair()
+    local.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    closed = threading.Event()
+    peer = PeerConnection(local, 'stalled', maxsize=8, high_water=6, on_close=lambda conn: closed.set())
+
+    # the remote end never reads, so the writer blocks in sendall once the socket buffers are full
+    start = time.monotonic()
+    results = [peer.send(b'x' * 65536) for _ in range(32)]
+
+    assert time.monotonic() - start < 1.0
+    assert results[-1] is False
+    assert closed.wait(1.0)
+    assert peer.closed
+    assert not peer.send(b'late')
+    local.close()
+    remote.close()
+
+
+def test_failed_connection_is_reported():
+    local, remote = socket.socketpair()
+    closed = threading.Event()
+    peer = PeerConnection(local, 'gone', on_close=lambda conn: closed.set())
+
+    remote.close()
+    local.close()
+    peer.send(b'ping')
+
+    assert closed.wait(1.0)
+    assert peer.closed
@@ -0,0 +1,86 @@
+import multiprocessing
+import queue
+import time
+import wave
+from functools import partial
+
+import cv2
+import numpy as np
+
+from EdgeDevice.InferenceService.pipeline import CAPTURE, DISPATCH, NETWORK, InferencePipeline
+
+
+class StubAudioModel:
+    """Audio model answering every window, created like AudioInference."""
+
+    def __init__(self, config):
+        self.config = config
+
+    def inference(self, waveform):
+        return 'speech', float(np.abs(waveform).max())
+
+
+class StubVideoModel:
+    """Video model answering every frame, created like VideoInference."""
+
+    def __init__(self, path, labels, options, threshold):
+        self.threshold = threshold
+
+    def inference_frame(self, image, timestamp):
+        return 'moving', float(image.mean()) / 255
+
+
+CONFIGS = {
+    'audio': [{'name': 'audio-stub', 'model': StubAudioModel}],
+    'video': [{'name': 'video-stub', 'model': StubVideoModel, 'path': None, 'labels': None, 'options': None,
+               'threshold': 0.5}],
+}
+
+
+def publish(results, item):
+    results.put(item)
+
+
+def audio_file(path, seconds=3):
+    samples = (np.sin(np.arange(16000 * seconds) * 0.1) * 16000).astype(np.int16)
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(samples.tobytes())
+    return str(path)
+
+
+def video_file(path, frames=20):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (160, 120))
+    for i in range(frames):
+        writer.write(np.full((120, 160, 3), i * 10, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_pipeline_classifies_both_modalities_and_stops_gracefully(tmp_path):
+    results = multiprocessing.get_context('spawn').Queue()
+    pipeline = InferencePipeline(audio_file(tmp_path / 'audio.wav'), video_file(tmp_path / 'video.avi'),
+                                 workers={'audio-stub': 2, 'video-stub': 2}, width=160, height=120,
+                                 publish=partial(publish, results), model_configs=CONFIGS)
+    assert pipeline.workers == {'audio-stub': 2, 'video-stub': 1}
+
+    names = set()
+    pipeline.start()
+    try:
+        deadline = time.monotonic() + 60
+        while names != {'audio-stub', 'video-stub'} and time.monotonic() < deadline:
+            try:
+                names.add(results.get(timeout=1)['name'])
+            except queue.Empty:
+                pass
+    finally:
+        pipeline.stop(timeout=10)
+
+    assert names == {'audio-stub', 'video-stub'}
+    stats = pipeline.stats()
+    for stage in (CAPTURE, DISPATCH, 'audio-stub', 'video-stub', NETWORK):
+        assert stats[stage]['ITEMS'] > 0
+    # every stage finished on its own, none had to be terminated
+    assert all(process.exitcode == 0 for processes in pipeline.processes.values() for process in processes)
@@ -0,0 +1,42 @@
+from EdgeDevice.CaptureService.queues import BoundedQueue, DropPolicy, capture_source
+
+
+def frame(source, number):
+    return {'type': 'video', 'data': number, 'source': source}
+
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+
+def test_drop_oldest_keeps_the_freshest_items():
+    q = BoundedQueue(3, DropPolicy.DROP_OLDEST)
+    for number in range(5):
+        assert q.put(number)
+
+    assert drain(q) == [2, 3, 4]
+    assert q.dropped == 2
+
+
+def test_drop_newest_keeps_the_queued_items():
+    q = BoundedQueue(3, DropPolicy.DROP_NEWEST)
+    results = [q.put(number) for number in range(5)]
+
+    assert results == [True, True, True, False, False]
+    assert drain(q) == [0, 1, 2]
+    assert q.dropped == 2
+
+
+def test_keep_latest_per_source():
+    q = BoundedQueue(8, DropPolicy.KEEP_LATEST, key=capture_source)
+    for number in range(3):
+        q.put(frame('kitchen', number))
+        q.put(frame('bedroom', number))
+    q.put({'type': 'audio', 'data': 'window'})
+
+    assert [(item.get('source'), item['data']) for item in drain(q)] == \
+           [('kitchen', 2), ('bedroom', 2), (None, 'window')]
+    assert q.dropped == 4
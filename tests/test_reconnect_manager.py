@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+
+from EdgeDevice.NetworkService.ReconnectManager import ReconnectManager
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_delay_is_jittered_and_capped():
+    manager = ReconnectManager(lambda target: True, base=0.5, cap=4.0, rng=random.Random(0))
+
+    delays = [manager.delay(attempts) for attempts in range(10) for _ in range(100)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert max(manager.delay(1) for _ in range(100)) <= 1.0
+    assert len(set(delays)) == len(delays)
+
+
+def test_failed_dials_are_retried_until_connected():
+    calls = []
+
+    def dial(target):
+        calls.append(target)
+        if len(calls) < 3:
+            raise ConnectionRefusedError()
+        return True
+
+    manager = ReconnectManager(dial, base=0.01, cap=0.05).start()
+    try:
+        assert manager.request('peer', ('10.0.0.2', 5000))
+        assert not manager.request('peer', ('10.0.0.2', 5000))
+        assert wait_for(lambda: not manager.pending('peer'))
+    finally:
+        manager.stop()
+
+    assert calls == [('10.0.0.2', 5000)] * 3
+
+
+def test_peers_are_dialed_concurrently():
+    barrier = threading.Barrier(4, timeout=2.0)
+    connected = []
+
+    def dial(target):
+        # only returns once the four peers are being dialed at the same time
+        barrier.wait()
+        connected.append(target)
+        return True
+
+    manager = ReconnectManager(dial, workers=4).start()
+    try:
+        for i in range(4):
+            manager.request(i, i)
+        assert wait_for(lambda: len(connected) == 4)
+    finally:
+        manager.stop()
+
+    assert sorted(connected) == [0, 1, 2, 3]
+
+
+def test_gives_up_after_max_attempts():
+    calls = []
+
+    def dial(target):
+        calls.append(target)
+        return False
+
+    manager = ReconnectManager(dial, base=0.01, cap=0.01, max_attempts=3).start()
+    try:
+        manager.request('peer', 'target')
+        assert wait_for(lambda: not manager.pending('peer'))
+        time.sleep(0.05)
+    finally:
+        manager.stop()
+
+    assert len(calls) == 3
+
+
+def test_cancel_drops_the_scheduled_retries():
+    calls = []
+    released = threading.Event()
+
+    def dial(target):
+        calls.append(target)
+        if target == 'old':
+            released.wait(2.0)
+        return False
+
+    manager = ReconnectManager(dial, base=0.01, cap=0.01, max_attempts=2).start()
+    try:
+        manager.request('peer', 'old')
+        assert wait_for(lambda: len(calls) == 1)
+        manager.cancel('peer')
+        assert not manager.pending('peer')
+        assert manager.request('peer', 'new')
+        released.set()
+        assert wait_for(lambda: not manager.pending('peer'))
+        time.sleep(0.1)
+    finally:
+        manager.stop()
+
+    # the failure of the cancelled request doesn't schedule retries on behalf of the new one
+    assert calls == ['old', 'new', 'new']
@@ -0,0 +1,100 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from EdgeDevice.InferenceService import tuning as tuning_module
+from EdgeDevice.InferenceService.registry import ModelRegistry
+from EdgeDevice.InferenceService.tuning import AutoTuner
+from EdgeDevice.utils.constants import MODELS_DIRECTORY
+
+MODEL = os.path.join(MODELS_DIRECTORY, 'movinet_a0_int8.tflite')
+
+
+def blocking_benchmark(slow):
+    """Benchmark of the tuner, whose runs of the ``slow`` model last until they are released."""
+    tuning, done = threading.Event(), threading.Event()
+
+    def benchmark(model_path, num_threads, xnnpack, input_shapes=None, runs=20, warmup=3):
+        if os.path.basename(model_path) == slow:
+            tuning.set()
+            assert done.wait(10)
+        return 0.001 * num_threads
+
+    return benchmark, tuning, done
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    for name in ('first', 'second'):
+        shutil.copy(MODEL, tmp_path / f'{name}.tflite')
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_model_is_loaded_once_for_every_interpreter(models_dir, use_mmap):
+    registry = ModelRegistry(models_dir, use_mmap=use_mmap)
+
+    first = registry.create_interpreter('first', num_threads=1)
+    second = registry.create_interpreter('first', num_threads=1)
+
+    assert first is not second
+    assert list(registry.models) == [os.path.join(models_dir, 'first.tflite')]
+    entry = registry.load('first')
+    assert entry.interpreters == 3
+    assert (entry.content is None) == use_mmap
+    assert registry.stats()['first.tflite']['MMAP'] == use_mmap
+
+
+def test_released_interpreters_are_handed_out_again(models_dir):
+    registry = ModelRegistry(models_dir)
+
+    with registry.acquire('first', num_threads=1) as interpreter:
+        pass
+    with registry.acquire('first', num_threads=1) as again:
+        with registry.acquire('first', num_threads=1) as concurrent:
+            pass
+
+    assert again is interpreter
+    assert concurrent is not interpreter
+    assert registry.load('first').interpreters == 3
+
+
+def test_threads_get_their_own_interpreter(models_dir):
+    registry = ModelRegistry(models_dir)
+    interpreters = []
+    thread = threading.Thread(target=lambda: interpreters.append(registry.interpreter('first')))
+    thread.start()
+    thread.join()
+
+    assert registry.interpreter('first') is registry.interpreter('first')
+    assert registry.interpreter('first') is not interpreters[0]
+
+
+def test_tuning_a_model_does_not_block_the_loaded_ones(models_dir, tmp_path, monkeypatch):
+    benchmark, tuning, done = blocking_benchmark('second.tflite')
+    monkeypatch.setattr(tuning_module, 'benchmark', benchmark)
+    registry = ModelRegistry(models_dir, tuner=AutoTuner(str(tmp_path / 'tuning.json'), runs=1))
+    registry.load('first')
+    loading = threading.Thread(target=registry.load, args=('second',), daemon=True)
+    loading.start()
+    assert tuning.wait(10)
+
+    # New interpreters of the loaded model get their tuned configuration while the other model is benchmarked.
+    results = []
+
+    def use_first():
+        with registry.acquire('first') as interpreter:
+            results.append(interpreter is not None)
+        results.append(set(registry.stats()))
+
+    user = threading.Thread(target=use_first, daemon=True)
+    user.start()
+    user.join(2)
+    done.set()
+    loading.join(10)
+
+    assert results == [True, {'first.tflite'}]
+    assert set(registry.stats()) == {'first.tflite', 'second.tflite'}
+    assert registry.stats()['second.tflite']['NUM_THREADS'] == 1
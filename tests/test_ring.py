@@ -0,0 +1,45 @@
+import pickle
+
+import numpy as np
+from EdgeDevice.CaptureService.ring import SharedFrameRing
+
+
+def test_ring_hands_out_frames_by_ticket():
+    ring = SharedFrameRing((4, 3), np.uint8, slots=2)
+    try:
+        ticket = ring.write(np.full((4, 3), 7, dtype=np.uint8), timestamp=1.5)
+        frame, timestamp = ring.view(*ticket)
+
+        assert (frame == 7).all()
+        assert timestamp == 1.5
+        assert not frame.flags.writeable
+        del frame
+    finally:
+        ring.close()
+
+
+def test_ring_detects_overwritten_slots():
+    ring = SharedFrameRing((16,), np.float32, slots=2)
+    try:
+        first = ring.write(np.ones(16, dtype=np.float32))
+        ring.write(np.ones(16, dtype=np.float32))
+        ring.write(np.zeros(16, dtype=np.float32))
+
+        assert not ring.valid(*first)
+        assert ring.read(*first) == (None, None)
+    finally:
+        ring.close()
+
+
+def test_ring_copies_share_memory():
+    ring = SharedFrameRing((8,), np.float32, slots=4)
+    try:
+        reader = pickle.loads(pickle.dumps(ring))
+        ticket = ring.write(np.arange(5, dtype=np.float32))
+        frame, _ = reader.read(*ticket)
+
+        # Short windows keep their length.
+        assert frame.tolist() == [0, 1, 2, 3, 4]
+        reader.close()
+    finally:
+        ring.close()
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from EdgeDevice.InferenceService.server import VideoInferenceServer
+from EdgeDevice.utils.constants import MODELS_DIRECTORY
+
+MODEL = os.path.join(MODELS_DIRECTORY, 'movinet_a0_int8.tflite')
+LABELS = os.path.join(MODELS_DIRECTORY, 'movinet_retrained_class.txt')
+
+
+def frame(value):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def zero(states):
+    return all(not np.any(state) for state in states.values())
+
+
+def test_streams_share_the_pool_with_their_own_states():
+    results = []
+    server = VideoInferenceServer(MODEL, LABELS, pool_size=1, model_fps=50,
+                                  on_result=lambda *result: results.append(result))
+    for name in ('kitchen', 'living room'):
+        server.register_stream(name)
+    server.start()
+    try:
+        server.submit('kitchen', frame(200), timestamp=1.0)
+        server.submit('living room', frame(20), timestamp=2.0)
+        assert wait_until(lambda: len(results) == 2)
+    finally:
+        server.stop()
+
+    # a single classifier served both streams, each result keeps the capture time of its frame
+    assert server.num_threads == (os.cpu_count() or 1)
+    assert sorted((name, timestamp) for name, _, _, timestamp in results) == [('kitchen', 1.0), ('living room', 2.0)]
+    assert all(len(probabilities) == len(server.classifiers[0].labels) for _, _, probabilities, _ in results)
+    kitchen, living_room = server.streams['kitchen'].states, server.streams['living room'].states
+    assert not zero(kitchen) and not zero(living_room)
+    assert any(not np.array_equal(kitchen[name], living_room[name]) for name in kitchen)
+    stats = server.stats()
+    assert stats['kitchen']['CLASSIFIED'] == stats['living room']['CLASSIFIED'] == 1
+    assert stats['kitchen']['RECEIVED'] == 1 and stats['kitchen']['REPLACED'] == 0
+
+
+def test_clear_during_an_inference_is_not_undone():
+    server = VideoInferenceServer(MODEL, LABELS, pool_size=1)
+    classifier = server.classifiers[0]
+    classify_stream = classifier.classify_stream
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_classify_stream(*args, **kwargs):
+        result = classify_stream(*args, **kwargs)
+        started.set()
+        release.wait(5)
+        return result
+
+    classifier.classify_stream = blocking_classify_stream
+    server.register_stream('kitchen')
+    server.start()
+    try:
+        server.submit('kitchen', frame(200))
+        assert started.wait(5)
+        # the scene changed while the previous frame was being classified
+        server.clear('kitchen')
+        release.set()
+        assert wait_until(lambda: server.stats()['kitchen']['CLASSIFIED'] == 1)
+    finally:
+        release.set()
+        server.stop()
+
+    assert zero(server.streams['kitchen'].states)
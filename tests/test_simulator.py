@@ -0,0 +1,89 @@
+import logging
+
+import pytest
+
+from EdgeDevice.NetworkService.Simulator import Simulation, benchmark
+
+# a fast failure detection, the threads of a handful of nodes keep up with it
+OPTIONS = dict(heartbeat_interval=0.2, min_std=0.05)
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.fixture
+def simulation():
+    with Simulation(latency=0.001, seed=0, **OPTIONS) as simulation:
+        yield simulation
+
+
+def start(simulation, count):
+    nodes = [simulation.add_node() for _ in range(count)]
+    assert simulation.wait_for(simulation.linked, timeout=10) is not None
+    return nodes
+
+
+def test_nodes_elect_the_highest_node(simulation):
+    nodes = start(simulation, 5)
+
+    assert simulation.elect(timeout=10) is not None
+    assert simulation.coordinator().id == max(node.id for node in nodes)
+    assert len({node.election.term for node in nodes}) == 1
+
+
+def test_events_reach_every_node(simulation):
+    start(simulation, 4)
+    simulation.elect(timeout=10)
+
+    result = simulation.events(50, timeout=10)
+
+    assert result["DELIVERED"] == 1.0
+    assert result["LATENCY_P50"] <= result["LATENCY_P99"]
+
+
+def test_joining_node_gets_the_chain(simulation):
+    start(simulation, 3)
+    simulation.elect(timeout=10)
+
+    assert simulation.sync_chain(20, timeout=10) is not None
+    assert [block["HASH"] for block in simulation.nodes[-1].blockchain.chain] == \
+           [block["HASH"] for block in simulation.coordinator().blockchain.chain]
+
+
+def test_crashed_coordinator_is_replaced(simulation):
+    nodes = start(simulation, 4)
+    simulation.elect(timeout=10)
+    crashed = simulation.coordinator()
+
+    assert simulation.fail_over(timeout=10) is not None
+    assert simulation.coordinator().id == max(node.id for node in nodes if node is not crashed)
+    assert all(len(node.registry) == 2 for node in simulation.alive)
+
+
+def test_partition_heals_to_the_highest_node(simulation):
+    nodes = sorted(start(simulation, 5), key=lambda node: node.id)
+    simulation.elect(timeout=10)
+    low, high = nodes[:3], nodes[3:]
+
+    simulation.partition(low, high)
+    # each side notices the other is gone, and the low side elects its own coordinator
+    assert simulation.wait_for(lambda: simulation.converged(low), timeout=10) is not None
+    assert low[0].coordinator == low[-1].id
+
+    simulation.heal()
+
+    assert simulation.wait_for(lambda: simulation.linked() and simulation.converged(), timeout=10) is not None
+    assert all(node.coordinator == high[-1].id for node in nodes)
+
+
+def test_benchmark_reports_every_measure():
+    result = benchmark(3, events=20, blocks=5)
+
+    assert result["NODES"] == 3
+    for measure in ("LINKED", "ELECTION", "THROUGHPUT", "CHAIN_SYNC", "FAIL_OVER", "CPU_PER_NODE", "RSS_MB"):
+        assert result[measure] is not None
+    assert result["DELIVERED"] == 1.0
@@ -0,0 +1,46 @@
+import os
+import socket
+import threading
+
+from EdgeDevice.NetworkService.Tls import SessionCache, benchmark_handshakes, client_context, server_context
+
+KEYS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Keys')
+CERT, KEY = os.path.join(KEYS, 'cert.pem'), os.path.join(KEYS, 'key.pem')
+
+
+def test_client_context_is_shared():
+    assert client_context() is client_context()
+
+
+def test_reconnections_resume_the_saved_session():
+    server = server_context(CERT, KEY)
+    listener = socket.create_server(('127.0.0.1', 0))
+    address = listener.getsockname()
+
+    def serve():
+        for _ in range(2):
+            conn, _ = listener.accept()
+            with server.wrap_socket(conn, server_side=True) as tls:
+                tls.sendall(b'\0')
+                tls.recv(1)
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+
+    sessions = SessionCache()
+    for _ in range(2):
+        with client_context().wrap_socket(socket.create_connection(address), session=sessions.get(address)) as tls:
+            tls.recv(1)
+            sessions.record(address, tls)
+            tls.sendall(b'\0')
+
+    thread.join()
+    listener.close()
+    assert (sessions.full, sessions.resumed) == (1, 1)
+
+
+def test_benchmark_reports_both_handshakes():
+    report = benchmark_handshakes(CERT, KEY, runs=3)
+
+    assert report['FULL'] > 0 and report['RESUMED'] > 0
+    assert report['RESUMED_RATIO'] == 1.0
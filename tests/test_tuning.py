@@ -0,0 +1,56 @@
+import json
+import threading
+
+from EdgeDevice.InferenceService.tuning import AutoTuner, machine_id
+
+
+def test_candidates_cover_thread_counts_and_xnnpack():
+    candidates = AutoTuner.candidates(cores=6)
+
+    assert sorted({threads for threads, _ in candidates}) == [1, 2, 4, 6]
+    assert {xnnpack for _, xnnpack in candidates} == {True, False}
+    assert len(candidates) == 8
+
+
+def test_tuned_configuration_is_reused(tmp_path):
+    path = tmp_path / 'tuning.json'
+    path.write_text(json.dumps({machine_id(): {'model.tflite': {'NUM_THREADS': 2, 'XNNPACK': False}}}))
+
+    tuner = AutoTuner(str(path))
+
+    # The model file doesn't even exist, the persisted result is used without benchmarking.
+    assert tuner.config('models/model.tflite') == (2, False)
+
+
+def test_tuning_a_model_does_not_block_the_tuned_ones(tmp_path):
+    path = tmp_path / 'tuning.json'
+    path.write_text(json.dumps({machine_id(): {'tuned.tflite': {'NUM_THREADS': 2, 'XNNPACK': False}}}))
+    tuner = AutoTuner(str(path))
+    started, release = threading.Event(), threading.Event()
+    tuned = []
+
+    def tune(model_path, input_shapes=None):
+        tuned.append(model_path)
+        started.set()
+        release.wait(5)
+        return {'NUM_THREADS': 4, 'XNNPACK': True, 'LATENCY': 0.001}
+
+    tuner.tune = tune
+    callers = [threading.Thread(target=tuner.config, args=('models/new.tflite',), daemon=True) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    assert started.wait(5)
+
+    # The other models are answered while the new one is benchmarked.
+    answers = []
+    query = threading.Thread(target=lambda: answers.append(tuner.config('models/tuned.tflite')), daemon=True)
+    query.start()
+    query.join(1)
+    release.set()
+    assert answers == [(2, False)]
+
+    for caller in callers:
+        caller.join(5)
+    assert tuned == ['models/new.tflite']
+    assert tuner.config('models/new.tflite') == (4, True)
+    assert json.loads(path.read_text())[machine_id()]['new.tflite']['NUM_THREADS'] == 4
@@ -0,0 +1,138 @@
+import os
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from EdgeDevice.InferenceService.cache import InferenceCache, file_key, replay_key
+from EdgeDevice.InferenceService.gating import MotionDetector
+from EdgeDevice.InferenceService.video import VideoClassifier, VideoClassifierOptions, VideoInference
+from EdgeDevice.utils.constants import MODELS_DIRECTORY
+
+MODEL = os.path.join(MODELS_DIRECTORY, 'movinet_a0_int8.tflite')
+LABELS = os.path.join(MODELS_DIRECTORY, 'movinet_retrained_class.txt')
+
+
+def classifier(**options):
+    return VideoClassifier(MODEL, LABELS, VideoClassifierOptions(num_threads=1, **options))
+
+
+def reference(image, bgr, flip):
+    # the preprocessing before it was fused into preallocated buffers
+    resized = cv2.resize(image, (172, 172))
+    if bgr:
+        resized = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    if flip:
+        resized = cv2.flip(resized, 1)
+    return np.float32(resized) / 255
+
+
+def dequantize(model):
+    tensor = model._input_frame
+    if model._input_mode == 'float':
+        return tensor
+    scale, zero_point = model._input_quantization
+    return (tensor.astype(np.float32) - zero_point) * scale
+
+
+@pytest.mark.parametrize('dtype, quantization, mode', [
+    (np.float32, (0.0, 0), 'float'),
+    (np.uint8, (1 / 255, 0), 'uint8'),
+    (np.int8, (1 / 255, -128), 'int8'),
+    (np.uint8, (2 / 255, 0), 'quantized'),
+])
+@pytest.mark.parametrize('frame_dtype', [np.uint8, np.float32])
+def test_preprocessing_matches_the_allocating_path(dtype, quantization, mode, frame_dtype):
+    model = classifier()
+    model._allocate_input((1, 1, 172, 172, 3), dtype, quantization)
+    assert model._input_mode == mode
+    image = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+    for bgr, flip in ((False, False), (True, True)):
+        model._preprocess(image.astype(frame_dtype), bgr, flip)
+
+        assert np.abs(dequantize(model) - reference(image, bgr, flip)).max() <= 1 / 255 + 1e-6
+
+
+def test_postprocessing_keeps_the_top_allowed_labels():
+    labels = classifier().labels
+    allowed = labels[:50]
+    model = classifier(label_allow_list=allowed, label_deny_list=allowed[:5], max_results=3, score_threshold=0.001)
+    logits = np.random.default_rng(0).normal(0, 3, (1, len(labels))).astype(np.float32)
+
+    categories = model._postprocess(logits)
+
+    probabilities = np.exp(logits[0]) / np.exp(logits[0]).sum()
+    expected = sorted(((probabilities[i], label) for i, label in enumerate(labels)
+                       if label in allowed[5:] and probabilities[i] >= 0.001), reverse=True)[:3]
+    assert [category.label for category in categories] == [label for _, label in expected]
+    assert np.allclose([category.score for category in categories], [score for score, _ in expected])
+    assert np.isclose(model.probabilities.sum(), 1.0)
+
+
+def frame(block_x):
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    image[80:160, block_x:block_x + 80] = 255
+    return image
+
+
+def video(path, frames):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (320, 240))
+    for image in frames:
+        writer.write(image)
+    writer.release()
+    return str(path)
+
+
+def inference(cache=None, **detector):
+    return VideoInference(MODEL, LABELS, VideoClassifierOptions(num_threads=1), 0.75,
+                          MotionDetector(**detector), cache)
+
+
+def test_idle_scene_clears_the_streaming_states():
+    model = inference(idle_reset=1.0, keep_warm=60.0)
+    assert model.classify_frame(frame(0), 10.0) is not None
+    assert any(np.any(state) for state in model.video_model._internal_states.values())
+
+    for now in (10.5, 11.0):
+        assert model.classify_frame(frame(0), now) is None
+
+    assert not any(np.any(state) for state in model.video_model._internal_states.values())
+
+
+def test_static_video_has_no_result(tmp_path):
+    cache = InferenceCache(name='TEST')
+    model = inference(cache, keep_warm=60.0)
+    clip = video(tmp_path / 'static.avi', [frame(0)] * 5)
+    # the scene was already seen, every frame of the clip is static
+    model.classify_video(video(tmp_path / 'seen.avi', [frame(0)]))
+    # files are decoded faster than the model frame rate, leave room for the next frame
+    time.sleep(0.2)
+
+    assert model.inference(clip) == (None, 0.0)
+    assert cache.results == {}
+
+    time.sleep(0.2)
+    moving = video(tmp_path / 'moving.avi', [frame(x) for x in range(40, 240, 40)])
+    label, score = model.inference(moving)
+    assert label is not None and score > 0
+    assert model.inference(moving) == (label, score)
+    assert cache.hits == 1
+
+
+def test_replayed_frames_are_answered_from_the_cache(tmp_path):
+    cache = InferenceCache(name='TEST')
+    model = inference(cache)
+    replay = file_key(video(tmp_path / 'replay.avi', [frame(0), frame(80)]))
+
+    first = model.classify_frame(frame(0), 10.0, replay_key(replay, 0))
+    categories = model.categories
+    model.classify_frame(frame(80), 10.5, replay_key(replay, 1))
+    states = {name: state.copy() for name, state in model.video_model._internal_states.items()}
+
+    # the recording is replayed from its first frame
+    assert np.array_equal(model.classify_frame(frame(0), 11.0, replay_key(replay, 0)), first)
+    assert model.categories == categories
+    assert cache.hits == 1 and len(cache.results) == 2
+    assert all(np.array_equal(state, states[name]) for name, state in model.video_model._internal_states.items())